@@ -51,6 +51,21 @@ let currentMeetingData = {};
 let currentEventId = null;
 let currentCalendarDate = new Date();
 
+// A write keeps its key until the server answers it, so double-clicks and retries after a network error are
+// deduplicated by the server, while a later write with the same content gets a new key and runs again
+const idempotencyKeys = new Map();
+
+function idempotencyKeyFor(payload) {
+    const body = JSON.stringify(payload);
+    if (!idempotencyKeys.has(body)) idempotencyKeys.set(body, crypto.randomUUID());
+    return idempotencyKeys.get(body);
+}
+
+function releaseIdempotencyKey(payload, response) {
+    // A 409 means the first request with this key is still running, so a retry must keep the key to join it
+    if (response.status !== 409) idempotencyKeys.delete(JSON.stringify(payload));
+}
+
 function formatDateTimeLocal(isoString) {
     if (!isoString) return '';
     const dt = new Date(isoString);
@@ -478,9 +493,10 @@ async function sendMeetingRequest(payload, actionType) {
     try {
         const response = await fetch(`${API_BASE_URL}/meetings`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKeyFor(payload) },
             body: JSON.stringify(payload)
         });
+        releaseIdempotencyKey(payload, response);
 
         if (!response.headers.get('content-type').includes('application/json')) {
             const errorText = await response.text();
@@ -548,22 +564,38 @@ async function selectRescheduleSlot(eventId, startTimeISO, endTimeISO) {
     await sendMeetingRequest(payload, 'update');
 }
 
+// Fetches every page of a paginated list. Unchanged pages are revalidated by the browser's cache through their ETag.
+async function fetchAllPages(path, listField) {
+    let response;
+    let data;
+    let items = [];
+    let pageToken = null;
+    do {
+        response = await fetch(`${API_BASE_URL}${path}${pageToken ? `?page_token=${encodeURIComponent(pageToken)}` : ''}`);
+        if (!(response.headers.get('content-type') || '').includes('application/json')) return { response, data: null };
+        data = await response.json();
+        if (!response.ok || data.status !== 'success') return { response, data };
+        items = items.concat(data[listField]);
+        pageToken = data.next_page_token;
+    } while (pageToken);
+    return { response, data: { ...data, [listField]: items } };
+}
+
 async function fetchAndDisplayUpcomingEvents() {
     elements.upcomingMeetingsList.innerHTML = '';
     showLoading(elements.upcomingMeetingsLoadingIndicator);
     setStatusMessage('Fetching your upcoming meetings...', 'info');
     elements.rescheduleSuggestionsArea.classList.add('hidden');
     try {
-        const response = await fetch(`${API_BASE_URL}/list_upcoming_events`, { method: 'GET' });
+        const { response, data } = await fetchAllPages('/list_upcoming_events', 'events');
 
-        if (!response.headers.get('content-type').includes('application/json')) {
+        if (!data) {
             const errorText = await response.text();
             console.error('Server returned non-JSON response on list events:', errorText);
             setStatusMessage("Server returned an invalid response. Please check the backend logs.", 'error');
             return;
         }
 
-        const data = await response.json();
         elements.upcomingMeetingsLoadingIndicator.classList.add('hidden');
         if (response.ok && data.status === 'success') {
             currentMeetingData.upcoming_meetings = data.events;
@@ -613,11 +645,13 @@ elements.confirmCancelBtn.addEventListener('click', async () => {
     showLoading(elements.loadingIndicator);
     setStatusMessage("Cancelling meeting...", 'info');
     try {
+        const payload = { action: 'cancel', eventId: eventId };
         const response = await fetch(`${API_BASE_URL}/meetings`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ action: 'cancel', eventId: eventId })
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKeyFor(payload) },
+            body: JSON.stringify(payload)
         });
+        releaseIdempotencyKey(payload, response);
         
         if (!response.headers.get('content-type').includes('application/json')) {
             const errorText = await response.text();
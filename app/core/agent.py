@@ -1,23 +1,132 @@
+import logging
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, time
 import pytz
-import traceback
 import json
+import copy
+import contextvars
+from itertools import islice
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
 
 from app.core.nlp_parser import NLPParser
 from app.core.calendar_api import GoogleCalendarAPI
 from app.core.directory_api import GoogleDirectoryAPI
 from app.core.gmail_api import GmailAPI
+from app.core.credentials import CredentialManager
+from app.core.availability import busy_intervals, merge_intervals, intersect_intervals, complement_intervals, working_intervals_utc
+from app.core.recurrence import normalize_rule, expand_occurrences, occurrence_conflicts, best_weekly_slot
+from app.core.slot_optimizer import best_slots
+from app.core.batch import BatchScope
+from app.core.deadline import Deadline, current_deadline
+from app.core.metrics import STAGE_DURATION
+from app.core.tracing import add_event, span
+from app.core.warmup import ContactFrequency
+from app.core.intent_classifier import IntentClassifier
+
+logger = logging.getLogger(__name__)
+
+# Cumulative days of calendar fetched as a slot search widens; later steps keep doubling up to the maximum horizon
+SEARCH_HORIZON_STEPS_DAYS = (1, 3, 7, 14)
 
 class MeetingAgent:
-    def __init__(self, api_key: str, oauth_client_secrets_path: str, user_email: str, gmail_token_path: str, calendar_token_path: str = 'token_personal_calendar.json', timezone: str = 'Asia/Kolkata', directory_api: GoogleDirectoryAPI = None):
-        """Initializes the MeetingAgent with all necessary API clients."""
-        self.nlp_parser = NLPParser(api_key=api_key)
+    # Set only on the per-batch copies made by process_meeting_requests
+    batch_scope = None
+
+    def __init__(self, api_key: str, oauth_client_secrets_path: str, user_email: str, gmail_token_path: str, calendar_token_path: str = 'token_personal_calendar.json', timezone: str = 'Asia/Kolkata', directory_api: GoogleDirectoryAPI = None, credential_manager: CredentialManager = None,
+                 slot_granularity_minutes: int = 15, working_hours: tuple = (9, 17), max_search_horizon_days: int = 14, llm_timeout_seconds: float = 30.0,
+                 nlp_parser: NLPParser = None, calendar_api: GoogleCalendarAPI = None, gmail_api: GmailAPI = None,
+                 contact_frequency: ContactFrequency = None, intent_classifier: IntentClassifier = None):
+        """
+        Initializes the MeetingAgent with all necessary API clients.
+        Clients passed in are used as they are, e.g. the local stand-ins the benchmarks run against.
+        """
+        self.nlp_parser = nlp_parser if nlp_parser else NLPParser(api_key=api_key, timeout_seconds=llm_timeout_seconds)
         self.directory_api = directory_api if directory_api else GoogleDirectoryAPI()
-        self.calendar_api = GoogleCalendarAPI(user_email=user_email, oauth_client_secrets_path=oauth_client_secrets_path, token_path=calendar_token_path)
-        self.gmail_api = GmailAPI(user_email='me', oauth_client_secrets_path=oauth_client_secrets_path, token_path=gmail_token_path)
+        self.credential_manager = credential_manager if credential_manager else CredentialManager()
+        self.calendar_api = calendar_api if calendar_api else GoogleCalendarAPI(user_email=user_email, oauth_client_secrets_path=oauth_client_secrets_path, token_path=calendar_token_path, credential_manager=self.credential_manager, timezone=timezone)
+        self.gmail_api = gmail_api if gmail_api else GmailAPI(user_email='me', oauth_client_secrets_path=oauth_client_secrets_path, token_path=gmail_token_path, credential_manager=self.credential_manager)
         self.user_email = user_email
         self.pune_timezone = pytz.timezone(timezone)
+        self.slot_granularity_minutes = slot_granularity_minutes
+        self.working_hours_start = time(hour=working_hours[0])
+        self.working_hours_end = time(hour=working_hours[1])
+        self.max_search_horizon_days = max_search_horizon_days
+        # Called as listener(change, event_id) after each calendar write; change is 'created', 'updated' or 'deleted'
+        self.change_listeners = []
+        # How often each contact is resolved as a participant, for warming the caches of the most frequent ones
+        self.contact_frequency = contact_frequency if contact_frequency else ContactFrequency()
+        # Keeps plainly non-meeting queries away from Gemini when set
+        self.intent_classifier = intent_classifier
+
+    def process_meeting_requests(self, queries: list, parse_concurrency: int = 4, max_workers: int = 8, deadline: Deadline = None) -> dict:
+        """
+        Processes a batch of queries and returns their responses in input order.
+        Distinct queries are parsed concurrently with at most parse_concurrency Gemini calls in flight.
+        The rest of each pipeline then runs on a per-batch copy of the agent that shares participant
+        lookups and free/busy fetches between queries. A failing query does not fail the others.
+        With a deadline, the whole batch shares it and each query reports what it had to cut short.
+        """
+        def parse(query):
+            if deadline is None:
+                return self._parse_query(query)
+            return deadline.run(self._parse_query, query)
+
+        unique_queries = list(dict.fromkeys(queries))
+        # Each task runs in a copy of the caller's context, so its calls join the caller's trace
+        with ThreadPoolExecutor(max_workers=max(1, parse_concurrency)) as executor:
+            parse_futures = {query: executor.submit(contextvars.copy_context().run, parse, query) for query in unique_queries}
+
+        batch_agent = copy.copy(self)
+        batch_agent.batch_scope = BatchScope(self.directory_api, self.calendar_api)
+        batch_agent.calendar_api = batch_agent.batch_scope.calendar_api
+
+        def run(index, query):
+            with span("batch.query", index=index):
+                return batch_agent.process_meeting_request(query, parse_futures[query].result(),
+                                                           deadline.child() if deadline is not None else None)
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, run, index, query) for index, query in enumerate(queries)]
+
+        results = []
+        failed = 0
+        for index, (query, future) in enumerate(zip(queries, futures)):
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.exception("Query %d of the batch failed: %s", index, e)
+                result = {"status": "error", "message": f"An unexpected error occurred: {e}"}
+            if result.get("status") == "error":
+                failed += 1
+            results.append({"index": index, "query": query, **result})
+
+        if not failed:
+            status = "success"
+        elif failed < len(queries):
+            status = "partial"
+        else:
+            status = "error"
+        response = {"status": status, "message": f"{len(queries) - failed} of {len(queries)} queries processed.",
+                    "results": results, "shared_lookups": batch_agent.batch_scope.stats()}
+        if deadline is not None and deadline.cut_short:
+            response["truncated"] = deadline.summary()
+        return response
+
+    def dependency_health(self) -> dict:
+        """
+        Circuit breaker state and retry counts for Gemini, Calendar and Gmail, with rate limiter waits
+        for the Google APIs and coalesced calls for Calendar.
+        """
+        health = {}
+        for client in (self.nlp_parser, self.calendar_api, self.gmail_api):
+            stats = client.resilience.stats()
+            if getattr(client, 'rate_limiter', None) is not None:
+                stats["rate_limiter"] = client.rate_limiter.stats()
+            if getattr(client, 'single_flight', None) is not None:
+                stats["coalescing"] = client.single_flight.stats()
+            health[client.resilience.name] = stats
+        return health
 
     def _resolve_participants(self, participants_names: list) -> list:
         """
@@ -25,14 +134,22 @@ class MeetingAgent:
         Prioritizes a match from the user's contacts before falling back to a guess.
         """
         resolved_emails = []
-        all_contacts = self.directory_api.list_contacts()
-        contacts_by_name = {contact['displayName'].lower(): contact for contact in all_contacts}
-        contacts_by_email = {contact['primaryEmail'].lower(): contact for contact in all_contacts}
+        batch_scope = self.batch_scope
+        if batch_scope is not None:
+            contacts_by_name, contacts_by_email = batch_scope.contacts_by_name, batch_scope.contacts_by_email
+        else:
+            contacts_by_name, contacts_by_email = self.directory_api.contact_indexes()
+        contacts_found = []
         
         for name_or_email in participants_names:
             normalized_input = name_or_email.lower().strip()
             found = False
 
+            # Reuse a lookup already made by another query of the same batch
+            if batch_scope is not None and normalized_input in batch_scope.participants:
+                resolved_emails.append(batch_scope.participants[normalized_input])
+                continue
+
             # Check for exact email match first
             if "@" in normalized_input and normalized_input in contacts_by_email:
                 resolved_emails.append(contacts_by_email[normalized_input])
@@ -45,27 +162,121 @@ class MeetingAgent:
             
             # Fallback to the original logic if no contacts match
             if not found:
-                print(f"Warning: Could not find user for name '{name_or_email}' in contacts. Using original logic.")
+                logger.warning("Could not find user for name '%s' in contacts. Using original logic.", name_or_email)
                 
                 # Check for partial match in our contacts
                 found_by_partial_search = self.directory_api.search_users(name_or_email)
                 if found_by_partial_search:
                     resolved_emails.append(found_by_partial_search[0])
                     found = True
+
+            if found:
+                contacts_found.append(resolved_emails[-1]['primaryEmail'])
             
             # Final fallback to a generic email guess
             if not found:
-                print(f"Warning: No match found. Defaulting to @gmail.com.")
+                logger.warning("No match found for '%s'. Defaulting to @gmail.com.", name_or_email)
                 resolved_emails.append({"primaryEmail": f"{normalized_input.replace(' ', '')}@gmail.com", "displayName": name_or_email})
 
+            if batch_scope is not None:
+                batch_scope.participants[normalized_input] = resolved_emails[-1]
+
+        # Guessed addresses are left out, so warm-up only prefetches real contacts
+        self.contact_frequency.record(contacts_found)
+
         # Add the user's own email if not already present
         if not any(self.user_email.lower() == p.get('primaryEmail', '').lower() for p in resolved_emails):
             resolved_emails.insert(0, {"primaryEmail": self.user_email, "displayName": "You"})
         
         return resolved_emails
 
-    def process_meeting_request(self, query: str) -> dict:
+    def process_meeting_request(self, query: str, parsed_data: dict = None, deadline: Deadline = None) -> dict:
+        """Runs the whole request pipeline and returns only the final response."""
+        stages = self.iter_meeting_request(query, parsed_data, deadline)
+        while True:
+            try:
+                next(stages)
+            except StopIteration as finished:
+                return finished.value
+
+    def iter_meeting_request(self, query: str, parsed_data: dict = None, deadline: Deadline = None):
+        """
+        Runs the request pipeline as a generator that yields (stage, data) as each stage completes:
+        'parsed' with the parsed query, 'participants' with the resolved attendees, 'availability' once the
+        proposed time has been checked, and 'slot' for each suggested slot as it is found.
+        The final response is the generator's return value. Pass parsed_data to skip parsing.
+
+        With a deadline, every Gemini and Google API call is bounded by the time left, calls are skipped once
+        it has run out, and the slot search stops widening. The response then keeps whatever was found and
+        lists what was cut short under 'truncated'.
+        """
+        stages = self._timed_stages(self._meeting_request_stages(query, parsed_data))
+        if deadline is None:
+            return (yield from stages)
+
+        while True:
+            # Active only while a stage runs, since the caller may resume the generator from another context
+            with deadline.activate():
+                try:
+                    stage = next(stages)
+                except StopIteration as finished:
+                    response_payload = finished.value
+                    break
+            yield stage
+
+        if deadline.cut_short:
+            response_payload["truncated"] = deadline.summary()
+            response_payload["message"] = f"{response_payload.get('message', '')} Results are partial because the {deadline.budget_seconds:g}s time budget ran out.".strip()
+        return response_payload
+
+    @staticmethod
+    def _timed_stages(stages):
+        """
+        Passes pipeline stages through and records how long each took in the stage metrics and as spans of the
+        current trace. The time up to a stage's yield counts toward that stage ('slot' adds up every slot found),
+        the time after the last one toward 'respond'. Time the caller spends between stages is not counted.
+        """
+        durations = {}
+        try:
+            while True:
+                started = perf_counter()
+                # Each stretch is also a span of the current trace, named once we know which stage it was
+                with span("pipeline") as step:
+                    try:
+                        stage = next(stages)
+                    except StopIteration as finished:
+                        stage, name, result = None, "respond", finished.value
+                    else:
+                        name = stage[0]
+                    if step is not None:
+                        step.name = f"pipeline.{name}"
+                durations[name] = durations.get(name, 0.0) + perf_counter() - started
+                if stage is None:
+                    return result
+                yield stage
+        finally:
+            for name, seconds in durations.items():
+                STAGE_DURATION.observe(seconds, stage=name)
+
+    def _parse_query(self, query: str) -> dict:
+        """
+        Parses a query with Gemini, unless the local intent classifier finds it is plainly not a meeting request.
+        Those get an 'unknown' intent, and so the manual-entry response, without a Gemini call.
+        """
+        if self.intent_classifier is None:
+            return self.nlp_parser.parse_meeting_request(query)
+        probability, call_llm = self.intent_classifier.decide(query, self.directory_api.contact_name_words())
+        if not call_llm:
+            add_event("llm_skipped", meeting_probability=round(probability, 4))
+            return {"intent": "unknown", "participants": [], "optional_participants": [], "classified_locally": True}
         parsed_data = self.nlp_parser.parse_meeting_request(query)
+        self.intent_classifier.record_outcome(probability, parsed_data)
+        return parsed_data
+
+    def _meeting_request_stages(self, query: str, parsed_data: dict = None):
+        if parsed_data is None:
+            parsed_data = self._parse_query(query)
+        yield "parsed", parsed_data
     
         if parsed_data.get("error"):
             return {"status": "error", "message": parsed_data.get("error"), "parsed_data": parsed_data}
@@ -76,11 +287,16 @@ class MeetingAgent:
     
         resolved_participants = self._resolve_participants(participants_raw)
         participant_emails = [p['primaryEmail'] for p in resolved_participants]
+        optional_participants = [p for p in self._resolve_participants(parsed_data.get("optional_participants") or [])
+                                 if p['primaryEmail'] not in participant_emails]
+        optional_emails = [p['primaryEmail'] for p in optional_participants]
+        yield "participants", {"resolved_participants": resolved_participants, "optional_participants": optional_participants}
 
         response_payload = {
             "status": "success",
             "parsed_data": parsed_data,
             "resolved_participants": resolved_participants,
+            "optional_participants": optional_participants,
             "suggested_slots": [],
             "message": "Query parsed successfully."
         }
@@ -96,13 +312,39 @@ class MeetingAgent:
                     start_dt_localized = self.pune_timezone.localize(start_dt_naive)
                     end_dt_localized = start_dt_localized + timedelta(minutes=duration_minutes)
 
+                    if parsed_data.get("recurrence"):
+                        recurrence = normalize_rule(parsed_data["recurrence"], self.pune_timezone)
+                        series_check = self.check_recurring_availability(participant_emails, start_dt_localized, end_dt_localized, recurrence)
+                        response_payload["series_check"] = series_check
+                        yield "availability", {"available": not series_check["conflicts"], "series_check": series_check}
+                        suggested_series = series_check["suggested_series"]
+                        if series_check["conflicts"] and suggested_series:
+                            response_payload["message"] = f"{len(series_check['conflicts'])} of {series_check['occurrences']} occurrences are busy. Suggesting a consistent slot for the series."
+                            start_iso, end_iso, recurrence = suggested_series["start"], suggested_series["end"], suggested_series["recurrence"][0]
+                        else:
+                            response_payload["message"] = "Proposed series looks available. Confirm to schedule."
+                            start_iso, end_iso = start_dt_localized.isoformat(), end_dt_localized.isoformat()
+                        response_payload["suggested_slots"] = [{"start": {"dateTime": start_iso}, "end": {"dateTime": end_iso}}]
+                        response_payload["initial_meeting_details"] = {
+                            "summary": parsed_data.get("meeting_title", "New Meeting"),
+                            "attendees": ", ".join(participant_emails + optional_emails),
+                            "startTime": start_iso,
+                            "endTime": end_iso,
+                            "recurrence": recurrence,
+                            "description": "Meeting scheduled via Book Meeting Assistant."
+                        }
+                        return response_payload
+
                     free_busy = self.calendar_api.get_free_busy(participant_emails, start_dt_localized, end_dt_localized)
+                    if free_busy.get('error'):
+                        raise Exception(free_busy['error'])
                 
                     is_available = True
                     for email in participant_emails:
                         if email in free_busy and free_busy[email].get('busy'):
                             is_available = False
                             break
+                    yield "availability", {"start": start_dt_localized.isoformat(), "end": end_dt_localized.isoformat(), "available": is_available}
                 
                     if is_available:
                         response_payload["message"] = "Proposed time looks available. Confirm to schedule."
@@ -112,29 +354,29 @@ class MeetingAgent:
                         }]
                         response_payload["initial_meeting_details"] = {
                             "summary": parsed_data.get("meeting_title", "New Meeting"),
-                            "attendees": ", ".join(participant_emails),
+                            "attendees": ", ".join(participant_emails + optional_emails),
                             "startTime": start_dt_localized.isoformat(),
                             "endTime": end_dt_localized.isoformat(),
                             "description": "Meeting scheduled via Book Meeting Assistant."
                         }
                     else:
                         response_payload["message"] = "Proposed time is busy. Looking for alternatives."
-                        response_payload["suggested_slots"] = self._find_suggested_slots(participant_emails, duration_minutes, start_dt_localized)
+                        response_payload["suggested_slots"] = yield from self._stream_slots(participant_emails, duration_minutes, start_dt_localized, optional_emails)
 
                 except Exception as e:
-                    print(f"Error processing direct schedule attempt: {e}")
-                    traceback.print_exc()
+                    logger.exception("Error processing direct schedule attempt: %s", e)
                     response_payload["message"] = f"Error processing direct schedule attempt. Looking for suggestions."
-                    response_payload["suggested_slots"] = self._find_suggested_slots(participant_emails, duration_minutes)
+                    response_payload["suggested_slots"] = yield from self._stream_slots(participant_emails, duration_minutes, optional_emails=optional_emails)
 
             elif duration_minutes and (start_date_hint or start_time_hint):
                 response_payload["message"] = "Looking for available time slots."
-                response_payload["suggested_slots"] = self._find_suggested_slots(participant_emails, duration_minutes)
+                preferred_start = self._preferred_start_from_hints(start_date_hint, start_time_hint)
+                response_payload["suggested_slots"] = yield from self._stream_slots(participant_emails, duration_minutes, preferred_start, optional_emails)
             else:
                 response_payload["message"] = "Not enough information to find specific slots. Please provide duration and/or time preferences. You can fill out details manually."
                 response_payload["initial_meeting_details"] = {
                     "summary": parsed_data.get("meeting_title", "New Meeting"),
-                    "attendees": ", ".join(participant_emails),
+                    "attendees": ", ".join(participant_emails + optional_emails),
                     "startTime": None,
                     "endTime": None,
                     "description": "Meeting request: " + query
@@ -180,12 +422,17 @@ class MeetingAgent:
                                 new_end_dt = new_start_dt + timedelta(minutes=inferred_duration)
 
                                 free_busy = self.calendar_api.get_free_busy([e.get('email', '') for e in event_to_manage.get('attendees', []) if 'email' in e], new_start_dt, new_end_dt)
+                                if free_busy.get('error'):
+                                    response_payload["message"] = f"Could not check availability for the new time: {free_busy['error']}"
+                                    response_payload["status"] = "info"
+                                    return response_payload
                                 
                                 is_available = True
                                 for email in [e.get('email', '') for e in event_to_manage.get('attendees', []) if 'email' in e]:
                                     if email in free_busy and free_busy[email].get('busy'):
                                         is_available = False
                                         break
+                                yield "availability", {"start": new_start_dt.isoformat(), "end": new_end_dt.isoformat(), "available": is_available}
                                 
                                 if is_available:
                                     response_payload["status"] = "confirmation"
@@ -208,8 +455,9 @@ class MeetingAgent:
                                     }
                                     return response_payload
                                 else:
-                                    attendees_for_search = [a.get('email', '') for a in event_to_manage.get('attendees', []) if 'email' in a]
-                                    suggested_slots = self._find_suggested_slots(attendees_for_search, inferred_duration, new_start_dt)
+                                    attendees_for_search = [a.get('email', '') for a in event_to_manage.get('attendees', []) if 'email' in a and not a.get('optional')]
+                                    optional_for_search = [a.get('email', '') for a in event_to_manage.get('attendees', []) if 'email' in a and a.get('optional')]
+                                    suggested_slots = yield from self._stream_slots(attendees_for_search, inferred_duration, new_start_dt, optional_for_search)
                                     response_payload["message"] = "Proposed time is busy. Here are some alternative slots."
                                     response_payload["status"] = "info"
                                     response_payload["suggested_slots"] = suggested_slots
@@ -266,72 +514,174 @@ class MeetingAgent:
             }
 
         return response_payload
-    def _find_suggested_slots(self, participant_emails: list, duration_minutes: int, search_start_time: datetime = None) -> list:
-        suggested_slots = []
+
+    def _preferred_start_from_hints(self, start_date_hint: str, start_time_hint: str) -> datetime:
+        """Turns a lone date or time hint into a preferred start: a date means 9:00 that day, a time means its next occurrence."""
+        try:
+            now = datetime.now(self.pune_timezone)
+            if start_date_hint:
+                return self.pune_timezone.localize(datetime.strptime(f"{start_date_hint} 09:00", '%Y-%m-%d %H:%M'))
+            preferred_time = datetime.strptime(start_time_hint, '%H:%M').time()
+            preferred_start = self.pune_timezone.localize(datetime.combine(now.date(), preferred_time))
+            return preferred_start if preferred_start > now else preferred_start + timedelta(days=1)
+        except (TypeError, ValueError):
+            return None
+
+    def _find_suggested_slots(self, participant_emails: list, duration_minutes: int, search_start_time: datetime = None,
+                              optional_emails: list = None, limit: int = 5) -> list:
+        """Returns the first `limit` suggestions, fetching only as much of the calendar as they need."""
+        return list(islice(self.iter_suggested_slots(participant_emails, duration_minutes, search_start_time, optional_emails, top_k=limit), limit))
+
+    def _stream_slots(self, participant_emails: list, duration_minutes: int, search_start_time: datetime = None,
+                      optional_emails: list = None, limit: int = 5):
+        """Yields ('slot', slot) for each of the first `limit` suggestions and returns them as a list."""
+        slots = []
+        for slot in islice(self.iter_suggested_slots(participant_emails, duration_minutes, search_start_time, optional_emails, top_k=limit), limit):
+            slots.append(slot)
+            yield "slot", slot
+        return slots
+
+    def iter_suggested_slots(self, participant_emails: list, duration_minutes: int, search_start_time: datetime = None,
+                             optional_emails: list = None, top_k: int = None):
+        """
+        Lazily yields suggested slots, fetching free/busy in growing windows (1 day, 3 days, 1 week, 2 weeks, ...)
+        only when the caller asks for more slots than the calendar fetched so far can provide.
+        Only times inside the working hours of the organizer and every required attendee, each in their own
+        time zone, are considered.
+
+        Within each window, slots where every required attendee is free are yielded best first, ranked by
+        attendance and closeness to search_start_time. Slots that miss some required attendees are held back
+        and only yielded, best first, once the whole search horizon has been scanned.
+        Each suggestion lists the attendees who would have a conflict.
+        With top_k, at most that many slots are yielded, and each window only ranks as many as are still needed,
+        so the slot scan can stop early; without it, every candidate is ranked.
+        """
         now = datetime.now(self.pune_timezone)
-        
-        search_start_time = search_start_time if search_start_time and search_start_time > now else now
-        
-        # Round up to the next 15-minute interval
-        if search_start_time.minute % 15 != 0:
-            search_start_time = search_start_time + timedelta(minutes=(15 - search_start_time.minute % 15))
-            search_start_time = search_start_time.replace(second=0, microsecond=0)
+        preferred_start = search_start_time if search_start_time and search_start_time > now else now
+        optional_emails = [email for email in optional_emails or [] if email not in participant_emails]
+        all_emails = participant_emails + optional_emails
+        duration = timedelta(minutes=duration_minutes)
+        granularity = timedelta(minutes=self.slot_granularity_minutes)
+
+        # Search the whole preferred day, not just the time after it, but never the past.
+        search_start_time = max(now, preferred_start.replace(hour=0, minute=0, second=0, microsecond=0))
 
-        for i in range(7):
-            current_day_start = search_start_time + timedelta(days=i)
-            day_start_limit = current_day_start.replace(hour=9, minute=0, second=0, microsecond=0)
-            day_end_limit = current_day_start.replace(hour=17, minute=0, second=0, microsecond=0)
+        # Round up to the next slot boundary
+        granularity_minutes = self.slot_granularity_minutes
+        if search_start_time.minute % granularity_minutes != 0:
+            search_start_time = search_start_time + timedelta(minutes=(granularity_minutes - search_start_time.minute % granularity_minutes))
+        search_start_time = search_start_time.replace(second=0, microsecond=0)
 
-            if current_day_start.date() == now.date() and current_day_start > day_start_limit:
-                day_start_limit = current_day_start
+        held_back = []
+        yielded = 0
+        scanned_days = 0
+        first_day = search_start_time.date()
+        deadline = current_deadline()
+        for horizon_days in self._search_horizon_steps():
+            if deadline is not None and deadline.expired():
+                deadline.cut("slot_search", f"Searched {scanned_days} of {self.max_search_horizon_days} days.")
+                break
+            range_start = max(search_start_time, self.pune_timezone.localize(datetime.combine(first_day + timedelta(days=scanned_days), time())))
+            range_end = self.pune_timezone.localize(datetime.combine(first_day + timedelta(days=horizon_days), time()))
+            searched_days, scanned_days = scanned_days, horizon_days
 
-            if day_start_limit >= day_end_limit:
+            windows = self._feasible_windows(participant_emails, range_start, range_end)
+            if not windows:
                 continue
 
-            free_busy_info = self.calendar_api.get_free_busy(participant_emails, day_start_limit, day_end_limit)
+            free_busy_info = self.calendar_api.get_free_busy_sharded(all_emails, windows[0][0], windows[-1][1])
+            if free_busy_info.get('error'):
+                logger.warning("Could not fetch free/busy for slot suggestions: %s", free_busy_info['error'])
+                if deadline is not None and deadline.expired():
+                    deadline.cut("slot_search", f"Searched {searched_days} of {self.max_search_horizon_days} days.")
+                    break
+                return
 
-            occupied_slots = []
-            for email in participant_emails:
-                for busy_period in free_busy_info.get(email, {}).get('busy', []):
-                    busy_start = datetime.fromisoformat(busy_period['start']).astimezone(self.pune_timezone)
-                    busy_end = datetime.fromisoformat(busy_period['end']).astimezone(self.pune_timezone)
-                    occupied_slots.append({'start': busy_start, 'end': busy_end})
-            
-            occupied_slots.sort(key=lambda x: x['start'])
-            merged_occupied = []
-            if occupied_slots:
-                current_merge = occupied_slots[0]
-                for j in range(1, len(occupied_slots)):
-                    if occupied_slots[j]['start'] <= current_merge['end']:
-                        current_merge['end'] = max(current_merge['end'], occupied_slots[j]['end'])
-                    else:
-                        merged_occupied.append(current_merge)
-                        current_merge = occupied_slots[j]
-                merged_occupied.append(current_merge)
-
-            current_time = day_start_limit
-            while current_time + timedelta(minutes=duration_minutes) <= day_end_limit:
-                is_free = True
-                proposed_end_time = current_time + timedelta(minutes=duration_minutes)
-            
-                for occupied in merged_occupied:
-                    if current_time < occupied['end'] and proposed_end_time > occupied['start']:
-                        is_free = False
-                        current_time = occupied['end']
-                        break
-            
-                if is_free:
-                    if current_time >= day_start_limit and proposed_end_time <= day_end_limit:
-                        suggested_slots.append({
-                            "start": {"dateTime": current_time.isoformat()},
-                            "end": {"dateTime": proposed_end_time.isoformat()}
-                        })
-                    current_time += timedelta(minutes=15)
-
-                if len(suggested_slots) >= 5:
-                    return suggested_slots
-    
-        return suggested_slots
+            busy_by_email = busy_intervals(free_busy_info, all_emails, self.pune_timezone)
+            # Optional attendees do not narrow the search, but time outside their working hours counts against a slot
+            for email in optional_emails:
+                off_hours = complement_intervals(working_intervals_utc(self._working_profile(email), windows[0][0], windows[-1][1]),
+                                                 windows[0][0], windows[-1][1])
+                busy_by_email[email] = merge_intervals(busy_by_email[email] + off_hours)
+
+            for slot in best_slots(windows, duration, busy_by_email, participant_emails, optional_emails,
+                                   preferred_start=preferred_start, granularity=granularity,
+                                   top_k=top_k - yielded if top_k is not None else None):
+                if slot["required_conflicts"]:
+                    held_back.append(slot)
+                else:
+                    yielded += 1
+                    yield self._format_slot(slot)
+            if top_k is not None and yielded >= top_k:
+                return
+
+        held_back.sort(key=lambda slot: (-slot["score"], slot["start"]))
+        for slot in held_back[:top_k - yielded if top_k is not None else None]:
+            yield self._format_slot(slot)
+
+    def _working_profile(self, email: str) -> dict:
+        """Returns a contact's time zone and working hours, falling back to the organizer's defaults."""
+        contact = self.directory_api.get_user_by_email(email) or {}
+        working_hours = contact.get('workingHours') or {}
+        return {
+            "timeZone": contact.get('timeZone') or self.pune_timezone.zone,
+            "start": datetime.strptime(working_hours['start'], '%H:%M').time() if working_hours.get('start') else self.working_hours_start,
+            "end": datetime.strptime(working_hours['end'], '%H:%M').time() if working_hours.get('end') else self.working_hours_end,
+            "days": set(working_hours['days']) if working_hours.get('days') is not None else None
+        }
+
+    def _feasible_windows(self, emails: list, range_start: datetime, range_end: datetime) -> list:
+        """
+        Intersects the working hours of the organizer and the given attendees within a range, as UTC interval sets,
+        and returns the result in the organizer's time zone.
+        """
+        feasible = [(range_start.astimezone(pytz.utc), range_end.astimezone(pytz.utc))]
+        for email in dict.fromkeys([self.user_email] + emails):
+            feasible = intersect_intervals(feasible, working_intervals_utc(self._working_profile(email), range_start, range_end))
+            if not feasible:
+                break
+        return [(start.astimezone(self.pune_timezone), end.astimezone(self.pune_timezone)) for start, end in feasible]
+
+    def _search_horizon_steps(self) -> list:
+        """Cumulative search horizons in days: 1, 3, 7, 14, then doubling, capped at the maximum horizon."""
+        steps = [horizon_days for horizon_days in SEARCH_HORIZON_STEPS_DAYS if horizon_days < self.max_search_horizon_days]
+        horizon_days = SEARCH_HORIZON_STEPS_DAYS[-1] * 2
+        while horizon_days < self.max_search_horizon_days:
+            steps.append(horizon_days)
+            horizon_days *= 2
+        steps.append(self.max_search_horizon_days)
+        return steps
+
+    def _format_slot(self, slot: dict) -> dict:
+        return {
+            "start": {"dateTime": slot["start"].isoformat()},
+            "end": {"dateTime": slot["end"].isoformat()},
+            "score": slot["score"],
+            "all_required_available": not slot["required_conflicts"],
+            "conflicts": slot["required_conflicts"] + slot["optional_conflicts"]
+        }
+
+    def _notify_change(self, change: str, event_id: str):
+        for listener in self.change_listeners:
+            try:
+                listener(change, event_id)
+            except Exception as e:
+                logger.exception("A change listener failed for %s %s: %s", change, event_id, e)
+
+    def _send_schedule_confirmation(self, summary: str, attendees_emails: list, start_time: datetime, end_time: datetime,
+                                    description: str, event_result: dict, recurrence: str = None) -> dict:
+        email_subject = f"Meeting Confirmation: {summary}"
+        repeats_line = f"Repeats: {recurrence}\n" if recurrence else ""
+        email_body = f"Hi,\n\nYour meeting '{summary}' has been scheduled.\n\n" \
+                        f"Time: {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%H:%M')} ({start_time.strftime('%Z')})\n" \
+                        f"{repeats_line}" \
+                        f"Attendees: {', '.join(attendees_emails)}\n" \
+                        f"Description: {description or 'N/A'}\n" \
+                        f"Calendar Link: {event_result['htmlLink']}\n" \
+                        f"Meet Link: {event_result['meetLink'] or 'N/A'}\n\n" \
+                        "Thank you."
+
+        return self.gmail_api.send_email(to_emails=attendees_emails, subject=email_subject, message_text=email_body)
 
     def schedule_meeting(self, summary: str, attendees_emails: list, start_time_iso: str, end_time_iso: str, description: str = "") -> dict:
         try:
@@ -350,16 +700,8 @@ class MeetingAgent:
             )
         
             if event_result and event_result.get("htmlLink"):
-                email_subject = f"Meeting Confirmation: {summary}"
-                email_body = f"Hi,\n\nYour meeting '{summary}' has been scheduled.\n\n" \
-                                f"Time: {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%H:%M')} ({start_time.strftime('%Z')})\n" \
-                                f"Attendees: {', '.join(attendees_emails)}\n" \
-                                f"Description: {description or 'N/A'}\n" \
-                                f"Calendar Link: {event_result['htmlLink']}\n" \
-                                f"Meet Link: {event_result['meetLink'] or 'N/A'}\n\n" \
-                                "Thank you."
-            
-                self.gmail_api.send_email(to_emails=attendees_emails, subject=email_subject, message_text=email_body)
+                self._notify_change("created", event_result['id'])
+                self._send_schedule_confirmation(summary, attendees_emails, start_time, end_time, description, event_result)
 
                 return {"status": "success", "message": f"Meeting scheduled and email sent!",
                         "calendar_link": event_result['htmlLink'], "meet_link": event_result['meetLink'],
@@ -367,191 +709,75 @@ class MeetingAgent:
             else:
                 return {"status": "error", "message": event_result.get("error", "Failed to create calendar event. Unknown error.")}
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error scheduling meeting: %s", e)
             return {"status": "error", "message": f"Error scheduling meeting: {e}"}
 
-    def update_meeting(self, event_id: str, summary: str = None, attendees_emails: list = None,
-                       start_time_iso: str = None, end_time_iso: str = None, description: str = None, dry_run: bool = False) -> dict:
-        try:
-            start_time = datetime.fromisoformat(start_time_iso).astimezone(self.pune_timezone) if start_time_iso else None
-            end_time = datetime.fromisoformat(end_time_iso).astimezone(self.pune_timezone) if end_time_iso else None
-            
-            if dry_run and start_time and end_time:
-                if not attendees_emails:
-                    original_event = self.calendar_api.get_event(event_id)
-                    if not original_event:
-                        return {"status": "error", "message": "Original event not found for dry run."}
-                    attendees_emails = [a.get('email', '') for a in original_event.get('attendees', []) if 'email' in a]
-
-                free_busy = self.calendar_api.get_free_busy(attendees_emails, start_time, end_time)
-                
-                is_available = True
-                for email in attendees_emails:
-                    if email in free_busy and free_busy[email].get('busy'):
-                        is_available = False
-                        break
-                        
-                if is_available:
-                    return {"status": "success", "message": "Proposed time is available."}
-                else:
-                    duration_minutes = int((end_time - start_time).total_seconds() / 60)
-                    suggested_slots = self._find_suggested_slots(
-                        attendees_emails,
-                        duration_minutes,
-                        start_time
-                    )
-                    return {
-                        "status": "conflict",
-                        "message": "The proposed time is busy. Here are some alternative slots.",
-                        "suggested_slots": suggested_slots
-                    }
-
-            event_result = self.calendar_api.update_event(
-                event_id=event_id,
-                summary=summary,
-                start_time=start_time,
-                end_time=end_time,
-                attendees_emails=attendees_emails,
-                description=description
-            )
-            
-            # --- START of new email notification logic ---
-            if event_result and event_result.get("htmlLink"):
-                email_subject = f"Rescheduled: {summary}"
-                email_body = f"Hi,\n\nYour meeting '{summary}' has been successfully rescheduled.\n\n" \
-                                f"New Time: {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%H:%M')} ({start_time.strftime('%Z')})\n" \
-                                f"Attendees: {', '.join(attendees_emails)}\n" \
-                                f"Description: {description or 'N/A'}\n" \
-                                f"Calendar Link: {event_result['htmlLink']}\n" \
-                                f"Meet Link: {event_result['meetLink'] or 'N/A'}\n\n" \
-                                "Thank you."
-                
-                self.gmail_api.send_email(to_emails=attendees_emails, subject=email_subject, message_text=email_body)
-
-                return {"status": "success", "message": f"Meeting updated and email sent!",
-                        "calendar_link": event_result['htmlLink'], "meet_link": event_result['meetLink'],
-                        "event_id": event_result['id']}
-            # --- END of new email notification logic ---
-            else:
-                return {"status": "error", "message": event_result.get("error", "Failed to update calendar event.")}
-        except Exception as e:
-            traceback.print_exc()
-            return {"status": "error", "message": f"Error updating meeting: {e}"}
-
-    def cancel_meeting(self, event_id: str) -> dict:
-        try:
-            result = self.calendar_api.delete_event(event_id)
-            if result.get("status") == "success":
-                return {"status": "success", "message": "Meeting cancelled!"}
-            else:
-                return {"status": "error", "message": result.get("error", "Failed to cancel calendar event.")}
-        except Exception as e:
-            traceback.print_exc()
-            return {"status": "error", "message": f"Error cancelling meeting: {e}"}
-
-    def _find_suggested_slots(self, participant_emails: list, duration_minutes: int, search_start_time: datetime = None) -> list:
-        suggested_slots = []
-        now = datetime.now(self.pune_timezone)
-        
-        search_start_time = search_start_time if search_start_time and search_start_time > now else now
-        
-        # Round up to the next 15-minute interval
-        if search_start_time.minute % 15 != 0:
-            search_start_time = search_start_time + timedelta(minutes=(15 - search_start_time.minute % 15))
-            search_start_time = search_start_time.replace(second=0, microsecond=0)
-
-        for i in range(7):
-            current_day_start = search_start_time + timedelta(days=i)
-            day_start_limit = current_day_start.replace(hour=9, minute=0, second=0, microsecond=0)
-            day_end_limit = current_day_start.replace(hour=17, minute=0, second=0, microsecond=0)
-
-            if current_day_start.date() == now.date() and current_day_start > day_start_limit:
-                day_start_limit = current_day_start
-
-            if day_start_limit >= day_end_limit:
-                continue
+    def check_recurring_availability(self, attendees_emails: list, start_time: datetime, end_time: datetime, recurrence: str) -> dict:
+        """
+        Expands a recurring series in memory and checks every occurrence against one sharded free/busy fetch.
+        The fetched range is widened by most of a week so later weekdays can be scored from the same data.
+        """
+        occurrences = expand_occurrences(recurrence, start_time, end_time - start_time, self.pune_timezone)
+        if not occurrences:
+            return {"occurrences": 0, "conflicts": [], "suggested_series": None}
 
-            free_busy_info = self.calendar_api.get_free_busy(participant_emails, day_start_limit, day_end_limit)
+        free_busy = self.calendar_api.get_free_busy_sharded(attendees_emails, occurrences[0][0], occurrences[-1][1] + timedelta(days=6))
+        if free_busy.get('error'):
+            raise Exception(f"Failed to fetch free/busy for the series: {free_busy['error']}")
 
-            occupied_slots = []
-            for email in participant_emails:
-                for busy_period in free_busy_info.get(email, {}).get('busy', []):
-                    busy_start = datetime.fromisoformat(busy_period['start']).astimezone(self.pune_timezone)
-                    busy_end = datetime.fromisoformat(busy_period['end']).astimezone(self.pune_timezone)
-                    occupied_slots.append({'start': busy_start, 'end': busy_end})
-            
-            occupied_slots.sort(key=lambda x: x['start'])
-            merged_occupied = []
-            if occupied_slots:
-                current_merge = occupied_slots[0]
-                for j in range(1, len(occupied_slots)):
-                    if occupied_slots[j]['start'] <= current_merge['end']:
-                        current_merge['end'] = max(current_merge['end'], occupied_slots[j]['end'])
-                    else:
-                        merged_occupied.append(current_merge)
-                        current_merge = occupied_slots[j]
-                merged_occupied.append(current_merge)
-
-            current_time = day_start_limit
-            while current_time + timedelta(minutes=duration_minutes) <= day_end_limit:
-                is_free = True
-                proposed_end_time = current_time + timedelta(minutes=duration_minutes)
-            
-                for occupied in merged_occupied:
-                    if current_time < occupied['end'] and proposed_end_time > occupied['start']:
-                        is_free = False
-                        current_time = occupied['end']
-                        break
-            
-                if is_free:
-                    if current_time >= day_start_limit and proposed_end_time <= day_end_limit:
-                        suggested_slots.append({
-                            "start": {"dateTime": current_time.isoformat()},
-                            "end": {"dateTime": proposed_end_time.isoformat()}
-                        })
-                    current_time += timedelta(minutes=15)
-
-                if len(suggested_slots) >= 5:
-                    return suggested_slots
-    
-        return suggested_slots
+        busy_by_email = busy_intervals(free_busy, attendees_emails, self.pune_timezone)
+        conflicts = occurrence_conflicts(occurrences, busy_by_email)
+        return {
+            "occurrences": len(occurrences),
+            "series_start": occurrences[0][0].isoformat(),
+            "series_end": occurrences[-1][1].isoformat(),
+            "conflicts": conflicts,
+            "suggested_series": best_weekly_slot(recurrence, occurrences, busy_by_email, self.pune_timezone,
+                                                 self.working_hours_start.hour, self.working_hours_end.hour,
+                                                 not_before=datetime.now(self.pune_timezone)) if conflicts else None
+        }
 
-    def schedule_meeting(self, summary: str, attendees_emails: list, start_time_iso: str, end_time_iso: str, description: str = "") -> dict:
+    def schedule_recurring_meeting(self, summary: str, attendees_emails: list, start_time_iso: str, end_time_iso: str,
+                                   recurrence: str, description: str = "", dry_run: bool = False) -> dict:
         try:
             start_time = datetime.fromisoformat(start_time_iso).astimezone(self.pune_timezone)
             end_time = datetime.fromisoformat(end_time_iso).astimezone(self.pune_timezone)
-        
+
             if not attendees_emails or not all(email for email in attendees_emails):
                 raise ValueError("Attendee emails cannot be empty.")
 
+            try:
+                recurrence = normalize_rule(recurrence, self.pune_timezone)
+                series_check = self.check_recurring_availability(attendees_emails, start_time, end_time, recurrence)
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+
+            if dry_run:
+                if series_check["conflicts"]:
+                    return {"status": "conflict", "message": f"{len(series_check['conflicts'])} of {series_check['occurrences']} occurrences are busy.", **series_check}
+                return {"status": "success", "message": "All occurrences are available.", **series_check}
+
             event_result = self.calendar_api.create_event(
                 summary=summary,
                 start_time=start_time,
                 end_time=end_time,
                 attendees_emails=attendees_emails,
-                description=description
+                description=description,
+                recurrence=[recurrence]
             )
-        
+
             if event_result and event_result.get("htmlLink"):
-                email_subject = f"Meeting Confirmation: {summary}"
-                email_body = f"Hi,\n\nYour meeting '{summary}' has been scheduled.\n\n" \
-                                f"Time: {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%H:%M')} ({start_time.strftime('%Z')})\n" \
-                                f"Attendees: {', '.join(attendees_emails)}\n" \
-                                f"Description: {description or 'N/A'}\n" \
-                                f"Calendar Link: {event_result['htmlLink']}\n" \
-                                f"Meet Link: {event_result['meetLink'] or 'N/A'}\n\n" \
-                                "Thank you."
-            
-                self.gmail_api.send_email(to_emails=attendees_emails, subject=email_subject, message_text=email_body)
+                self._notify_change("created", event_result['id'])
+                self._send_schedule_confirmation(summary, attendees_emails, start_time, end_time, description, event_result, recurrence)
 
-                return {"status": "success", "message": f"Meeting scheduled and email sent!",
+                return {"status": "success", "message": f"Recurring meeting scheduled and email sent!",
                         "calendar_link": event_result['htmlLink'], "meet_link": event_result['meetLink'],
-                        "event_id": event_result['id']}
+                        "event_id": event_result['id'], "series_check": series_check}
             else:
-                return {"status": "error", "message": event_result.get("error", "Failed to create calendar event. Unknown error.")}
+                return {"status": "error", "message": event_result.get("error", "Failed to create recurring calendar event. Unknown error.")}
         except Exception as e:
-            traceback.print_exc()
-            return {"status": "error", "message": f"Error scheduling meeting: {e}"}
+            logger.exception("Error scheduling recurring meeting: %s", e)
+            return {"status": "error", "message": f"Error scheduling recurring meeting: {e}"}
 
     def update_meeting(self, event_id: str, summary: str = None, attendees_emails: list = None,
                        start_time_iso: str = None, end_time_iso: str = None, description: str = None, dry_run: bool = False) -> dict:
@@ -600,6 +826,7 @@ class MeetingAgent:
             
             # --- START of new email notification logic ---
             if event_result and event_result.get("htmlLink"):
+                self._notify_change("updated", event_result['id'])
                 email_subject = f"Rescheduled: {summary}"
                 email_body = f"Hi,\n\nYour meeting '{summary}' has been successfully rescheduled.\n\n" \
                                 f"New Time: {start_time.strftime('%Y-%m-%d %H:%M')} to {end_time.strftime('%H:%M')} ({start_time.strftime('%Z')})\n" \
@@ -618,16 +845,225 @@ class MeetingAgent:
             else:
                 return {"status": "error", "message": event_result.get("error", "Failed to update calendar event.")}
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error updating meeting %s: %s", event_id, e)
             return {"status": "error", "message": f"Error updating meeting: {e}"}
 
     def cancel_meeting(self, event_id: str) -> dict:
         try:
             result = self.calendar_api.delete_event(event_id)
             if result.get("status") == "success":
+                self._notify_change("deleted", event_id)
                 return {"status": "success", "message": "Meeting cancelled!"}
             else:
                 return {"status": "error", "message": result.get("error", "Failed to cancel calendar event.")}
         except Exception as e:
-            traceback.print_exc()
-            return {"status": "error", "message": f"Error cancelling meeting: {e}"}
\ No newline at end of file
+            logger.exception("Error cancelling meeting %s: %s", event_id, e)
+            return {"status": "error", "message": f"Error cancelling meeting: {e}"}
+
+    def bulk_schedule_meetings(self, meetings: list) -> dict:
+        """
+        Schedules many meetings with batched calendar requests.
+        Each meeting needs 'summary', 'attendees' (list of emails), 'startTime' and 'endTime', and may set 'description'.
+        Returns per-meeting results and per-meeting errors, indexed by position in the input list.
+        """
+        events = []
+        event_indexes = []
+        errors = []
+        for index, meeting in enumerate(meetings):
+            try:
+                attendees_emails = meeting.get('attendees') or []
+                if not meeting.get('summary') or not attendees_emails or not all(email for email in attendees_emails):
+                    raise ValueError("Summary and attendee emails cannot be empty.")
+                events.append({
+                    "summary": meeting['summary'],
+                    "start_time": datetime.fromisoformat(meeting['startTime']).astimezone(self.pune_timezone),
+                    "end_time": datetime.fromisoformat(meeting['endTime']).astimezone(self.pune_timezone),
+                    "attendees_emails": attendees_emails,
+                    "description": meeting.get('description', '')
+                })
+                event_indexes.append(index)
+            except Exception as e:
+                errors.append({"index": index, "message": f"Invalid meeting: {e}"})
+
+        results = []
+        if events:
+            batch_result = self.calendar_api.batch_create_events(events)
+            for item in batch_result["results"]:
+                event = events[item["index"]]
+                self._notify_change("created", item['id'])
+                self._send_schedule_confirmation(event["summary"], event["attendees_emails"], event["start_time"],
+                                                 event["end_time"], event["description"], item)
+                results.append({"index": event_indexes[item["index"]], "calendar_link": item['htmlLink'],
+                                "meet_link": item['meetLink'], "event_id": item['id']})
+            for item in batch_result["errors"]:
+                errors.append({"index": event_indexes[item["index"]], "message": item["error"]})
+
+        return self._bulk_response(results, errors, "scheduled")
+
+    def bulk_cancel_meetings(self, event_ids: list) -> dict:
+        """Cancels many meetings with batched calendar requests. Returns per-event results and per-event errors."""
+        batch_result = self.calendar_api.batch_delete_events(event_ids)
+        results = [{"index": item["index"], "event_id": item["id"]} for item in batch_result["results"]]
+        for item in results:
+            self._notify_change("deleted", item["event_id"])
+        errors = [{"index": item["index"], "event_id": item["id"], "message": item["error"]} for item in batch_result["errors"]]
+        return self._bulk_response(results, errors, "cancelled")
+
+    def bulk_reschedule_meetings(self, from_date: str, to_date: str, event_ids: list = None, query: str = None,
+                                 search_days: int = 1, dry_run: bool = False) -> dict:
+        """
+        Moves the meetings starting on from_date (all of them, or only those in event_ids or matching query)
+        to to_date or, where that day is full, up to search_days - 1 days after it, keeping each meeting's time
+        of day where possible. The meetings are loaded with one events fetch and every attendee's busy time with
+        one sharded free/busy fetch. New slots are then assigned in memory, most constrained meeting first, and
+        each assigned slot is marked busy for its attendees so the moved meetings cannot collide with each other.
+        The moves are written with batched patches and each attendee gets one email listing all of their moved
+        meetings instead of one per meeting. With dry_run, the plan is returned and nothing is changed.
+        Meetings for which no slot fits every attendee are reported as errors and left where they are.
+        """
+        try:
+            source_day = datetime.strptime(from_date, '%Y-%m-%d').date()
+            target_day = datetime.strptime(to_date, '%Y-%m-%d').date()
+            search_days = int(search_days)
+        except (TypeError, ValueError):
+            return {"status": "error", "message": "fromDate and toDate must be dates in YYYY-MM-DD format and searchDays a number."}
+        if source_day == target_day:
+            return {"status": "error", "message": "fromDate and toDate must be different days."}
+        if search_days < 1:
+            return {"status": "error", "message": "searchDays must be at least 1."}
+
+        now = datetime.now(self.pune_timezone)
+        range_start = max(now, self.pune_timezone.localize(datetime.combine(target_day, time())))
+        range_end = self.pune_timezone.localize(datetime.combine(target_day + timedelta(days=search_days), time()))
+        if range_end <= range_start:
+            return {"status": "error", "message": "Meetings cannot be moved into the past."}
+
+        source_start = self.pune_timezone.localize(datetime.combine(source_day, time()))
+        source_end = self.pune_timezone.localize(datetime.combine(source_day + timedelta(days=1), time()))
+        try:
+            events = self.calendar_api.get_events(time_min=source_start, time_max=source_end, query=query, raise_on_error=True)
+        except Exception as e:
+            logger.exception("Error loading meetings to reschedule from %s: %s", from_date, e)
+            return {"status": "error", "message": f"Error loading meetings: {e}"}
+
+        wanted = set(event_ids) if event_ids else None
+        meetings = []
+        for event in events:
+            if event.get('status') == 'cancelled' or 'dateTime' not in event.get('start', {}):
+                continue
+            if wanted is not None and event['id'] not in wanted:
+                continue
+            start = datetime.fromisoformat(event['start']['dateTime']).astimezone(self.pune_timezone)
+            end = datetime.fromisoformat(event['end']['dateTime']).astimezone(self.pune_timezone)
+            # The listing also returns meetings that started the day before and run into this one
+            if start < source_start:
+                continue
+            attendees = [attendee['email'] for attendee in event.get('attendees', [])
+                         if attendee.get('email') and not attendee.get('resource') and attendee.get('responseStatus') != 'declined']
+            meetings.append({"event_id": event['id'], "summary": event.get('summary', '(no title)'), "start": start, "end": end,
+                             "attendees": list(dict.fromkeys([self.user_email] + attendees))})
+        meetings.sort(key=lambda meeting: meeting["start"])
+        # Every result and error is indexed by the caller's own input: the position in event_ids when given,
+        # otherwise the position among the day's meetings in start order
+        positions = {}
+        for position, event_id in enumerate(event_ids or []):
+            positions.setdefault(event_id, position)
+        for position, meeting in enumerate(meetings):
+            meeting["index"] = positions[meeting["event_id"]] if wanted is not None else position
+
+        errors = []
+        if wanted is not None:
+            found = {meeting["event_id"] for meeting in meetings}
+            errors = [{"index": index, "event_id": event_id, "message": f"No timed meeting with this id on {from_date}."}
+                      for event_id, index in positions.items() if event_id not in found]
+        if not meetings:
+            return self._bulk_response([], errors, "rescheduled")
+
+        all_emails = list(dict.fromkeys(email for meeting in meetings for email in meeting["attendees"]))
+        free_busy_info = self.calendar_api.get_free_busy_sharded(all_emails, range_start, range_end)
+        if free_busy_info.get('error'):
+            return {"status": "error", "message": f"Could not fetch free/busy: {free_busy_info['error']}"}
+        busy_by_email = busy_intervals(free_busy_info, all_emails, self.pune_timezone)
+
+        # Meetings with the most attendees, then the longest, have the fewest options and pick first
+        plan = []
+        granularity = timedelta(minutes=self.slot_granularity_minutes)
+        for meeting in sorted(meetings, key=lambda meeting: (-len(meeting["attendees"]), meeting["start"] - meeting["end"], meeting["start"])):
+            index = meeting["index"]
+            duration = meeting["end"] - meeting["start"]
+            windows = self._feasible_windows(meeting["attendees"], range_start, range_end)
+            preferred_start = self.pune_timezone.localize(datetime.combine(target_day, meeting["start"].time()))
+            slots = best_slots(windows, duration, busy_by_email, meeting["attendees"], [],
+                               preferred_start=preferred_start, granularity=granularity, top_k=1) if windows else []
+            if not slots or slots[0]["required_conflicts"]:
+                conflicts = slots[0]["required_conflicts"] if slots else []
+                errors.append({"index": index, "event_id": meeting["event_id"], "conflicts": conflicts,
+                               "message": f"No slot where every attendee is free within {search_days} day(s) from {to_date}."})
+                continue
+            slot = slots[0]
+            for email in meeting["attendees"]:
+                busy_by_email[email] = merge_intervals(busy_by_email.get(email, []) + [(slot["start"], slot["end"])])
+            plan.append((index, meeting, slot["start"], slot["end"]))
+        plan.sort(key=lambda item: item[0])
+
+        if dry_run:
+            results = [{"index": index, "event_id": meeting["event_id"], "summary": meeting["summary"],
+                        "old_start": meeting["start"].isoformat(), "new_start": new_start.isoformat(), "new_end": new_end.isoformat()}
+                       for index, meeting, new_start, new_end in plan]
+            response = self._bulk_response(results, errors, "can be rescheduled")
+            response["dry_run"] = True
+            return response
+
+        results = []
+        moved_by_email = {}
+        if plan:
+            # Google's own per-event update emails are turned off; attendees get the single summary below instead
+            batch_result = self.calendar_api.batch_update_events(
+                [{"event_id": meeting["event_id"], "start_time": new_start, "end_time": new_end} for _, meeting, new_start, new_end in plan],
+                send_notifications=False)
+            for item in batch_result["results"]:
+                index, meeting, new_start, new_end = plan[item["index"]]
+                self._notify_change("updated", item['id'])
+                results.append({"index": index, "event_id": item['id'], "summary": meeting["summary"],
+                                "old_start": meeting["start"].isoformat(), "new_start": new_start.isoformat(),
+                                "new_end": new_end.isoformat(), "calendar_link": item['htmlLink']})
+                for email in meeting["attendees"]:
+                    moved_by_email.setdefault(email, []).append((meeting, new_start, new_end, item['htmlLink']))
+            for item in batch_result["errors"]:
+                index, meeting, _, _ = plan[item["index"]]
+                errors.append({"index": index, "event_id": meeting["event_id"], "message": item["error"]})
+
+        notifications = {"sent": 0, "failed": 0}
+        for email, moves in moved_by_email.items():
+            outcome = self._send_reschedule_summary(email, moves)
+            notifications["sent" if outcome.get("status") == "success" else "failed"] += 1
+
+        response = self._bulk_response(results, errors, "rescheduled")
+        response["notifications"] = notifications
+        return response
+
+    def _send_reschedule_summary(self, email: str, moves: list) -> dict:
+        """Sends one attendee a single email listing every meeting of theirs that was moved."""
+        lines = [f"- '{meeting['summary']}': {meeting['start'].strftime('%Y-%m-%d %H:%M')} -> "
+                 f"{new_start.strftime('%Y-%m-%d %H:%M')} to {new_end.strftime('%H:%M')} ({new_start.strftime('%Z')})\n"
+                 f"  Calendar Link: {link}"
+                 for meeting, new_start, new_end, link in moves]
+        email_subject = f"Meetings Rescheduled: {len(moves)} meeting(s) moved"
+        email_body = "Hi,\n\nThe following meetings have been rescheduled.\n\n" + "\n".join(lines) + "\n\nThank you."
+        try:
+            return self.gmail_api.send_email(to_emails=[email], subject=email_subject, message_text=email_body)
+        except Exception as e:
+            logger.warning("Could not send the reschedule summary to %s: %s", email, e)
+            return {"status": "error", "message": str(e)}
+
+    def _bulk_response(self, results: list, errors: list, verb: str) -> dict:
+        results.sort(key=lambda item: item["index"])
+        errors.sort(key=lambda item: item["index"])
+        if not errors:
+            status = "success"
+        elif results:
+            status = "partial"
+        else:
+            status = "error"
+        return {"status": status, "message": f"{len(results)} meeting(s) {verb}, {len(errors)} failed.",
+                "results": results, "errors": errors}
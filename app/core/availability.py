@@ -0,0 +1,108 @@
+# app/core/availability.py
+from bisect import bisect_left
+from datetime import datetime, date, time, timedelta
+from functools import lru_cache
+
+import pytz
+
+
+def merge_intervals(intervals: list) -> list:
+    """Merges (start, end) tuples into a sorted list of non-overlapping intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def busy_intervals(free_busy: dict, emails: list, tz) -> dict:
+    """
+    Converts a free/busy response into merged busy intervals per attendee, localized to tz.
+    Attendees missing from the response are treated as free.
+    """
+    intervals = {}
+    for email in emails:
+        periods = free_busy.get(email, {}).get('busy', [])
+        intervals[email] = merge_intervals([
+            (datetime.fromisoformat(period['start']).astimezone(tz), datetime.fromisoformat(period['end']).astimezone(tz))
+            for period in periods
+        ])
+    return intervals
+
+
+def overlaps(merged: list, start: datetime, end: datetime) -> bool:
+    """Returns True if [start, end) intersects any interval of a merged, sorted interval list."""
+    # Index of the first interval starting at or after `end`; only its predecessor can overlap.
+    i = bisect_left(merged, (end,))
+    return i > 0 and merged[i - 1][1] > start
+
+
+def intersect_intervals(first: list, second: list) -> list:
+    """Intersects two merged, sorted interval lists."""
+    result = []
+    i = j = 0
+    while i < len(first) and j < len(second):
+        start = max(first[i][0], second[j][0])
+        end = min(first[i][1], second[j][1])
+        if start < end:
+            result.append((start, end))
+        if first[i][1] < second[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def complement_intervals(merged: list, range_start: datetime, range_end: datetime) -> list:
+    """Returns the gaps between merged intervals within [range_start, range_end)."""
+    gaps = []
+    cursor = range_start
+    for start, end in merged:
+        if start > cursor:
+            gaps.append((cursor, min(start, range_end)))
+        cursor = max(cursor, end)
+        if cursor >= range_end:
+            break
+    if cursor < range_end:
+        gaps.append((cursor, range_end))
+    return [(start, end) for start, end in gaps if start < end]
+
+
+@lru_cache(maxsize=8192)
+def working_window_utc(tz_name: str, day: date, start: time, end: time) -> tuple:
+    """
+    Converts one local working day to a UTC interval. Cached because the same people and days
+    come up again and again across requests and search windows. An end at or before the start
+    means the working day runs past midnight.
+    """
+    tz = pytz.timezone(tz_name)
+    end_day = day if end > start else day + timedelta(days=1)
+    return (tz.localize(datetime.combine(day, start)).astimezone(pytz.utc),
+            tz.localize(datetime.combine(end_day, end)).astimezone(pytz.utc))
+
+
+def working_intervals_utc(profile: dict, range_start: datetime, range_end: datetime) -> list:
+    """
+    Returns someone's working hours within [range_start, range_end) as merged UTC intervals.
+    A profile has 'timeZone', 'start' and 'end' (datetime.time) and optionally 'days' (weekday numbers, Monday is 0).
+    """
+    tz = pytz.timezone(profile['timeZone'])
+    range_start_utc = range_start.astimezone(pytz.utc)
+    range_end_utc = range_end.astimezone(pytz.utc)
+    working_days = profile.get('days')
+
+    intervals = []
+    # Start a day early so a working day that began before range_start in local time is included
+    day = range_start_utc.astimezone(tz).date() - timedelta(days=1)
+    last_day = range_end_utc.astimezone(tz).date()
+    while day <= last_day:
+        if working_days is None or day.weekday() in working_days:
+            start, end = working_window_utc(profile['timeZone'], day, profile['start'], profile['end'])
+            start, end = max(start, range_start_utc), min(end, range_end_utc)
+            if start < end:
+                intervals.append((start, end))
+        day += timedelta(days=1)
+    return merge_intervals(intervals)
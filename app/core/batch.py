@@ -0,0 +1,89 @@
+# app/core/batch.py
+import threading
+
+from app.core.metrics import cache_lookup
+
+
+class FreeBusyMemo:
+    def __init__(self, calendar_api):
+        """
+        Wraps a GoogleCalendarAPI for the length of one batch so that free/busy for the same attendee
+        and time range is fetched only once, even when several queries of the batch ask for it at the same time.
+        Every other attribute is passed through to the wrapped client.
+        """
+        self._calendar_api = calendar_api
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._in_flight = {}
+        self.fetched = 0
+        self.reused = 0
+
+    def __getattr__(self, name):
+        return getattr(self._calendar_api, name)
+
+    def get_free_busy(self, emails: list, time_min, time_max) -> dict:
+        return self._fetch(self._calendar_api.get_free_busy, 'single', emails, time_min, time_max)
+
+    def get_free_busy_sharded(self, emails: list, time_min, time_max) -> dict:
+        return self._fetch(self._calendar_api.get_free_busy_sharded, 'sharded', emails, time_min, time_max)
+
+    def _fetch(self, fetch, kind: str, emails: list, time_min, time_max) -> dict:
+        keys = {email: (kind, email, time_min, time_max) for email in emails}
+
+        with self._lock:
+            to_fetch = [email for email, key in keys.items() if key not in self._cache and key not in self._in_flight]
+            for email in to_fetch:
+                self._in_flight[keys[email]] = threading.Event()
+            waiting_on = [self._in_flight[key] for email, key in keys.items() if key in self._in_flight and email not in to_fetch]
+            self.fetched += len(to_fetch)
+            self.reused += len(emails) - len(to_fetch)
+        cache_lookup('batch_free_busy', False, len(to_fetch))
+        cache_lookup('batch_free_busy', True, len(emails) - len(to_fetch))
+
+        result = {}
+        try:
+            if to_fetch:
+                result = fetch(to_fetch, time_min, time_max)
+                if not result.get('error'):
+                    with self._lock:
+                        for email in to_fetch:
+                            self._cache[keys[email]] = result.get(email, {'busy': []})
+        finally:
+            with self._lock:
+                for email in to_fetch:
+                    self._in_flight.pop(keys[email]).set()
+
+        if result.get('error'):
+            return result
+
+        for event in waiting_on:
+            event.wait()
+
+        with self._lock:
+            missing = [email for email, key in keys.items() if key not in self._cache]
+        # Another query's fetch of these attendees failed; fetch them directly rather than fail this query
+        if missing:
+            retried = fetch(missing, time_min, time_max)
+            if retried.get('error'):
+                return retried
+            with self._lock:
+                for email in missing:
+                    self._cache[keys[email]] = retried.get(email, {'busy': []})
+
+        with self._lock:
+            return {email: self._cache[key] for email, key in keys.items()}
+
+
+class BatchScope:
+    def __init__(self, directory_api, calendar_api):
+        """Holds what queries of one batch share: resolved participants, contact indexes and a free/busy memo."""
+        self.participants = {}
+        self.calendar_api = FreeBusyMemo(calendar_api)
+        self.contacts_by_name, self.contacts_by_email = directory_api.contact_indexes()
+
+    def stats(self) -> dict:
+        return {
+            "participants_resolved": len(self.participants),
+            "free_busy_fetched": self.calendar_api.fetched,
+            "free_busy_reused": self.calendar_api.reused
+        }
@@ -1,40 +1,116 @@
-import os
+import logging
+import uuid
 import datetime
-from google.oauth2.credentials import Credentials
+import threading
+import time
+from collections import OrderedDict
 from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import pytz
 
+from app.core.credentials import CredentialManager
+from app.core.resilience import ResilientCaller, CircuitOpen, is_transient
+from app.core.throttle import SingleFlight
+from app.core.metrics import cache_lookup, outbound_call
+from app.core.capture import record_batch_item, record_call
+
+logger = logging.getLogger(__name__)
+
 SCOPES = ['https://www.googleapis.com/auth/calendar.events', 'https://www.googleapis.com/auth/calendar.readonly']
 
+# Google recommends at most 50 calls per Calendar batch request
+BATCH_LIMIT = 50
+# A single free/busy query covers at most 50 calendars; long ranges are split into windows of this size
+FREEBUSY_MAX_CALENDARS = 50
+FREEBUSY_MAX_SPAN = datetime.timedelta(days=31)
+# Busy data kept per attendee to answer free/busy queries while Calendar is failing
+BUSY_CACHE_SIZE = 1000
+BUSY_CACHE_MAX_AGE_SECONDS = 900
+
 class GoogleCalendarAPI:
-    def __init__(self, user_email: str, oauth_client_secrets_path: str = None, token_path: str = 'token_personal_calendar.json'):
+    def __init__(self, user_email: str, oauth_client_secrets_path: str = None, token_path: str = 'token_personal_calendar.json',
+                 credential_manager: CredentialManager = None, timezone: str = 'Asia/Kolkata'):
         self.user_email = user_email
         self.creds = None
         self.oauth_client_secrets_path = oauth_client_secrets_path
         self.token_path = token_path
+        self.credential_manager = credential_manager if credential_manager else CredentialManager()
         self._authenticate()
         self.service = build('calendar', 'v3', credentials=self.creds)
-        self.pune_timezone = pytz.timezone('Asia/Kolkata')
+        self.http_pool = self.credential_manager.http_pool
+        self.pune_timezone = pytz.timezone(timezone)
+        self.resilience = ResilientCaller('calendar')
+        self.rate_limiter = self.credential_manager.rate_limiters['calendar']
+        self.single_flight = SingleFlight('calendar_coalescing')
+        self._busy_cache = OrderedDict()
+        self._busy_cache_lock = threading.Lock()
 
     def _authenticate(self):
-        if os.path.exists(self.token_path):
-            self.creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
-        
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                try:
-                    self.creds.refresh(Request())
-                except Exception as e:
-                    raise Exception(f"Failed to refresh calendar token. Please re-authenticate. Error: {e}")
-            else:
-                raise Exception(
-                    f"Calendar token not found or is invalid. Please run the separate authentication script to generate a new token."
-                )
+        try:
+            self.creds = self.credential_manager.load(self.token_path, SCOPES)
+        except Exception as e:
+            raise Exception(f"Failed to refresh calendar token. Please re-authenticate. Error: {e}")
+
+        if not self.creds:
+            raise Exception(
+                f"Calendar token not found or is invalid. Please run the separate authentication script to generate a new token."
+            )
+
+    def _execute(self, request, idempotent: bool = True, cost: int = 1):
+        """
+        Runs a Google API request on a connection checked out from the shared pool, behind the Calendar circuit breaker.
+        Every attempt takes `cost` tokens from the Calendar rate limiter, one per call a batch request carries.
+        """
+        return self.resilience.call(self._send, request, cost, idempotent=idempotent)
+
+    def _send(self, request, cost: int):
+        self.rate_limiter.acquire(cost)
+        # Batch requests have no methodId of their own
+        operation = getattr(request, 'methodId', None) or 'batch'
+        with outbound_call('calendar', operation):
+            return record_call('calendar', operation, lambda: self.http_pool.execute(request, self.creds))
+
+    def _remember_busy(self, calendars: dict, time_min: datetime.datetime, time_max: datetime.datetime):
+        """Keeps the latest complete free/busy answer per attendee, for use while Calendar is failing."""
+        with self._busy_cache_lock:
+            for email, calendar in calendars.items():
+                if calendar.get('errors'):
+                    continue
+                self._busy_cache[email] = (time_min, time_max, calendar.get('busy', []), time.monotonic())
+                self._busy_cache.move_to_end(email)
+            while len(self._busy_cache) > BUSY_CACHE_SIZE:
+                self._busy_cache.popitem(last=False)
+
+    def _cached_free_busy(self, emails: list, time_min: datetime.datetime, time_max: datetime.datetime, error: Exception) -> dict:
+        """
+        Answers a failed free/busy query from recently fetched busy data when every attendee's cached range
+        covers the query. Otherwise returns the error.
+        """
+        if isinstance(error, CircuitOpen) or is_transient(error):
+            calendars = {}
+            with self._busy_cache_lock:
+                for email in emails:
+                    cached = self._busy_cache.get(email)
+                    if not cached or cached[0] > time_min or cached[1] < time_max or time.monotonic() - cached[3] > BUSY_CACHE_MAX_AGE_SECONDS:
+                        break
+                    calendars[email] = {'busy': [period for period in cached[2]
+                                                 if datetime.datetime.fromisoformat(period['start']) < time_max
+                                                 and datetime.datetime.fromisoformat(period['end']) > time_min],
+                                        'cached': True}
+                else:
+                    logger.warning("Calendar is unavailable (%s); answering free/busy from cached data.", error)
+                    cache_lookup('free_busy_fallback', True)
+                    return calendars
+            cache_lookup('free_busy_fallback', False)
+        return {'error': str(error)}
 
     def get_free_busy(self, emails: list, time_min: datetime.datetime, time_max: datetime.datetime) -> dict:
+        """Fetches free/busy in one query. Identical concurrent calls share one request."""
+        key = ('free_busy', tuple(emails), time_min.astimezone(pytz.utc), time_max.astimezone(pytz.utc))
+        return self.single_flight.do(key, lambda: self._get_free_busy(emails, time_min, time_max))
+
+    def _get_free_busy(self, emails: list, time_min: datetime.datetime, time_max: datetime.datetime) -> dict:
         try:
             time_min_utc = time_min.astimezone(pytz.utc).isoformat()
             time_max_utc = time_max.astimezone(pytz.utc).isoformat()
@@ -44,57 +120,115 @@ class GoogleCalendarAPI:
                 "timeMax": time_max_utc,
                 "items": [{"id": email} for email in emails]
             }
-            free_busy_result = self.service.freebusy().query(body=body).execute()
-            return free_busy_result.get('calendars', {})
+            free_busy_result = self._execute(self.service.freebusy().query(body=body))
+            calendars = free_busy_result.get('calendars', {})
+            self._remember_busy(calendars, time_min, time_max)
+            return calendars
         except HttpError as error:
-            print(f"An error occurred while fetching free/busy: {error}")
-            return {'error': str(error)}
+            logger.error("An error occurred while fetching free/busy: %s", error)
+            return self._cached_free_busy(emails, time_min, time_max, error)
+        except Exception as e:
+            logger.exception("An unexpected error occurred in get_free_busy: %s", e)
+            return self._cached_free_busy(emails, time_min, time_max, e)
+
+    def get_free_busy_sharded(self, emails: list, time_min: datetime.datetime, time_max: datetime.datetime) -> dict:
+        """
+        Fetches free/busy for any number of calendars over any time span in one batched HTTP request.
+        The query is sharded into groups of FREEBUSY_MAX_CALENDARS calendars and FREEBUSY_MAX_SPAN windows,
+        and the busy periods of each calendar are stitched back together. Identical concurrent calls share one request.
+        """
+        key = ('free_busy_sharded', tuple(emails), time_min.astimezone(pytz.utc), time_max.astimezone(pytz.utc))
+        return self.single_flight.do(key, lambda: self._get_free_busy_sharded(emails, time_min, time_max))
+
+    def _get_free_busy_sharded(self, emails: list, time_min: datetime.datetime, time_max: datetime.datetime) -> dict:
+        shards = []
+        shard_emails = []
+        window_start = time_min
+        while window_start < time_max:
+            window_end = min(window_start + FREEBUSY_MAX_SPAN, time_max)
+            for offset in range(0, len(emails), FREEBUSY_MAX_CALENDARS):
+                shard_emails.append(emails[offset:offset + FREEBUSY_MAX_CALENDARS])
+                shards.append(self.service.freebusy().query(body={
+                    "timeMin": window_start.astimezone(pytz.utc).isoformat(),
+                    "timeMax": window_end.astimezone(pytz.utc).isoformat(),
+                    "items": [{"id": email} for email in emails[offset:offset + FREEBUSY_MAX_CALENDARS]]
+                }))
+            window_start = window_end
+
+        calendars = {email: {'busy': []} for email in emails}
+        try:
+            responses, errors = self._execute_batch(shards)
         except Exception as e:
-            print(f"An unexpected error occurred in get_free_busy: {e}")
-            return {'error': str(e)}
+            logger.exception("An unexpected error occurred in get_free_busy_sharded: %s", e)
+            return self._cached_free_busy(emails, time_min, time_max, e)
+
+        if errors and not responses:
+            return self._cached_free_busy(emails, time_min, time_max, next(iter(errors.values())))
+        for i in sorted(responses):
+            for email, calendar in responses[i].get('calendars', {}).items():
+                entry = calendars.setdefault(email, {'busy': []})
+                entry['busy'].extend(calendar.get('busy', []))
+                if calendar.get('errors'):
+                    entry.setdefault('errors', []).extend(calendar['errors'])
+        for i in sorted(errors):
+            logger.warning("A free/busy shard failed: %s", errors[i])
+            for email in shard_emails[i]:
+                calendars[email].setdefault('errors', []).append({'reason': str(errors[i])})
+        self._remember_busy(calendars, time_min, time_max)
+        return calendars
+
+    def _build_event_body(self, summary: str, start_time: datetime.datetime, end_time: datetime.datetime,
+                          attendees_emails: list, description: str = "", recurrence: list = None) -> dict:
+        event = {
+            'summary': summary,
+            'description': description,
+            'start': {
+                'dateTime': start_time.isoformat(),
+                'timeZone': str(self.pune_timezone),
+            },
+            'end': {
+                'dateTime': end_time.isoformat(),
+                'timeZone': str(self.pune_timezone),
+            },
+            'attendees': [{'email': email} for email in attendees_emails],
+            'reminders': {'useDefault': True},
+            # A fresh requestId per event; a reused one makes Google return the conference of an earlier event
+            'conferenceData': {'createRequest': {'requestId': uuid.uuid4().hex, 'conferenceSolutionKey': {'type': 'hangoutsMeet'}}},
+        }
+        if recurrence:
+            event['recurrence'] = recurrence
+        return event
+
+    def _event_links(self, event: dict) -> dict:
+        meet_link = next((entry_point.get('uri') for entry_point in event.get('conferenceData', {}).get('entryPoints', []) if entry_point.get('entryPointType') == 'video'), None)
+        return {
+            "htmlLink": event['htmlLink'],
+            "meetLink": meet_link,
+            "id": event['id']
+        }
 
     def create_event(self, summary: str, start_time: datetime.datetime, end_time: datetime.datetime,
-                     attendees_emails: list, description: str = "", conference_data_version: int = 1) -> dict:
+                     attendees_emails: list, description: str = "", conference_data_version: int = 1, recurrence: list = None) -> dict:
         try:
-            event = {
-                'summary': summary,
-                'description': description,
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': str(self.pune_timezone),
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': str(self.pune_timezone),
-                },
-                'attendees': [{'email': email} for email in attendees_emails],
-                'reminders': {'useDefault': True},
-                'conferenceData': {'createRequest': {'requestId': 'meeting-assist-req', 'conferenceSolutionKey': {'type': 'hangoutsMeet'}}},
-            }
-            event = self.service.events().insert(calendarId='primary', body=event, conferenceDataVersion=conference_data_version, sendNotifications=True).execute()
-        
-            meet_link = next((entry_point.get('uri') for entry_point in event.get('conferenceData', {}).get('entryPoints', []) if entry_point.get('entryPointType') == 'video'), None)
-            
-            return {
-                "htmlLink": event['htmlLink'],
-                "meetLink": meet_link,
-                "id": event['id']
-            }
+            event = self._build_event_body(summary, start_time, end_time, attendees_emails, description, recurrence)
+            event = self._execute(self.service.events().insert(calendarId='primary', body=event, conferenceDataVersion=conference_data_version, sendNotifications=True),
+                                  idempotent=False)
+            return self._event_links(event)
         except HttpError as error:
-            print(f"An error occurred while creating event: {error}")
+            logger.error("An error occurred while creating event: %s", error)
             return {"htmlLink": None, "meetLink": None, "id": None, "error": str(error)}
         except Exception as e:
-            print(f"An unexpected error occurred in create_event: {e}")
+            logger.exception("An unexpected error occurred in create_event: %s", e)
             return {"htmlLink": None, "meetLink": None, "id": None, "error": str(e)}
 
     def get_event(self, event_id: str) -> dict:
         try:
-            return self.service.events().get(calendarId='primary', eventId=event_id).execute()
+            return self._execute(self.service.events().get(calendarId='primary', eventId=event_id))
         except HttpError as error:
-            print(f"An error occurred while fetching event {event_id}: {error}")
+            logger.error("An error occurred while fetching event %s: %s", event_id, error)
             return None
         except Exception as e:
-            print(f"An unexpected error occurred in get_event: {e}")
+            logger.exception("An unexpected error occurred in get_event: %s", e)
             return None
 
     def update_event(self, event_id: str, summary: str = None, start_time: datetime.datetime = None,
@@ -116,51 +250,167 @@ class GoogleCalendarAPI:
             if description is not None:
                 event['description'] = description
 
-            updated_event = self.service.events().update(calendarId='primary', eventId=event_id, body=event, sendNotifications=True).execute()
-            
-            meet_link = next((entry_point.get('uri') for entry_point in updated_event.get('conferenceData', {}).get('entryPoints', []) if entry_point.get('entryPointType') == 'video'), None)
-
-            return {
-                "htmlLink": updated_event['htmlLink'],
-                "meetLink": meet_link,
-                "id": updated_event['id']
-            }
+            updated_event = self._execute(self.service.events().update(calendarId='primary', eventId=event_id, body=event, sendNotifications=True))
+            return self._event_links(updated_event)
         except HttpError as error:
-            print(f"An error occurred while updating event: {error}")
+            logger.error("An error occurred while updating event: %s", error)
             return {"htmlLink": None, "meetLink": None, "id": None, "error": str(error)}
         except Exception as e:
-            print(f"An unexpected error occurred in update_event: {e}")
+            logger.exception("An unexpected error occurred in update_event: %s", e)
             return {"htmlLink": None, "meetLink": None, "id": None, "error": str(e)}
 
     def delete_event(self, event_id: str) -> dict:
         try:
-            self.service.events().delete(calendarId='primary', eventId=event_id, sendNotifications=True).execute()
+            self._execute(self.service.events().delete(calendarId='primary', eventId=event_id, sendNotifications=True))
             return {"status": "success"}
         except HttpError as error:
-            print(f"An error occurred while deleting event: {error}")
+            logger.error("An error occurred while deleting event: %s", error)
             return {"status": "error", "error": str(error)}
         except Exception as e:
-            print(f"An unexpected error occurred in delete_event: {e}")
+            logger.exception("An unexpected error occurred in delete_event: %s", e)
             return {"status": "error", "error": str(e)}
     
-    def get_events(self, time_min: datetime.datetime = None, time_max: datetime.datetime = None, query: str = None) -> list:
+    def _execute_batch(self, requests: list, idempotent: bool = True) -> tuple:
+        """
+        Packs requests into multipart batch calls of at most BATCH_LIMIT items each.
+        Returns (responses, errors), both keyed by the index of the request in the input list.
+        Errors are the exceptions themselves.
+        """
+        responses = {}
+        errors = {}
+
+        def callback(request_id, response, exception):
+            record_batch_item(request_id, response, exception)
+            if exception is not None:
+                errors[int(request_id)] = exception
+            else:
+                responses[int(request_id)] = response
+
+        for offset in range(0, len(requests), BATCH_LIMIT):
+            chunk = requests[offset:offset + BATCH_LIMIT]
+            batch = self.service.new_batch_http_request(callback=callback)
+            for i, req in enumerate(chunk):
+                batch.add(req, request_id=str(offset + i))
+            try:
+                self._execute(batch, idempotent=idempotent, cost=len(chunk))
+            except Exception as e:
+                logger.error("An error occurred while executing a batch of %d requests: %s", len(chunk), e)
+                for i in range(offset, offset + len(chunk)):
+                    if i not in responses:
+                        errors.setdefault(i, e)
+
+        return responses, errors
+
+    def batch_create_events(self, events: list, conference_data_version: int = 1) -> dict:
+        """
+        Creates many events with batched HTTP requests.
+        Each item needs 'summary', 'start_time', 'end_time' and 'attendees_emails', and may set 'description'.
+        """
+        requests = []
+        for event in events:
+            body = self._build_event_body(event['summary'], event['start_time'], event['end_time'],
+                                          event['attendees_emails'], event.get('description', ""))
+            requests.append(self.service.events().insert(calendarId='primary', body=body, conferenceDataVersion=conference_data_version, sendNotifications=True))
+
+        responses, errors = self._execute_batch(requests, idempotent=False)
+        return {
+            "results": [{"index": i, **self._event_links(responses[i])} for i in sorted(responses)],
+            "errors": [{"index": i, "error": str(errors[i])} for i in sorted(errors)]
+        }
+
+    def batch_update_events(self, updates: list, send_notifications: bool = True) -> dict:
+        """
+        Patches many events with batched HTTP requests, without fetching them first.
+        Each item needs 'event_id' and may set 'summary', 'start_time', 'end_time', 'attendees_emails' and 'description'.
+        With send_notifications off, Google sends no update email per event, for callers that notify attendees themselves.
+        """
+        requests = []
+        for update in updates:
+            body = {}
+            if update.get('summary'): body['summary'] = update['summary']
+            if update.get('start_time'):
+                body['start'] = {'dateTime': update['start_time'].isoformat(), 'timeZone': str(self.pune_timezone)}
+            if update.get('end_time'):
+                body['end'] = {'dateTime': update['end_time'].isoformat(), 'timeZone': str(self.pune_timezone)}
+            if update.get('attendees_emails'):
+                body['attendees'] = [{'email': email} for email in update['attendees_emails']]
+            if update.get('description') is not None:
+                body['description'] = update['description']
+            requests.append(self.service.events().patch(calendarId='primary', eventId=update['event_id'], body=body, sendNotifications=send_notifications))
+
+        responses, errors = self._execute_batch(requests)
+        return {
+            "results": [{"index": i, **self._event_links(responses[i])} for i in sorted(responses)],
+            "errors": [{"index": i, "id": updates[i]['event_id'], "error": str(errors[i])} for i in sorted(errors)]
+        }
+
+    def batch_delete_events(self, event_ids: list) -> dict:
+        """Deletes many events with batched HTTP requests."""
+        requests = [self.service.events().delete(calendarId='primary', eventId=event_id, sendNotifications=True) for event_id in event_ids]
+
+        responses, errors = self._execute_batch(requests)
+        return {
+            "results": [{"index": i, "id": event_ids[i], "status": "success"} for i in sorted(responses)],
+            "errors": [{"index": i, "id": event_ids[i], "error": str(errors[i])} for i in sorted(errors)]
+        }
+
+    def sync_events(self, sync_token: str = None) -> tuple:
+        """
+        Incremental sync of the primary calendar. Without a token, pages through every event to get a starting
+        token; with one, returns only events changed since, including deleted ones (status 'cancelled').
+        Recurring series come back once rather than once per instance, plus any instance edited on its own.
+        Sync tokens cannot be combined with a time range, so the full sync covers the whole calendar history;
+        it is read in the largest pages the API allows.
+        Returns (events, next_sync_token). Errors are raised; an HttpError with status 410 means the token
+        expired and a full sync is needed.
+        """
+        events = []
+        page_token = None
+        while True:
+            response = self._execute(self.service.events().list(
+                calendarId='primary',
+                syncToken=sync_token,
+                pageToken=page_token,
+                showDeleted=bool(sync_token),
+                maxResults=2500
+            ))
+            events.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return events, response.get('nextSyncToken')
+
+    def get_events(self, time_min: datetime.datetime = None, time_max: datetime.datetime = None, query: str = None,
+                   raise_on_error: bool = False) -> list:
+        """
+        Lists events in a range, optionally matching a text query. Identical concurrent calls share one request.
+        Errors return an empty list unless raise_on_error is set, for callers that must not mistake a failure for no events.
+        """
+        key = ('events', time_min.astimezone(pytz.utc) if time_min else None, time_max.astimezone(pytz.utc) if time_max else None, query, raise_on_error)
+        return self.single_flight.do(key, lambda: self._get_events(time_min, time_max, query, raise_on_error))
+
+    def _get_events(self, time_min: datetime.datetime = None, time_max: datetime.datetime = None, query: str = None,
+                    raise_on_error: bool = False) -> list:
         try:
             time_min_iso = time_min.astimezone(pytz.utc).isoformat() if time_min else datetime.datetime.utcnow().isoformat() + 'Z'
             time_max_iso = time_max.astimezone(pytz.utc).isoformat() if time_max else None
 
-            events_result = self.service.events().list(
+            events_result = self._execute(self.service.events().list(
                 calendarId='primary',
                 timeMin=time_min_iso,
                 timeMax=time_max_iso,
                 q=query,
                 singleEvents=True,
                 orderBy='startTime'
-            ).execute()
+            ))
             events = events_result.get('items', [])
             return events
         except HttpError as error:
-            print(f"An error occurred while fetching events: {error}")
+            logger.error("An error occurred while fetching events: %s", error)
+            if raise_on_error:
+                raise
             return []
         except Exception as e:
-            print(f"An unexpected error occurred in get_events: {e}")
+            logger.exception("An unexpected error occurred in get_events: %s", e)
+            if raise_on_error:
+                raise
             return []
\ No newline at end of file
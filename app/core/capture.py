@@ -0,0 +1,216 @@
+# app/core/capture.py
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.resilience import error_status
+
+logger = logging.getLogger(__name__)
+
+_current_capture = contextvars.ContextVar('current_capture', default=None)
+_current_call = contextvars.ContextVar('current_call', default=None)
+# Calls made inside a coalesced flight, kept for the callers that share its result
+_flight_calls = contextvars.ContextVar('flight_calls', default=None)
+# Set once a TrafficRecorder exists; until then flights collect nothing
+_recording = False
+
+# Body fields whose values are replaced before anything is written
+SECRET_FIELDS = {'authorization', 'access_token', 'refresh_token', 'id_token', 'client_secret', 'password',
+                 'api_key', 'apikey', 'token'}
+# The only request headers kept; the rest may carry cookies or credentials
+CAPTURED_HEADERS = ('Idempotency-Key',)
+
+
+def sanitize(value):
+    """A copy of a JSON value with secret fields masked."""
+    if isinstance(value, dict):
+        return {name: "***" if name.lower() in SECRET_FIELDS else sanitize(item) for name, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [sanitize(item) for item in value]
+    return value
+
+
+class _Capture:
+    def __init__(self, record: dict):
+        self.record = record
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+
+def record_call(dependency: str, operation: str, fn, keep=None):
+    """
+    Runs fn() for one outbound call and, if the current request is being captured, records what came back:
+    the response (passed through keep() first, if given) or the error, with the call's timing.
+    Outside a captured request it only calls fn.
+    """
+    capture = _current_capture.get()
+    collected = _flight_calls.get()
+    if capture is None and collected is None:
+        return fn()
+
+    call = {"dependency": dependency, "operation": operation,
+            "started_ms": round((time.perf_counter() - capture.started) * 1000, 3)}
+    token = _current_call.set(call)
+    started = time.perf_counter()
+    try:
+        response = fn()
+    except Exception as e:
+        call["error"] = {"type": type(e).__name__, "status": error_status(e), "message": str(e)[:500]}
+        raise
+    else:
+        try:
+            call["response"] = sanitize(keep(response) if keep else response)
+        except Exception as e:
+            # The caller gets the response as usual and meets the same problem when it reads it
+            call["error"] = {"type": type(e).__name__, "status": None, "message": str(e)[:500]}
+        return response
+    finally:
+        _current_call.reset(token)
+        call["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        if capture is not None:
+            with capture.lock:
+                capture.record["calls"].append(call)
+        if collected is not None:
+            collected.append(call)
+
+
+@contextmanager
+def shared_calls():
+    """
+    Collects the calls made inside the block, which runs one coalesced call on behalf of other callers, so that
+    those callers can record them with record_shared_calls(). Yields the list; it stays empty while nothing
+    is being captured. Calls collected by a flight nested inside another are passed on to the outer one.
+    """
+    if not _recording:
+        yield []
+        return
+    outer = _flight_calls.get()
+    calls = []
+    token = _flight_calls.set(calls)
+    try:
+        yield calls
+    finally:
+        _flight_calls.reset(token)
+        if outer is not None:
+            outer.extend(calls)
+
+
+def record_shared_calls(calls: list):
+    """
+    Records calls made by another caller whose result the current one shared, as if they were its own and marked
+    'coalesced', so a replay of this request has the answers it needs whether or not it is coalesced again.
+    """
+    capture = _current_capture.get()
+    collected = _flight_calls.get()
+    if not calls or (capture is None and collected is None):
+        return
+    started_ms = round((time.perf_counter() - capture.started) * 1000, 3) if capture is not None else 0.0
+    shared = [dict(copy.deepcopy(call), started_ms=started_ms, coalesced=True) for call in calls]
+    if capture is not None:
+        with capture.lock:
+            capture.record["calls"].extend(shared)
+    if collected is not None:
+        collected.extend(shared)
+
+
+def record_batch_item(request_id: str, response, error: Exception = None):
+    """Records one item of a batch call from its callback, under the batch call being captured, if any."""
+    call = _current_call.get()
+    if call is None:
+        return
+    item = {"id": request_id}
+    if error is not None:
+        item["error"] = {"type": type(error).__name__, "status": error_status(error), "message": str(error)[:500]}
+    else:
+        item["response"] = sanitize(response)
+    call.setdefault("items", []).append(item)
+
+
+class TrafficRecorder:
+    def __init__(self, path: str, sample_rate: float = 1.0, max_queued: int = 1000):
+        """
+        Captures a sample_rate share of requests to a JSON Lines file, one line per request: the sanitized
+        request, its status and duration, and every Gemini, Calendar and Gmail response it received, in order
+        and with timings, so benchmarks/replay.py can serve them again offline. Outbound request bodies are
+        not kept. Lines are written on a background thread; when max_queued lines are waiting, new ones
+        are dropped and counted.
+        """
+        global _recording
+        _recording = True
+        self.path = path
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._stats = {"captured": 0, "dropped": 0}
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='traffic-capture', daemon=True)
+        self._thread.start()
+        # Lines still queued when the process exits are written by then rather than lost
+        atexit.register(self._drain)
+
+    @contextmanager
+    def capture(self, request_id: str, method: str, path: str, headers: dict, body):
+        """Captures the calls made inside the block if the request is sampled. Yields the record, or None."""
+        if random.random() >= self.sample_rate:
+            yield None
+            return
+
+        record = {
+            "request_id": request_id,
+            "started_at": time.time(),
+            "method": method,
+            "path": path,
+            "headers": {name: headers[name] for name in CAPTURED_HEADERS if name in headers},
+            "body": sanitize(body),
+            "calls": []
+        }
+        capture = _Capture(record)
+        token = _current_capture.set(capture)
+        try:
+            yield record
+        finally:
+            _current_capture.reset(token)
+            record["duration_ms"] = round((time.perf_counter() - capture.started) * 1000, 3)
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                with self._lock:
+                    self._stats["dropped"] += 1
+            else:
+                with self._lock:
+                    self._stats["captured"] += 1
+
+    def _take_queued(self, records: list) -> list:
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def _write(self, records: list):
+        if not records:
+            return
+        try:
+            with self._write_lock, open(self.path, 'a') as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            logger.error("Could not write captured traffic to %s: %s", self.path, e)
+
+    def _run(self):
+        while True:
+            self._write(self._take_queued([self._queue.get()]))
+
+    def _drain(self):
+        self._write(self._take_queued([]))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
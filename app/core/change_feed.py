@@ -0,0 +1,215 @@
+# app/core/change_feed.py
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from itertools import islice
+
+from googleapiclient.errors import HttpError
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    def __init__(self, backlog_size: int = 1000):
+        """
+        In-memory feed of calendar change notifications for connected clients.
+        All clients read from one shared buffer of the last backlog_size changes, so publishing costs the same
+        however many clients are connected. A client that falls further behind than the buffer is told to
+        resync (refetch the event list) instead of receiving a partial history.
+        Cursors carry a per-process epoch, so a cursor from before a restart also asks for a resync.
+        """
+        self.backlog_size = backlog_size
+        self.epoch = uuid.uuid4().hex[:8]
+        self._changes = deque()
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._stats = {"published": 0, "resyncs": 0, "waiting_clients": 0}
+
+    def publish(self, change: dict) -> int:
+        with self._condition:
+            self._seq += 1
+            self._changes.append((self._seq, dict(change, seq=self._seq, at=time.time())))
+            while len(self._changes) > self.backlog_size:
+                self._changes.popleft()
+            self._stats["published"] += 1
+            self._condition.notify_all()
+            return self._seq
+
+    def cursor(self, seq: int = None) -> str:
+        return f"{self.epoch}:{self._seq if seq is None else seq}"
+
+    def wait(self, cursor: str = None, timeout: float = 25.0, max_changes: int = 100) -> tuple:
+        """
+        Waits up to timeout seconds for changes after a cursor and returns (changes, next_cursor, resync).
+        Without a cursor, only changes published from now on are returned. At most max_changes are
+        returned at once; the next cursor picks up where they stop.
+        """
+        with self._condition:
+            resync = False
+            after = self._seq
+            if cursor:
+                try:
+                    epoch, seq = cursor.split(':')
+                    after = int(seq)
+                    if epoch != self.epoch or after > self._seq:
+                        resync, after = True, self._seq
+                except ValueError:
+                    resync = True
+
+            if not resync:
+                self._stats["waiting_clients"] += 1
+                try:
+                    self._condition.wait_for(lambda: self._seq > after, timeout)
+                finally:
+                    self._stats["waiting_clients"] -= 1
+
+            oldest = self._changes[0][0] if self._changes else self._seq + 1
+            if after + 1 < oldest and self._seq > after:
+                # Some changes this client has not seen were already dropped from the buffer
+                resync, after = True, self._seq
+            if resync:
+                self._stats["resyncs"] += 1
+                return [], self.cursor(), True
+
+            changes = [change for _, change in islice(self._changes, after + 1 - oldest, after + 1 - oldest + max_changes)]
+            next_seq = changes[-1]["seq"] if changes else after
+            return changes, self.cursor(next_seq), False
+
+    def stats(self) -> dict:
+        with self._condition:
+            snapshot = dict(self._stats)
+            snapshot["latest_seq"] = self._seq
+            snapshot["buffered"] = len(self._changes)
+        return snapshot
+
+
+def event_change(event: dict, source: str) -> dict:
+    """Turns a Calendar event from an incremental sync into a change notification."""
+    if event.get('status') == 'cancelled':
+        return {"type": "deleted", "eventId": event['id'], "source": source}
+    created, updated = event.get('created', ''), event.get('updated', '')
+    return {
+        # An event's 'updated' matches its 'created' time, to the second, until it is first edited
+        "type": "created" if created and created[:19] == updated[:19] else "updated",
+        "eventId": event['id'],
+        "source": source,
+        "summary": event.get('summary', 'No Title'),
+        "start": event.get('start', {}).get('dateTime', event.get('start', {}).get('date')),
+        "end": event.get('end', {}).get('dateTime', event.get('end', {}).get('date'))
+    }
+
+
+class CalendarSync:
+    def __init__(self, source, feed: ChangeFeed, interval_seconds: int = 30):
+        """
+        Background loop that asks an event source for changes every interval_seconds with an incremental
+        sync token and publishes them to the feed. The source is a GoogleCalendarAPI or a LocalEventSource;
+        anything with sync_events(sync_token) -> (events, next_sync_token) works.
+        """
+        self.source = source
+        self.feed = feed
+        self.interval_seconds = interval_seconds
+        self.sync_token = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {"full_syncs": 0, "incremental_syncs": 0, "last_full_sync_events": 0, "last_full_sync_seconds": 0.0}
+
+    def _full_sync(self) -> str:
+        """Reads the whole calendar for a starting token, which is the costly part of syncing, and records its cost."""
+        started = time.perf_counter()
+        events, next_sync_token = self.source.sync_events(None)
+        seconds = time.perf_counter() - started
+        with self._lock:
+            self._stats["full_syncs"] += 1
+            self._stats["last_full_sync_events"] = len(events)
+            self._stats["last_full_sync_seconds"] = round(seconds, 3)
+        logger.info("Full calendar sync read %d events in %.2fs.", len(events), seconds)
+        return next_sync_token
+
+    def sync_once(self) -> int:
+        """Publishes the changes since the last sync and returns how many there were."""
+        if self.sync_token is None:
+            # A full sync only establishes the starting point; its events are not changes
+            self.sync_token = self._full_sync()
+            return 0
+        try:
+            events, next_sync_token = self.source.sync_events(self.sync_token)
+        except HttpError as error:
+            if error.resp.status != 410:
+                raise
+            # The token expired; start over and tell clients to refetch, since changes may have been missed
+            logger.info("Calendar sync token expired; running a full sync.")
+            self.sync_token = None
+            self.sync_token = self._full_sync()
+            self.feed.publish({"type": "resync", "source": "sync"})
+            return 0
+
+        self.sync_token = next_sync_token
+        with self._lock:
+            self._stats["incremental_syncs"] += 1
+        for event in events:
+            self.feed.publish(event_change(event, "sync"))
+        return len(events)
+
+    def start(self):
+        """Starts the background sync thread. Calling it more than once has no effect."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='calendar-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background sync thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self):
+        while True:
+            try:
+                self.sync_once()
+            except Exception as e:
+                logger.error("Calendar sync failed: %s", e)
+            if self._stop_event.wait(self.interval_seconds):
+                return
+
+
+class LocalEventSource:
+    def __init__(self):
+        """
+        In-memory stand-in for the Calendar incremental sync API, for running the change feed without Google.
+        Events are changed with put_event and delete_event; sync tokens are change counters.
+        """
+        self._lock = threading.Lock()
+        self._events = {}
+        self._log = []
+
+    def put_event(self, event: dict):
+        """Creates or replaces an event. 'created' and 'updated' timestamps are filled in."""
+        with self._lock:
+            now = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+            previous = self._events.get(event['id'])
+            event = dict(event, status='confirmed', updated=now,
+                         created=previous['created'] if previous else event.get('created', now))
+            self._events[event['id']] = event
+            self._log.append(event)
+
+    def delete_event(self, event_id: str):
+        with self._lock:
+            if self._events.pop(event_id, None) is not None:
+                self._log.append({"id": event_id, "status": "cancelled"})
+
+    def sync_events(self, sync_token: str = None) -> tuple:
+        with self._lock:
+            if sync_token is None:
+                return list(self._events.values()), str(len(self._log))
+            return self._log[int(sync_token):], str(len(self._log))
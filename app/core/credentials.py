@@ -0,0 +1,156 @@
+# app/core/credentials.py
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request
+
+from app.core.transport import HttpPool
+from app.core.throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Requests per second and burst size allowed per Google API, kept under the per-user quotas
+DEFAULT_RATE_LIMITS = {'calendar': (10.0, 20), 'gmail': (5.0, 10)}
+
+
+class CredentialManager:
+    def __init__(self, refresh_margin_seconds: int = 300, check_interval_seconds: int = 60, pool_size: int = 10, http_timeout_seconds: float = 30.0,
+                 rate_limits: dict = None, pool_wait_seconds: float = 30.0):
+        """
+        Shared, thread-safe holder for the OAuth credentials of every Google client.
+        A background thread refreshes tokens before they expire and writes them back to their token files.
+        The connection pool used by all clients lives here so Calendar and Gmail calls share it, as do the
+        per-API rate limiters; rate_limits overrides DEFAULT_RATE_LIMITS with {api: (rate_per_second, burst)}.
+        """
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self.check_interval_seconds = check_interval_seconds
+        self.http_pool = HttpPool(size=pool_size, timeout=http_timeout_seconds, wait_timeout=pool_wait_seconds, authorize=self.managed)
+        self.rate_limiters = {api: TokenBucket(rate, burst) for api, (rate, burst) in {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}.items()}
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def load(self, token_path: str, scopes: list) -> Credentials:
+        """
+        Returns valid credentials for a token file, refreshing them if they have already expired.
+        Returns None if the token file is missing or cannot be refreshed without user interaction.
+        """
+        with self._lock:
+            entry = self._entries.get(token_path)
+            if entry:
+                return entry['creds']
+
+            if not os.path.exists(token_path):
+                return None
+            creds = Credentials.from_authorized_user_file(token_path, scopes)
+
+            if not creds.valid:
+                if not (creds.expired and creds.refresh_token):
+                    return None
+                creds.refresh(Request())
+                self._save_token(token_path, creds)
+
+            self._entries[token_path] = {'creds': creds, 'saved_token': creds.token}
+            return creds
+
+    def managed(self, creds: Credentials) -> '_ManagedCredentials':
+        """Wraps credentials so that every refresh made while sending a request happens under this manager's lock."""
+        return _ManagedCredentials(self, creds)
+
+    def refresh(self, creds: Credentials, request, stale_token: str = None):
+        """
+        Refreshes shared credentials under the lock. When stale_token is given, the refresh is skipped if
+        another thread has already replaced that token, so a burst of 401s leads to a single refresh.
+        """
+        with self._lock:
+            if stale_token is not None and creds.token != stale_token:
+                return
+            creds.refresh(request)
+
+    def refresh_due(self) -> list:
+        """
+        Refreshes every token that expires within the refresh margin and persists any token
+        that changed since it was last written, including tokens refreshed lazily by a request.
+        Returns the token paths that were written.
+        """
+        written = []
+        with self._lock:
+            refresh_before = datetime.utcnow() + self.refresh_margin
+            for token_path, entry in self._entries.items():
+                creds = entry['creds']
+                try:
+                    if creds.refresh_token and (not creds.expiry or creds.expiry <= refresh_before):
+                        creds.refresh(Request())
+                    if creds.token != entry['saved_token']:
+                        self._save_token(token_path, creds)
+                        entry['saved_token'] = creds.token
+                        written.append(token_path)
+                except Exception as e:
+                    logger.error("Failed to refresh token '%s': %s", token_path, e)
+        return written
+
+    def start(self):
+        """Starts the background refresh thread. Calling it more than once has no effect."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='credential-refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops the background refresh thread."""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval_seconds):
+            self.refresh_due()
+
+    def _save_token(self, token_path: str, creds: Credentials):
+        """Writes the token to a temporary file next to the target and atomically replaces it."""
+        directory = os.path.dirname(os.path.abspath(token_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.token-', suffix='.json', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(creds.to_json())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, token_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class _ManagedCredentials:
+    """
+    Stands in for shared credentials inside google_auth_httplib2.AuthorizedHttp.
+    AuthorizedHttp refreshes its credentials before a request when they have expired and again after a 401;
+    both paths are sent through the CredentialManager so they never race the background refresh.
+    """
+
+    def __init__(self, manager: CredentialManager, creds: Credentials):
+        self._manager = manager
+        self._creds = creds
+        self._applied_token = None
+
+    def __getattr__(self, name):
+        return getattr(self._creds, name)
+
+    def before_request(self, request, method, url, headers):
+        with self._manager._lock:
+            if not self._creds.valid:
+                self._manager.refresh(self._creds, request)
+            self._creds.apply(headers)
+            self._applied_token = self._creds.token
+
+    def refresh(self, request):
+        self._manager.refresh(self._creds, request, stale_token=self._applied_token)
@@ -0,0 +1,76 @@
+# app/core/deadline.py
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+_current_deadline = contextvars.ContextVar('current_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    def __init__(self, seconds: float, expires_at: float = None):
+        """
+        Time budget for one request. While it is active, outbound calls shorten their timeouts to what is left
+        of the budget and refuse to start once it is spent. Work that is skipped is recorded in cut_short.
+        """
+        self.budget_seconds = seconds
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + seconds
+        self.cut_short = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def cut(self, stage: str, detail: str = None):
+        """Records that a stage was cut short. Only the first cut of each stage is kept."""
+        with self._lock:
+            if not any(entry["stage"] == stage for entry in self.cut_short):
+                self.cut_short.append({"stage": stage, "detail": detail})
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {"reason": "deadline", "budget_seconds": self.budget_seconds, "cut_short": list(self.cut_short)}
+
+    def child(self) -> 'Deadline':
+        """Returns a deadline with the same expiry that records its own cuts, for one part of a larger request."""
+        return Deadline(self.budget_seconds, expires_at=self.expires_at)
+
+    def run(self, fn, *args, **kwargs):
+        """Calls fn with this deadline active, e.g. on a worker thread."""
+        with self.activate():
+            return fn(*args, **kwargs)
+
+    @contextmanager
+    def activate(self):
+        """Makes this the deadline seen by outbound calls on the current thread or context."""
+        token = _current_deadline.set(self)
+        try:
+            yield self
+        finally:
+            _current_deadline.reset(token)
+
+
+def current_deadline() -> Deadline:
+    return _current_deadline.get()
+
+
+def call_timeout(default: float = None, stage: str = "outbound_call") -> float:
+    """
+    Timeout for the next outbound call: the default, shortened to what is left of the active deadline.
+    Raises DeadlineExceeded, and records the cut, if the active deadline is already spent.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    if deadline.expired():
+        deadline.cut(stage, "Skipped because the time budget ran out.")
+        raise DeadlineExceeded("Request deadline exceeded.")
+    remaining = deadline.remaining()
+    return remaining if default is None else min(default, remaining)
@@ -1,6 +1,12 @@
 # app/core/directory_api.py
 import os
 import json
+import threading
+from datetime import datetime
+
+import pytz
+
+from app.core.versioning import ChangeLog
 
 class GoogleDirectoryAPI:
     def __init__(self, service_account_email: str = None, admin_user_to_impersonate: str = None, service_account_key_path: str = None):
@@ -9,6 +15,13 @@ class GoogleDirectoryAPI:
         In this updated version, user lookups are handled via a local JSON file.
         """
         self.contacts_file = 'contacts.json'
+        # Versions the contact list for ETags and delta responses; keys are lower-cased emails
+        self.changes = ChangeLog()
+        # (version, contacts by name, contacts by email), rebuilt when the contact list moves to a new version
+        self._indexes = None
+        # (version, set of lower-cased words in contact names)
+        self._name_words = None
+        self._indexes_lock = threading.Lock()
         self._load_contacts()
 
     def _load_contacts(self):
@@ -34,6 +47,29 @@ class GoogleDirectoryAPI:
         """
         return self.contacts.get(email.lower())
 
+    def contact_indexes(self) -> tuple:
+        """
+        Returns (contacts by lower-cased display name, contacts by lower-cased email), built once per version
+        of the contact list rather than on every lookup. The dicts must not be modified.
+        """
+        with self._indexes_lock:
+            version = self.changes.version
+            if self._indexes is None or self._indexes[0] != version:
+                all_contacts = self.list_contacts()
+                self._indexes = (version,
+                                 {contact['displayName'].lower(): contact for contact in all_contacts},
+                                 {contact['primaryEmail'].lower(): contact for contact in all_contacts})
+            return self._indexes[1], self._indexes[2]
+
+    def contact_name_words(self) -> frozenset:
+        """The lower-cased words of every contact's display name, built once per version of the contact list."""
+        with self._indexes_lock:
+            version = self.changes.version
+            if self._name_words is None or self._name_words[0] != version:
+                words = frozenset(word for contact in self.contacts.values() for word in contact['displayName'].lower().split())
+                self._name_words = (version, words)
+            return self._name_words[1]
+
     def search_users(self, query: str) -> list:
         """
         Searches users by partial name or email from the contact list.
@@ -46,27 +82,77 @@ class GoogleDirectoryAPI:
                 found.append(user_data)
         return found
     
-    def add_contact(self, email: str, display_name: str) -> dict:
-        """Adds a new contact to the list and saves the file."""
+    def _validate_schedule(self, time_zone: str = None, working_hours: dict = None) -> str:
+        """Returns an error message if the time zone or working hours are invalid, otherwise None."""
+        if time_zone:
+            try:
+                pytz.timezone(time_zone)
+            except pytz.UnknownTimeZoneError:
+                return f"Unknown time zone: {time_zone}"
+        if working_hours:
+            try:
+                datetime.strptime(working_hours['start'], '%H:%M')
+                datetime.strptime(working_hours['end'], '%H:%M')
+            except (KeyError, TypeError, ValueError):
+                return "Working hours need 'start' and 'end' in HH:MM format."
+            days = working_hours.get('days')
+            if days is not None and not all(isinstance(day, int) and 0 <= day <= 6 for day in days):
+                return "Working days must be weekday numbers from 0 (Monday) to 6 (Sunday)."
+        return None
+
+    def add_contact(self, email: str, display_name: str, time_zone: str = None, working_hours: dict = None) -> dict:
+        """
+        Adds a new contact to the list and saves the file.
+        time_zone is an IANA name and working_hours is {"start": "HH:MM", "end": "HH:MM", "days": [0-6]};
+        both are optional and default to the organizer's settings when slots are searched.
+        """
         email_lower = email.lower()
         if email_lower in self.contacts:
             return {"status": "error", "message": "Contact with this email already exists."}
-        
+
+        error = self._validate_schedule(time_zone, working_hours)
+        if error:
+            return {"status": "error", "message": error}
+
         self.contacts[email_lower] = {
             "primaryEmail": email,
             "displayName": display_name,
             "firstName": display_name.split(' ')[0],
             "lastName": ' '.join(display_name.split(' ')[1:])
         }
+        if time_zone:
+            self.contacts[email_lower]["timeZone"] = time_zone
+        if working_hours:
+            self.contacts[email_lower]["workingHours"] = working_hours
         self._save_contacts()
+        self.changes.record(changed=[email_lower])
         return {"status": "success", "message": "Contact added successfully."}
 
+    def update_contact(self, email: str, time_zone: str = None, working_hours: dict = None) -> dict:
+        """Sets the time zone and/or working hours of an existing contact and saves the file."""
+        email_lower = email.lower()
+        if email_lower not in self.contacts:
+            return {"status": "error", "message": "Contact not found."}
+
+        error = self._validate_schedule(time_zone, working_hours)
+        if error:
+            return {"status": "error", "message": error}
+
+        if time_zone:
+            self.contacts[email_lower]["timeZone"] = time_zone
+        if working_hours:
+            self.contacts[email_lower]["workingHours"] = working_hours
+        self._save_contacts()
+        self.changes.record(changed=[email_lower])
+        return {"status": "success", "message": "Contact updated successfully."}
+
     def delete_contact(self, email: str) -> dict:
         """Deletes a contact from the list and saves the file."""
         email_lower = email.lower()
         if email_lower in self.contacts:
             del self.contacts[email_lower]
             self._save_contacts()
+            self.changes.record(removed=[email_lower])
             return {"status": "success", "message": "Contact deleted successfully."}
         else:
             return {"status": "error", "message": "Contact not found."}
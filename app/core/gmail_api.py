@@ -1,38 +1,56 @@
-import os
+import logging
 import base64
 from email.mime.text import MIMEText
-from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-import traceback
+
+from app.core.credentials import CredentialManager
+from app.core.resilience import ResilientCaller
+from app.core.metrics import outbound_call
+from app.core.capture import record_call
+
+logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 
 class GmailAPI:
-    def __init__(self, user_email: str = 'me', oauth_client_secrets_path: str = None, token_path: str = 'token_personal_gmail.json'):
+    def __init__(self, user_email: str = 'me', oauth_client_secrets_path: str = None, token_path: str = 'token_personal_gmail.json',
+                 credential_manager: CredentialManager = None):
         self.user_email = user_email
         self.creds = None
         self.oauth_client_secrets_path = oauth_client_secrets_path
         self.token_path = token_path
+        self.credential_manager = credential_manager if credential_manager else CredentialManager()
         self._authenticate()
         self.service = build('gmail', 'v1', credentials=self.creds)
+        self.http_pool = self.credential_manager.http_pool
+        self.resilience = ResilientCaller('gmail')
+        self.rate_limiter = self.credential_manager.rate_limiters['gmail']
 
     def _authenticate(self):
-        if os.path.exists(self.token_path):
-            self.creds = Credentials.from_authorized_user_file(self.token_path, SCOPES)
-
-        if not self.creds or not self.creds.valid:
-            if self.creds and self.creds.expired and self.creds.refresh_token:
-                try:
-                    self.creds.refresh(Request())
-                except Exception as e:
-                    raise Exception(f"Failed to refresh Gmail token. Please re-authenticate. Error: {e}")
-            else:
-                raise Exception(
-                    f"Gmail token not found or is invalid. Please run the separate authentication script to generate a new token."
-                )
+        try:
+            self.creds = self.credential_manager.load(self.token_path, SCOPES)
+        except Exception as e:
+            raise Exception(f"Failed to refresh Gmail token. Please re-authenticate. Error: {e}")
+
+        if not self.creds:
+            raise Exception(
+                f"Gmail token not found or is invalid. Please run the separate authentication script to generate a new token."
+            )
+
+    def _execute(self, request, idempotent: bool = True):
+        """
+        Runs a Google API request on a connection checked out from the shared pool, behind the Gmail circuit breaker.
+        Every attempt takes a token from the Gmail rate limiter.
+        """
+        return self.resilience.call(self._send, request, idempotent=idempotent)
+
+    def _send(self, request):
+        self.rate_limiter.acquire()
+        operation = getattr(request, 'methodId', None) or 'batch'
+        with outbound_call('gmail', operation):
+            return record_call('gmail', operation, lambda: self.http_pool.execute(request, self.creds))
 
     def send_email(self, to_emails: list, subject: str, message_text: str, sender_email: str = None) -> dict:
         try:
@@ -44,13 +62,13 @@ class GmailAPI:
             raw_message = base64.urlsafe_b64encode(message.as_bytes()).decode()
             body = {'raw': raw_message}
 
-            sent_message = self.service.users().messages().send(userId=self.user_email, body=body).execute()
-            print(f"Email sent! Message Id: {sent_message['id']}")
+            # Not retried on server errors, which could send the email twice
+            sent_message = self._execute(self.service.users().messages().send(userId=self.user_email, body=body), idempotent=False)
+            logger.info("Email sent! Message Id: %s", sent_message['id'])
             return {"status": "success", "messageId": sent_message['id']}
         except HttpError as error:
-            print(f"An error occurred while sending email: {error}")
+            logger.error("An error occurred while sending email: %s", error)
             return {"status": "error", "error": str(error)}
         except Exception as e:
-            print(f"An unexpected error occurred in send_email: {e}")
-            traceback.print_exc()
+            logger.exception("An unexpected error occurred in send_email: %s", e)
             return {"status": "error", "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,101 @@
+# app/core/idempotency.py
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.metrics import cache_lookup
+
+
+class IdempotencyKeyReused(Exception):
+    pass
+
+
+class IdempotencyKeyInProgress(Exception):
+    pass
+
+
+def request_fingerprint(data: dict) -> str:
+    """Hash of a request body, so a key cannot be replayed for a different request."""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyCache:
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 86400, wait_seconds: float = 60):
+        """
+        Remembers the results of successful writes by idempotency key, for at most ttl_seconds and
+        max_entries keys. A repeat of a key is answered from the cache. A repeat that arrives while the first
+        request is still running waits up to wait_seconds for it instead of running again. Failed requests
+        are not stored, so the client can retry them with the same key.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._stats = {"executed": 0, "replayed": 0, "waited": 0}
+
+    def run(self, key: str, fingerprint: str, fn) -> tuple:
+        """
+        Runs fn, which returns (body, status_code), at most once per key while its result is cached.
+        Returns (body, status_code, replayed). Raises IdempotencyKeyReused if the key was used for a
+        different request and IdempotencyKeyInProgress if the first request is still running after the wait.
+        """
+        while True:
+            with self._lock:
+                self._evict_expired()
+                entry = self._results.get(key)
+                if entry is not None:
+                    if entry["fingerprint"] != fingerprint:
+                        raise IdempotencyKeyReused("This Idempotency-Key was already used for a different request.")
+                    self._stats["replayed"] += 1
+                    cache_lookup('idempotency', True)
+                    return entry["body"], entry["status_code"], True
+                flight = self._in_flight.get(key)
+                if flight is None:
+                    self._in_flight[key] = (fingerprint, threading.Event())
+                    self._stats["executed"] += 1
+                    cache_lookup('idempotency', False)
+                    break
+                self._stats["waited"] += 1
+
+            in_flight_fingerprint, done = flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyKeyReused("This Idempotency-Key was already used for a different request.")
+            if not done.wait(self.wait_seconds):
+                raise IdempotencyKeyInProgress("A request with this Idempotency-Key is still being processed.")
+            # Loop: replay the stored result, or run again if the first request failed
+
+        try:
+            body, status_code = fn()
+            if 200 <= status_code < 300 and body.get("status") == "success":
+                with self._lock:
+                    self._results[key] = {"fingerprint": fingerprint, "body": body, "status_code": status_code,
+                                          "expires_at": time.monotonic() + self.ttl_seconds}
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            return body, status_code, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(key)[1].set()
+
+    def contains(self, key: str) -> bool:
+        """True while a result is stored for the key or a request with it is still running."""
+        with self._lock:
+            self._evict_expired()
+            return key in self._results or key in self._in_flight
+
+    def _evict_expired(self):
+        # Entries are stored in insertion order with the same TTL, so expired ones are at the front
+        now = time.monotonic()
+        while self._results and next(iter(self._results.values()))["expires_at"] <= now:
+            self._results.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["cached"] = len(self._results)
+            snapshot["in_flight"] = len(self._in_flight)
+        return snapshot
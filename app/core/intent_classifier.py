@@ -0,0 +1,441 @@
+# app/core/intent_classifier.py
+"""
+Local classifier that tells plausible meeting requests from everything else before Gemini is called.
+
+Train it from captured traffic (CAPTURE_PATH), whose Gemini responses label each query, or from a JSON Lines
+file of {"query": ..., "intent": ...}:
+
+    python -m app.core.intent_classifier traffic.jsonl --output intent_model.json
+
+The skip threshold is picked from cross-validated held-out recall on meeting requests and stored with the model.
+Queries with a meeting word, a time, a date or a contact's name always go to Gemini, whatever the model says.
+The report gives the held-out accuracy and recall, how many Gemini calls the skip threshold would have avoided,
+how many meeting requests it would have wrongly turned away, and the time per prediction.
+"""
+import argparse
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MEETING_INTENTS = {'schedule', 'reschedule', 'cancel'}
+
+WORD = re.compile(r"[a-z]+|\d+")
+CLOCK_TIME = re.compile(r"\b\d{1,2}(:\d{2})?\s*(am|pm)\b|\b\d{1,2}:\d{2}\b|(\bat|@)\s*\d{1,2}\b")
+NUMERIC_DATE = re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b|\b\d{1,2}/\d{1,2}\b|\b\d{1,2}(st|nd|rd|th)\b")
+DATE_WORDS = {'today', 'tomorrow', 'tmrw', 'tmr', 'tonight', 'noon', 'eod', 'monday', 'tuesday', 'wednesday', 'thursday',
+              'friday', 'saturday', 'sunday', 'mon', 'tue', 'tues', 'wed', 'thu', 'thur', 'thurs', 'fri', 'sat', 'sun',
+              'week', 'month', 'morning', 'afternoon', 'evening', 'jan', 'january', 'feb', 'february',
+              'mar', 'march', 'apr', 'april', 'may', 'jun', 'june', 'jul', 'july', 'aug', 'august', 'sep',
+              'sept', 'september', 'oct', 'october', 'nov', 'november', 'dec', 'december'}
+# Words that rarely appear in a query that is not about a meeting
+MEETING_WORDS = {'schedule', 'reschedule', 'book', 'cancel', 'move', 'postpone', 'push', 'shift', 'meet', 'meeting',
+                 'meetings', 'call', 'sync', 'standup', 'invite', 'arrange', 'organize', 'organise', 'slot', 'calendar',
+                 'appointment', 'interview', 'review', 'kickoff', 'catchup', 'chat', 'session', 'workshop', 'retro',
+                 'demo', 'huddle', 'lunch', 'delete', 'drop', 'rebook', 'min', 'mins', 'minute',
+                 'minutes', 'hour', 'hours', 'with', 'w', 'mtg', 'resched', 'remove', 'coffee', 'block', 'calls',
+                 'syncs', 'standups'}
+# Used for model files saved before the threshold was stored with the model
+DEFAULT_SKIP_THRESHOLD = 0.1
+
+# Built-in examples the classifier is trained on when no model file is configured
+SEED_EXAMPLES = [
+    ("Schedule a 45-minute sync with Akash and Raj next Tuesday at 10 AM to discuss project alpha.", True),
+    ("Book a 30-min sync with John tomorrow at 2 PM", True),
+    ("set up a meeting with priya on friday", True),
+    ("schedule 30 min 'Design review' with Maria, Wei on 2025-09-02 at 14:00", True),
+    ("can you find time for me and sam next week", True),
+    ("arrange a call with the marketing team on monday morning", True),
+    ("organize a 1 hour workshop with kenji and elena on the 12th", True),
+    ("book a quick chat with rohan", True),
+    ("meet with ananya at 4pm", True),
+    ("plan a standup every weekday at 9:30 with the dev team", True),
+    ("weekly 1:1 with isha every monday at 11", True),
+    ("add a lunch meeting with lucas tomorrow at noon", True),
+    ("invite fatima and noah to a project kickoff thursday afternoon", True),
+    ("schedule an interview with amara.okafor@example.com on 3 oct 10:00", True),
+    ("find a slot for a 2 hour planning session with vikram this week", True),
+    ("Reschedule my meeting with Nitish for a quick chat this Friday afternoon.", True),
+    ("reschedule the meeting with nitish2 which was on 25 august at 9:15 am to 30 aug 3 pm", True),
+    ("move my 3pm with sofia to tomorrow", True),
+    ("push the design review to next monday", True),
+    ("can we shift the team sync to 4 pm", True),
+    ("postpone the budget meeting by a week", True),
+    ("reschedule 'Benchmark sync' on 2025-09-01 at 10:00 to 2025-09-03 at 15:30", True),
+    ("change the time of my call with arjun to 11am", True),
+    ("Cancel the 'team update' meeting for today.", True),
+    ("cancel my meeting with meera tomorrow", True),
+    ("call off the retro on friday", True),
+    ("delete the 2pm meeting", True),
+    ("cancel 'Synthetic meeting 12' on 2025-09-04 at 09:30", True),
+    ("drop the sync with wei on thursday", True),
+    ("i can't make the client call at 5, please cancel it", True),
+    ("", False),
+    ("hi", False),
+    ("hello there", False),
+    ("thanks!", False),
+    ("thank you so much", False),
+    ("what's the weather like today", False),
+    ("tell me a joke", False),
+    ("who are you", False),
+    ("what can you do", False),
+    ("help", False),
+    ("asdfghjkl", False),
+    ("test", False),
+    ("ok", False),
+    ("how do i reset my password", False),
+    ("what is the capital of france", False),
+    ("translate good morning to spanish", False),
+    ("write a poem about the sea", False),
+    ("how are you doing", False),
+    ("good morning", False),
+    ("lol", False),
+    ("what time is it in tokyo", False),
+    ("summarize this article for me", False),
+    ("play some music", False),
+    ("order a pizza", False),
+    ("what's 2 + 2", False),
+    ("open my email", False),
+    ("never mind", False),
+    ("bye", False),
+    ("qwerty 123", False),
+    ("how many days until christmas", False),
+    ("what's up", False),
+    ("sing me a song", False),
+    ("how is the weather in pune", False),
+    ("who won the match yesterday", False),
+    ("recommend a good book", False),
+    ("what is my name", False),
+    ("are you a robot", False),
+    ("show me cat pictures", False),
+    ("cancel lunch with amy", True),
+    ("reschedule standup to friday", True),
+    ("sync with the team at 5", True),
+    ("catch up with ravi next week", True),
+    ("quick sync w/ alex @ 3", True),
+    ("remove the standup", True),
+    ("mtg w/ raj tmrw", True),
+    ("1:1 w priya", True),
+    ("coffee w sam fri", True),
+    ("standup tmrw 10", True),
+    ("call w/ john?", True),
+    ("move standup", True),
+    ("kill the 4pm", True),
+    ("resched demo", True),
+    ("sync @ 5", True),
+    ("lunch thurs?", True),
+    ("block 2h fri for planning", True),
+    ("need 30m w wei", True),
+    ("can we chat later today", True),
+    ("catch up w ravi", True),
+    ("team call 9am", True),
+    ("drop my 1:1", True),
+    ("retro pls", True),
+    ("hop on a call w kenji", True),
+    ("yo", False),
+    ("sup", False),
+    ("thx", False),
+    ("ty", False),
+    ("cool", False),
+    ("nice", False),
+    ("k", False),
+    ("hmm", False),
+    ("wow", False),
+    ("great job", False),
+    ("what's new", False),
+    ("tell me something", False),
+    ("who made you", False),
+    ("you there?", False),
+    ("how's it going", False),
+    ("lmao", False),
+    ("brb", False),
+    ("gn", False),
+]
+
+
+def must_route(text: str, contact_names: frozenset = frozenset()) -> bool:
+    """
+    Whether a query has a meeting word, a time, a date or a word of a contact's name. Such queries always go to
+    Gemini, however low the model scores them, since turning away a real request costs far more than a call.
+    """
+    lowered = text.lower()
+    if CLOCK_TIME.search(lowered) or NUMERIC_DATE.search(lowered):
+        return True
+    return any(word in MEETING_WORDS or word in DATE_WORDS or (len(word) > 1 and word in contact_names)
+               for word in WORD.findall(lowered))
+
+
+def recall_threshold(probabilities: list, min_recall: float = 1.0, margin: float = 0.5) -> float:
+    """
+    The skip threshold that keeps at least min_recall of the meeting requests scored with these held-out
+    probabilities, scaled by margin to leave room for requests unlike any seen.
+    """
+    ranked = sorted(probabilities)
+    misses = int(len(ranked) * (1 - min_recall) + 1e-9)
+    return ranked[min(misses, len(ranked) - 1)] * margin
+
+
+def features(text: str) -> list:
+    """Word unigrams and bigrams, plus flags for times, dates and email addresses."""
+    lowered = text.lower()
+    words = WORD.findall(lowered)
+    found = [f"w:{word}" for word in words]
+    found.extend(f"b:{first}_{second}" for first, second in zip(words, words[1:]))
+    if '@' in lowered:
+        found.append("has_email")
+    if CLOCK_TIME.search(lowered):
+        found.append("has_time")
+    if any(word in DATE_WORDS for word in words):
+        found.append("has_date")
+    meeting_words = sum(1 for word in words if word in MEETING_WORDS)
+    if meeting_words:
+        found.append(f"meeting_words:{min(meeting_words, 3)}")
+    found.append(f"len:{min(len(words), 8) // 3}")
+    return found
+
+
+class IntentModel:
+    def __init__(self, weights: dict = None, bias: float = 0.0, skip_threshold: float = DEFAULT_SKIP_THRESHOLD):
+        """
+        Logistic regression over sparse word and shape features: the probability that a query is a meeting request.
+        skip_threshold is the probability below which a query may skip Gemini, as picked by fit().
+        """
+        self.weights = weights or {}
+        self.bias = bias
+        self.skip_threshold = skip_threshold
+
+    def probability(self, text: str) -> float:
+        # Nothing to go on: an empty or punctuation-only query is never a meeting request
+        if not WORD.search(text.lower()):
+            return 0.0
+        score = self.bias + sum(self.weights.get(feature, 0.0) for feature in features(text))
+        if score < -30:
+            return 0.0
+        return 1.0 / (1.0 + math.exp(-score))
+
+    @classmethod
+    def train(cls, examples: list, epochs: int = 30, learning_rate: float = 0.2, l2: float = 1e-4,
+              min_count: int = 1, seed: int = 1) -> 'IntentModel':
+        """Fits the model to (query, is_meeting) pairs by stochastic gradient descent, with balanced class weights."""
+        featurized = [(features(text), 1.0 if is_meeting else 0.0) for text, is_meeting in examples]
+        counts = {}
+        for words, _ in featurized:
+            for feature in set(words):
+                counts[feature] = counts.get(feature, 0) + 1
+        positives = sum(1 for _, label in featurized if label) or 1
+        negatives = (len(featurized) - positives) or 1
+        class_weights = {1.0: len(featurized) / (2.0 * positives), 0.0: len(featurized) / (2.0 * negatives)}
+
+        model = cls()
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(featurized)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for words, label in featurized:
+                kept = [feature for feature in words if counts[feature] >= min_count]
+                score = model.bias + sum(model.weights.get(feature, 0.0) for feature in kept)
+                predicted = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, score))))
+                gradient = (predicted - label) * class_weights[label]
+                model.bias -= rate * gradient
+                for feature in kept:
+                    weight = model.weights.get(feature, 0.0)
+                    model.weights[feature] = weight - rate * (gradient + l2 * weight)
+        model.weights = {feature: round(weight, 5) for feature, weight in model.weights.items() if abs(weight) >= 1e-4}
+        return model
+
+    @classmethod
+    def fit(cls, examples: list, min_recall: float = 1.0, folds: int = 5, margin: float = 0.5, seed: int = 1) -> 'IntentModel':
+        """
+        Trains on every example and sets the skip threshold from `folds`-fold cross-validation: each meeting request
+        is scored by a model that did not see it, and the threshold keeps min_recall of them (see recall_threshold).
+        """
+        shuffled = list(examples)
+        random.Random(seed).shuffle(shuffled)
+        held_out = []
+        for fold in range(folds):
+            fold_model = cls.train([example for i, example in enumerate(shuffled) if i % folds != fold], seed=seed)
+            held_out.extend(fold_model.probability(text) for i, (text, is_meeting) in enumerate(shuffled)
+                            if i % folds == fold and is_meeting)
+        model = cls.train(shuffled, seed=seed)
+        if held_out:
+            model.skip_threshold = round(recall_threshold(held_out, min_recall, margin), 5)
+        return model
+
+    def to_dict(self) -> dict:
+        return {"version": 1, "bias": self.bias, "weights": self.weights, "skip_threshold": self.skip_threshold}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'IntentModel':
+        return cls(weights=data["weights"], bias=data["bias"], skip_threshold=data.get("skip_threshold", DEFAULT_SKIP_THRESHOLD))
+
+    @classmethod
+    def load(cls, path: str) -> 'IntentModel':
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+
+class IntentClassifier:
+    def __init__(self, model: IntentModel, skip_threshold: float = None, audit_rate: float = 0.05):
+        """
+        Decides which queries are worth a Gemini call. Queries whose meeting probability is below skip_threshold
+        (by default the model's own) are answered locally, unless must_route() holds for them, except for an
+        audit_rate share that still goes to Gemini so that the skips can be checked. Every Gemini answer is
+        compared with the local decision, which gives the reported accuracy.
+        """
+        self.model = model
+        self.skip_threshold = skip_threshold if skip_threshold is not None else model.skip_threshold
+        self.audit_rate = audit_rate
+        self._lock = threading.Lock()
+        self._stats = {"predictions": 0, "guarded": 0, "skipped": 0, "audited": 0, "predict_seconds": 0.0}
+        # (classifier said meeting, Gemini said meeting) -> count
+        self._agreement = {(True, True): 0, (True, False): 0, (False, True): 0, (False, False): 0}
+
+    def decide(self, query: str, contact_names: frozenset = frozenset()) -> tuple:
+        """Returns (meeting probability, whether to call Gemini). contact_names are lower-cased words of contact names."""
+        started = time.perf_counter()
+        probability = self.model.probability(query)
+        plausible = probability >= self.skip_threshold
+        guarded = not plausible and must_route(query, contact_names)
+        elapsed = time.perf_counter() - started
+        audited = not plausible and not guarded and random.random() < self.audit_rate
+        with self._lock:
+            self._stats["predictions"] += 1
+            self._stats["predict_seconds"] += elapsed
+            if guarded:
+                self._stats["guarded"] += 1
+            elif audited:
+                self._stats["audited"] += 1
+            elif not plausible:
+                self._stats["skipped"] += 1
+        return probability, plausible or guarded or audited
+
+    def record_outcome(self, probability: float, parsed_data: dict):
+        """Compares a Gemini parse with the local decision. Failed parses tell nothing and are ignored."""
+        if parsed_data.get("error"):
+            return
+        key = (probability >= self.skip_threshold, parsed_data.get("intent") in MEETING_INTENTS)
+        with self._lock:
+            self._agreement[key] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            agreement = dict(self._agreement)
+        labeled = sum(agreement.values())
+        audited_labeled = agreement[(False, True)] + agreement[(False, False)]
+        return {
+            **stats,
+            "llm_calls_avoided": stats["skipped"],
+            "mean_predict_microseconds": round(stats["predict_seconds"] / stats["predictions"] * 1e6, 2) if stats["predictions"] else None,
+            "agreement": {f"{'meeting' if local else 'other'}/{'meeting' if remote else 'other'}": count
+                          for (local, remote), count in agreement.items()},
+            # Over the queries Gemini also saw: every routed one and the audited sample of the skipped ones
+            "accuracy": round((agreement[(True, True)] + agreement[(False, False)]) / labeled, 4) if labeled else None,
+            "skip_precision": round(agreement[(False, False)] / audited_labeled, 4) if audited_labeled else None
+        }
+
+
+def default_model() -> IntentModel:
+    return IntentModel.fit(SEED_EXAMPLES)
+
+
+def load_examples(path: str) -> list:
+    """
+    (query, is_meeting) pairs from captured traffic, labeled by the Gemini response each query received,
+    or from lines of {"query": ..., "intent": ...}. Queries without a usable label are left out.
+    """
+    examples = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "intent" in record and "query" in record:
+                examples.append((record["query"], record["intent"] in MEETING_INTENTS))
+                continue
+            query = (record.get("body") or {}).get("query") if record.get("path") == '/process_query' else None
+            replies = [call.get("response") for call in record.get("calls", [])
+                       if call.get("dependency") == 'gemini' and call.get("response")]
+            if query is None or not replies:
+                continue
+            text = replies[-1].get("text", "").strip()
+            if text.startswith('```json'):
+                text = text[7:]
+            text = text.strip().rstrip('`')
+            try:
+                intent = json.loads(text).get("intent")
+            except (ValueError, AttributeError):
+                continue
+            examples.append((query, intent in MEETING_INTENTS))
+    return examples
+
+
+def evaluate(model: IntentModel, examples: list, skip_threshold: float) -> dict:
+    correct = 0
+    skipped = 0
+    wrongly_skipped = 0
+    meetings = 0
+    started = time.perf_counter()
+    for text, is_meeting in examples:
+        probability = model.probability(text)
+        correct += (probability >= 0.5) == is_meeting
+        meetings += is_meeting
+        if probability < skip_threshold and not must_route(text):
+            skipped += 1
+            wrongly_skipped += is_meeting
+    elapsed = time.perf_counter() - started
+    return {
+        "examples": len(examples),
+        "skip_threshold": skip_threshold,
+        "accuracy": round(correct / len(examples), 4) if examples else None,
+        "meeting_recall": round(1 - wrongly_skipped / meetings, 4) if meetings else None,
+        "llm_calls_avoided": skipped,
+        "meeting_requests_skipped": wrongly_skipped,
+        "mean_predict_microseconds": round(elapsed / len(examples) * 1e6, 2) if examples else None
+    }
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Trains the local intent classifier from captured or labeled queries.")
+    parser.add_argument('inputs', nargs='*', help="Captured traffic or {\"query\", \"intent\"} JSON Lines files.")
+    parser.add_argument('--output', default='intent_model.json', help="Where the trained model is written.")
+    parser.add_argument('--no-seed', action='store_true', help="Leave out the built-in examples.")
+    parser.add_argument('--holdout', type=float, default=0.2, help="Share of the examples kept back for evaluation.")
+    parser.add_argument('--skip-threshold', type=float, help="Meeting probability below which queries skip Gemini "
+                                                              "(default: picked from held-out recall).")
+    parser.add_argument('--min-recall', type=float, default=1.0, help="Share of held-out meeting requests the picked threshold must keep.")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    examples = [] if args.no_seed else list(SEED_EXAMPLES)
+    for path in args.inputs:
+        examples.extend(load_examples(path))
+    if not examples:
+        parser.error("No labeled examples.")
+    random.Random(args.seed).shuffle(examples)
+    cut = int(len(examples) * (1 - args.holdout)) if args.holdout > 0 else len(examples)
+
+    holdout_model = IntentModel.fit(examples[:cut], min_recall=args.min_recall, seed=args.seed)
+    holdout_threshold = args.skip_threshold if args.skip_threshold is not None else holdout_model.skip_threshold
+    report = {"holdout": evaluate(holdout_model, examples[cut:], holdout_threshold)}
+    model = IntentModel.fit(examples, min_recall=args.min_recall, seed=args.seed)
+    if args.skip_threshold is not None:
+        model.skip_threshold = args.skip_threshold
+    model.save(args.output)
+    report["model"] = {"path": args.output, "examples": len(examples),
+                       "meeting_examples": sum(1 for _, is_meeting in examples if is_meeting), "features": len(model.weights)}
+    report["training"] = evaluate(model, examples, model.skip_threshold)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# app/core/jobs.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.idempotency import IdempotencyKeyReused, request_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are kept this long so clients can still poll their results
+JOB_RETENTION_SECONDS = 7 * 86400
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    def __init__(self, handler, db_path: str = 'jobs.db', max_workers: int = 4, max_pending: int = 1000):
+        """
+        Runs meeting writes in the background. Jobs are stored in a local SQLite table before they are
+        accepted, so their status and results survive a restart. handler(action, payload) runs one job and
+        returns (body, status_code).
+
+        Jobs with the same event key (the event they change) run one at a time, in submission order.
+        Jobs for different events run in parallel on up to max_workers threads.
+        """
+        self.handler = handler
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='meeting-job')
+        self._lock = threading.Lock()
+        self._lanes = {}
+        self._pending = 0
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                action TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                event_key TEXT,
+                idempotency_key TEXT UNIQUE,
+                fingerprint TEXT,
+                status TEXT NOT NULL,
+                progress TEXT,
+                result TEXT,
+                status_code INTEGER,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Tables created before request fingerprints were stored get the column added
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        if 'fingerprint' not in columns:
+            self._db.execute("ALTER TABLE jobs ADD COLUMN fingerprint TEXT")
+        self._db.commit()
+
+    def start(self):
+        """
+        Re-queues jobs that were waiting when the server stopped and drops old finished jobs.
+        Jobs that were already running are marked failed rather than run twice, since a create
+        may have gone through before the restart.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?", (now - JOB_RETENTION_SECONDS,))
+            self._db.execute("UPDATE jobs SET status = 'failed', progress = ?, updated_at = ? WHERE status = 'running'",
+                             ("Interrupted by a server restart. Check the calendar before retrying.", now))
+            queued = self._db.execute("SELECT id, event_key FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+            self._db.commit()
+        for job_id, event_key in queued:
+            self._enqueue(job_id, event_key)
+
+    def submit(self, action: str, payload: dict, event_key: str = None, idempotency_key: str = None) -> dict:
+        """
+        Stores a job and queues it. A repeat of an idempotency key returns the job created for it the first time,
+        unless that job failed: then the same job is queued again, as a direct request may be retried after a failure.
+        Raises IdempotencyKeyReused if the key was used for a different action or payload, and JobQueueFull when
+        max_pending jobs are already waiting or running.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        fingerprint = request_fingerprint({"action": action, "payload": payload})
+        existing = None
+        with self._lock:
+            if idempotency_key:
+                existing = self._db.execute("SELECT id, fingerprint, status, event_key FROM jobs WHERE idempotency_key = ?",
+                                            (idempotency_key,)).fetchone()
+                if existing:
+                    job_id, existing_fingerprint, status, event_key = existing
+                    # Jobs stored before fingerprints were kept have none to compare
+                    if existing_fingerprint is not None and existing_fingerprint != fingerprint:
+                        raise IdempotencyKeyReused("This Idempotency-Key was already used for a different request.")
+                    if status != 'failed':
+                        return self._get(job_id)
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"Too many pending jobs ({self.max_pending}). Try again later.")
+            if existing:
+                self._update(job_id, status="queued", progress="Waiting for a worker.", result=None, status_code=None)
+            else:
+                self._db.execute(
+                    "INSERT INTO jobs (id, action, payload, event_key, idempotency_key, fingerprint, status, progress, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 'queued', 'Waiting for a worker.', ?, ?)",
+                    (job_id, action, json.dumps(payload), event_key, idempotency_key, fingerprint, now, now))
+                self._db.commit()
+        self._enqueue(job_id, event_key)
+        return self.get(job_id)
+
+    def _enqueue(self, job_id: str, event_key: str):
+        with self._lock:
+            self._pending += 1
+            if event_key is None:
+                self._executor.submit(self._run, job_id, None)
+                return
+            lane = self._lanes.get(event_key)
+            if lane is not None:
+                # Another job for this event is queued or running; this one follows it
+                lane.append(job_id)
+                self._update(job_id, progress="Waiting for an earlier job on the same event.")
+                return
+            self._lanes[event_key] = deque()
+        self._executor.submit(self._run, job_id, event_key)
+
+    def _run(self, job_id: str, event_key: str):
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT action, payload FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                self._update(job_id, status="running", progress="Running.")
+            action, payload = row[0], json.loads(row[1])
+            try:
+                body, status_code = self.handler(action, payload)
+                # A dry run that finds a conflict has done its job; the conflict is its result
+                succeeded = 200 <= status_code < 300 and (body.get("status") == "success" or
+                                                          (payload.get("dry_run") and body.get("status") == "conflict"))
+            except Exception as e:
+                logger.exception("Job %s (%s) failed: %s", job_id, action, e)
+                body, status_code, succeeded = {"status": "error", "message": f"An unexpected error occurred: {e}"}, 500, False
+            with self._lock:
+                self._update(job_id, status="succeeded" if succeeded else "failed", progress="Finished.",
+                             result=json.dumps(body, default=str), status_code=status_code)
+        finally:
+            self._finish(event_key)
+
+    def _finish(self, event_key: str):
+        with self._lock:
+            self._pending -= 1
+            if event_key is None:
+                return
+            lane = self._lanes[event_key]
+            if not lane:
+                del self._lanes[event_key]
+                return
+            next_job_id = lane.popleft()
+        self._executor.submit(self._run, next_job_id, event_key)
+
+    def _update(self, job_id: str, **fields):
+        # Callers hold self._lock
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        self._db.commit()
+
+    def find(self, idempotency_key: str) -> dict:
+        """Returns the job submitted with an idempotency key, or None."""
+        with self._lock:
+            existing = self._db.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+            return self._get(existing[0]) if existing else None
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            return self._get(job_id)
+
+    def _get(self, job_id: str) -> dict:
+        row = self._db.execute(
+            "SELECT id, action, event_key, status, progress, result, status_code, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "action": row[1],
+            "eventId": row[2],
+            "status": row[3],
+            "progress": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "resultStatusCode": row[6],
+            "createdAt": row[7],
+            "updatedAt": row[8]
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            return {"pending": self._pending, "busy_events": len(self._lanes), "jobs_by_status": counts}
@@ -0,0 +1,181 @@
+# app/core/log.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import reprlib
+import sys
+import threading
+from datetime import datetime, timezone
+
+from app.core.tracing import current_request_id
+
+# Attributes every LogRecord has; anything else on a record came from `extra=` and is logged as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+# Bounds the work of rendering a payload, however large it is: nesting depth, items per container, string length
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 4
+_payload_repr.maxdict = 20
+_payload_repr.maxlist = 20
+_payload_repr.maxstring = 200
+_payload_repr.maxother = 200
+
+
+class Payload:
+    """
+    A request or response body passed as a log argument. It is rendered only if the record passes the level
+    check and the sampler, up to a bounded size, when the record is queued, so later changes to the value
+    do not show up in the log.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self) -> str:
+        return _payload_repr.repr(self.value)
+
+
+def truncate(text: str, limit: int) -> str:
+    text = str(text)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... ({len(text) - limit} more chars)"
+    return text
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps each record with the current request id. Runs on the logging caller's thread, where the id is set."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class PayloadSampler(logging.Filter):
+    def __init__(self, sample_rate: float):
+        """Keeps a sample_rate share of the records that carry a Payload; other records all pass."""
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_rate >= 1 or not isinstance(record.args, tuple):
+            return True
+        if not any(isinstance(arg, Payload) for arg in record.args):
+            return True
+        return random.random() < self.sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, max_message_chars: int = 2000):
+        """One JSON object per line, with the request id and any `extra=` fields next to the message."""
+        super().__init__()
+        self.max_message_chars = max_message_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), self.max_message_chars),
+            "thread": record.threadName
+        }
+        if getattr(record, 'request_id', None):
+            entry["request_id"] = record.request_id
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES:
+                entry[name] = value if isinstance(value, (int, float, bool, type(None))) else truncate(value, self.max_message_chars)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, max_message_chars: int = 2000):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+        self.max_message_chars = max_message_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = truncate(record.message, self.max_message_chars)
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = '-'
+        return super().formatMessage(record)
+
+
+class _StderrHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is at the time, so redirecting it (as the benchmarks do) takes effect."""
+
+    def __init__(self):
+        super().__init__(sys.stderr)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        """Hands records to the logging thread as they are, and drops them rather than block when its queue is full."""
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats the whole message here, on the caller's thread; the listener formats it instead.
+        # Payloads are still rendered now, since the caller may change the value once the record is queued.
+        if isinstance(record.args, tuple) and any(isinstance(arg, Payload) for arg in record.args):
+            record.args = tuple(str(arg) if isinstance(arg, Payload) else arg for arg in record.args)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+_queue_handler = None
+
+
+def configure_logging(level: str = 'INFO', fmt: str = 'text', max_message_chars: int = 2000,
+                      payload_sample_rate: float = 1.0, queue_size: int = 10000):
+    """
+    Sends the process's logging through a bounded queue to a background thread that formats records and
+    writes them to stderr, as plain text or as JSON lines. Messages longer than max_message_chars are cut.
+    Records that carry a payload are kept at payload_sample_rate. Safe to call again; the last call wins.
+    """
+    global _queue_handler
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+        _queue_handler.listener.stop()
+
+    output = _StderrHandler()
+    output.setFormatter(JsonFormatter(max_message_chars) if fmt == 'json' else TextFormatter(max_message_chars))
+
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(PayloadSampler(payload_sample_rate))
+    handler.listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    handler.listener.start()
+
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    _queue_handler = handler
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+@atexit.register
+def _flush():
+    if _queue_handler is not None:
+        _queue_handler.listener.stop()
@@ -0,0 +1,234 @@
+# app/core/metrics.py
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.deadline import DeadlineExceeded
+from app.core.tracing import add_event, span
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from cache hits up to slow language model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> list:
+        """Returns [(sample name, labels, value)] for the exposition format."""
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, dict(zip(self.label_names, key)), value) for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (not cumulative) counts, then the sum and count of all observations
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            items = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        samples = []
+        for key, counts, total, count in items:
+            labels = dict(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Holds the process's metrics and renders them in the Prometheus text format.
+        Collectors are functions called at scrape time that return [(name, kind, help, [(labels, value)])],
+        for figures other objects already keep, so they cost nothing until scraped.
+        """
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: tuple = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception as e:
+                logger.exception("A metrics collector failed: %s", e)
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter('meeting_http_requests_total', "HTTP requests handled, by route, method and status.", ('endpoint', 'method', 'status'))
+HTTP_DURATION = REGISTRY.histogram('meeting_http_request_duration_seconds', "Time to build each HTTP response, by route.", ('endpoint', 'method'))
+HTTP_IN_FLIGHT = REGISTRY.gauge('meeting_http_requests_in_flight', "HTTP requests being handled right now, by route.", ('endpoint',))
+STAGE_DURATION = REGISTRY.histogram('meeting_stage_duration_seconds', "Time spent in each stage of the meeting request pipeline.", ('stage',))
+OUTBOUND_CALLS = REGISTRY.counter('meeting_outbound_calls_total', "Calls to Gemini and Google APIs, counting each retry, by outcome.", ('dependency', 'operation', 'outcome'))
+OUTBOUND_DURATION = REGISTRY.histogram('meeting_outbound_call_duration_seconds', "Duration of each call to Gemini and Google APIs.", ('dependency', 'operation'))
+CACHE_LOOKUPS = REGISTRY.counter('meeting_cache_lookups_total', "Lookups in each cache and coalescing layer, by hit or miss.", ('cache', 'result'))
+
+
+@contextmanager
+def outbound_call(dependency: str, operation: str):
+    """
+    Times one call to a dependency, counts it as a success, an error or a deadline cut, and records it as a
+    client span of the current trace.
+    """
+    name = operation if operation.startswith(f"{dependency}.") else f"{dependency}.{operation}"
+    started = time.perf_counter()
+    outcome = "error"
+    with span(name, kind="client", dependency=dependency) as call:
+        try:
+            yield
+            outcome = "success"
+        except DeadlineExceeded:
+            outcome = "deadline"
+            raise
+        finally:
+            OUTBOUND_DURATION.observe(time.perf_counter() - started, dependency=dependency, operation=operation)
+            OUTBOUND_CALLS.inc(dependency=dependency, operation=operation, outcome=outcome)
+            if call is not None:
+                call.set_attribute("outcome", outcome)
+
+
+def cache_lookup(cache: str, hit: bool, count: int = 1):
+    if count:
+        CACHE_LOOKUPS.inc(count, cache=cache, result="hit" if hit else "miss")
+        add_event("cache_hit" if hit else "cache_miss", cache=cache, count=count)
+
+
+def _cache_hit_ratios() -> list:
+    lookups = {}
+    for _, labels, value in CACHE_LOOKUPS.samples():
+        hits, total = lookups.get(labels['cache'], (0, 0))
+        lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    return [('meeting_cache_hit_ratio', 'gauge', "Share of lookups answered by each cache since start.",
+             [({"cache": cache}, hits / total) for cache, (hits, total) in sorted(lookups.items()) if total])]
+
+
+REGISTRY.register_collector(_cache_hit_ratios)
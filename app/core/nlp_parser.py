@@ -1,12 +1,46 @@
-import os
+import logging
 import json
+import threading
+from collections import OrderedDict
 import google.generativeai as genai
-from datetime import datetime, timedelta, date
+from datetime import datetime
+
+from app.core.deadline import DeadlineExceeded, call_timeout, current_deadline
+from app.core.resilience import ResilientCaller, CircuitOpen, is_transient
+from app.core.metrics import cache_lookup, outbound_call
+from app.core.capture import record_call
+from app.core.log import Payload
+
+logger = logging.getLogger(__name__)
+
+# Recent successful parses, used as a fallback while Gemini is failing
+PARSE_CACHE_SIZE = 256
 
 class NLPParser:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, timeout_seconds: float = 30.0):
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-1.5-pro-latest')
+        self.timeout_seconds = timeout_seconds
+        self.resilience = ResilientCaller('gemini')
+        self._parse_cache = OrderedDict()
+        self._parse_cache_lock = threading.Lock()
+
+    def _cache_key(self, text: str, current_date_str: str) -> tuple:
+        # Relative dates in a query resolve differently on another day, so the date is part of the key
+        return (current_date_str, " ".join(text.lower().split()))
+
+    def _remember_parse(self, key: tuple, parsed_data: dict):
+        with self._parse_cache_lock:
+            self._parse_cache[key] = parsed_data
+            self._parse_cache.move_to_end(key)
+            while len(self._parse_cache) > PARSE_CACHE_SIZE:
+                self._parse_cache.popitem(last=False)
+
+    def _cached_parse(self, key: tuple) -> dict:
+        with self._parse_cache_lock:
+            parsed_data = self._parse_cache.get(key)
+        cache_lookup('parse_fallback', parsed_data is not None)
+        return dict(parsed_data, served_from_cache=True) if parsed_data else None
 
     def parse_meeting_request(self, text: str) -> dict:
         current_date_str = datetime.now().strftime('%Y-%m-%d')
@@ -16,7 +50,7 @@ class NLPParser:
 
         Follow these rules for extraction:
         1.  **intent**: Identify the core intent, which must be one of: "schedule", "reschedule", "cancel", or "unknown".
-        2.  **participants**: Extract all names and email addresses. If only a name is given, just list the name.
+        2.  **participants**: Extract all names and email addresses. If only a name is given, just list the name. Do not include people marked as optional.
         3.  **duration_minutes**: Convert any duration (e.g., "1 hour", "45-min", "2h 15m") into total minutes (integer). If unspecified, default to 30 minutes. If a "quick" meeting is mentioned, default to 15 minutes.
         4.  **time_preferences_raw**: Capture the original natural language phrase describing the time (e.g., "tomorrow at 2 PM", "next week", "this Friday afternoon").
         5.  **start_date_hint**: Convert relative dates (e.g., "today", "tomorrow", "next Tuesday") to an absolute date in 'YYYY-MM-DD' format based on the current date {current_date_str}. If a specific date is mentioned, use that. If no date is mentioned but a time is, assume today's date.
@@ -25,6 +59,8 @@ class NLPParser:
         8.  **original_meeting_keywords**: For "reschedule" or "cancel" intents, list keywords from the original meeting title or description to help find it (e.g., ["team update"]).
         9.  **original_meeting_date_hint**: For "reschedule" or "cancel" intents, extract the date of the original meeting in 'YYYY-MM-DD' format if mentioned.
         10. **original_meeting_time_hint**: For "reschedule" or "cancel" intents, extract the time of the original meeting in 'HH:MM' format if mentioned.
+        11. **recurrence**: If the meeting repeats (e.g., "every Monday", "weekly", "daily for two weeks"), express it as an iCalendar RRULE without the 'RRULE:' prefix (e.g., "FREQ=WEEKLY;BYDAY=MO"). Otherwise null.
+        12. **optional_participants**: Names or email addresses of people explicitly described as optional (e.g., "Priya if she can make it", "optionally invite Sam"). Otherwise an empty list.
 
         Input: "{text}"
 
@@ -42,7 +78,9 @@ class NLPParser:
             "meeting_title": "project alpha sync",
             "original_meeting_keywords": null,
             "original_meeting_date_hint": null,
-            "original_meeting_time_hint": null
+            "original_meeting_time_hint": null,
+            "recurrence": null,
+            "optional_participants": []
         }}
 
         Example 2:
@@ -57,7 +95,9 @@ class NLPParser:
             "meeting_title": null,
             "original_meeting_keywords": ["meeting with John"],
             "original_meeting_date_hint": null,
-            "original_meeting_time_hint": null
+            "original_meeting_time_hint": null,
+            "recurrence": null,
+            "optional_participants": []
         }}
         
         Example 3:
@@ -72,7 +112,9 @@ class NLPParser:
             "meeting_title": "team update",
             "original_meeting_keywords": ["team update"],
             "original_meeting_date_hint": "2025-08-24",
-            "original_meeting_time_hint": null
+            "original_meeting_time_hint": null,
+            "recurrence": null,
+            "optional_participants": []
         }}
         
         Example 4:
@@ -87,12 +129,24 @@ class NLPParser:
             "meeting_title": null,
             "original_meeting_keywords": ["meeting with nitish2"],
             "original_meeting_date_hint": "2025-08-25",
-            "original_meeting_time_hint": "09:15"
+            "original_meeting_time_hint": "09:15",
+            "recurrence": null,
+            "optional_participants": []
         }}
         """
 
+        cache_key = self._cache_key(text, current_date_str)
+
+        def generate():
+            # Shortened to what is left of the request deadline, if one is active
+            timeout = call_timeout(self.timeout_seconds, stage="parse")
+            with outbound_call('gemini', 'generate_content'):
+                return record_call('gemini', 'generate_content',
+                                   lambda: self.model.generate_content(prompt, request_options={"timeout": timeout}),
+                                   keep=lambda response: {"text": response.text})
+
         try:
-            response = self.model.generate_content(prompt)
+            response = self.resilience.call(generate)
             json_string = response.text.strip()
             
             # Clean up potential markdown fences if they appear
@@ -102,11 +156,25 @@ class NLPParser:
                 json_string = json_string[:-3].strip()
 
             parsed_data = json.loads(json_string)
+            self._remember_parse(cache_key, parsed_data)
             return parsed_data
+        except DeadlineExceeded as e:
+            return {"error": "Parsing was skipped because the request deadline was exceeded.", "details": str(e), "intent": "unknown"}
         except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {e}")
-            print(f"Raw LLM response causing error: '{response.text}'" if 'response' in locals() else "No raw response available.")
+            logger.error("JSON Decode Error: %s", e)
+            if 'response' in locals():
+                logger.error("Raw LLM response causing error: %s", Payload(response.text))
+            else:
+                logger.error("No raw response available.")
             return {"error": "Failed to parse LLM response into JSON.", "details": str(e), "intent": "unknown"}
         except Exception as e:
-            print(f"An unexpected error occurred: {e}")
+            logger.error("An unexpected error occurred: %s", e)
+            if isinstance(e, CircuitOpen) or is_transient(e):
+                cached = self._cached_parse(cache_key)
+                if cached:
+                    logger.warning("Gemini is unavailable; using a cached parse of the same query.")
+                    return cached
+            deadline = current_deadline()
+            if deadline is not None and deadline.expired():
+                deadline.cut("parse", "The language model call timed out at the request deadline.")
             return {"error": "An unexpected error occurred during NLP parsing.", "details": str(e), "intent": "unknown"}
\ No newline at end of file
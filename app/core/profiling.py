@@ -0,0 +1,136 @@
+# app/core/profiling.py
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+
+class _StackSampler:
+    def __init__(self, interval_seconds: float):
+        """
+        Samples the stacks of watched threads every interval_seconds from one background thread.
+        It sleeps while no thread is watched.
+        """
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._watched = {}
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def watch(self, thread_id: int) -> Counter:
+        stacks = Counter()
+        with self._lock:
+            self._watched[thread_id] = stacks
+        self._wake.set()
+        return stacks
+
+    def unwatch(self, thread_id: int):
+        with self._lock:
+            self._watched.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                watched = dict(self._watched)
+            if not watched:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in watched.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[_folded(frame)] += 1
+            time.sleep(self.interval_seconds)
+
+
+def _folded(frame) -> str:
+    """A stack in the collapsed format flame graph tools read: outermost frame first, separated by ';'."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfiler:
+    def __init__(self, output_dir: str = 'profiles', sample_rate: float = 0.0, slow_seconds: float = None,
+                 interval_seconds: float = 0.01):
+        """
+        Opt-in profiles of individual requests, written to output_dir and named after the request id.
+        A sample_rate share of requests runs under cProfile (a .prof file for pstats or snakeviz); only one
+        does at a time, and the others that are picked are skipped. With slow_seconds, the thread of every other
+        request has its stack sampled every interval_seconds, and requests that take at least slow_seconds keep
+        the samples as a .folded file for flame graph tools.
+        """
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self._cprofile_lock = threading.Lock()
+        self._sampler = _StackSampler(interval_seconds) if slow_seconds else None
+        self._lock = threading.Lock()
+        self._stats = {"cprofile": 0, "slow": 0, "skipped": 0}
+        if self.enabled:
+            os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 or bool(self.slow_seconds)
+
+    @contextmanager
+    def profile(self, request_id: str):
+        """Profiles the block if the request is picked. Profiles are found by the request id in their file name."""
+        if not self.enabled:
+            yield
+            return
+
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            if self._cprofile_lock.acquire(blocking=False):
+                path = self._path(request_id, 'prof')
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                    try:
+                        yield
+                    finally:
+                        profiler.disable()
+                        profiler.dump_stats(path)
+                        self._count("cprofile")
+                finally:
+                    self._cprofile_lock.release()
+                return
+            self._count("skipped")
+
+        if self._sampler is None:
+            yield
+            return
+
+        thread_id = threading.get_ident()
+        started = time.monotonic()
+        stacks = self._sampler.watch(thread_id)
+        try:
+            yield
+        finally:
+            self._sampler.unwatch(thread_id)
+            if time.monotonic() - started >= self.slow_seconds and stacks:
+                with open(self._path(request_id, 'folded'), 'w') as f:
+                    for stack, count in stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+                self._count("slow")
+
+    def _path(self, request_id: str, extension: str) -> str:
+        return os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}.{extension}")
+
+    def _count(self, kind: str):
+        with self._lock:
+            self._stats[kind] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,134 @@
+# app/core/recurrence.py
+from datetime import datetime, timedelta, time
+
+import pytz
+from dateutil.rrule import rrulestr
+
+from app.core.availability import merge_intervals, overlaps
+
+# Upper bound on expanded occurrences, so open-ended rules are checked over roughly a year of weekly meetings
+MAX_OCCURRENCES = 52
+WEEKDAY_CODES = ['MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU']
+
+
+def normalize_rule(rule: str, tz=None) -> str:
+    """
+    Returns an upper-cased RRULE line with the 'RRULE:' prefix Google Calendar expects.
+    With a time zone, an UNTIL without a trailing 'Z' is read as local time in it and converted to UTC,
+    as required for series with a zoned start; a date-only UNTIL covers the whole of that day.
+    Raises ValueError for an UNTIL that is not a date or date-time.
+    """
+    rule = rule.strip().upper()
+    rule = rule if rule.startswith('RRULE:') else f"RRULE:{rule}"
+    if tz is None:
+        return rule
+    parts = rule_parts(rule)
+    until = parts.get('UNTIL')
+    if not until or until.endswith('Z'):
+        return rule
+    try:
+        if 'T' in until:
+            local_until = datetime.strptime(until, '%Y%m%dT%H%M%S')
+        else:
+            local_until = datetime.combine(datetime.strptime(until, '%Y%m%d').date(), time(23, 59, 59))
+    except ValueError:
+        raise ValueError(f"UNTIL must be a date (YYYYMMDD) or date-time (YYYYMMDDTHHMMSS[Z]), not {until}.")
+    parts['UNTIL'] = tz.localize(local_until).astimezone(pytz.utc).strftime('%Y%m%dT%H%M%SZ')
+    return format_rule(parts)
+
+
+def rule_parts(rule: str) -> dict:
+    """Splits an RRULE line into its NAME=VALUE parts."""
+    body = normalize_rule(rule)[len('RRULE:'):]
+    return dict(part.split('=', 1) for part in body.split(';') if '=' in part)
+
+
+def format_rule(parts: dict) -> str:
+    """Joins NAME=VALUE parts back into an RRULE line."""
+    return "RRULE:" + ";".join(f"{name}={value}" for name, value in parts.items())
+
+
+def expand_occurrences(rule: str, start: datetime, duration: timedelta, tz, max_occurrences: int = MAX_OCCURRENCES) -> list:
+    """
+    Expands a recurrence rule into (start, end) tuples, starting at `start`.
+    Occurrences keep the wall-clock time of the first one, so they are re-localized across DST changes.
+    Raises ValueError for a rule that cannot be parsed.
+    """
+    try:
+        rule_set = rrulestr(normalize_rule(rule, tz), dtstart=start)
+    except ValueError as e:
+        raise ValueError(f"Invalid recurrence rule {rule}: {e}")
+    occurrences = []
+    for occurrence in rule_set:
+        occurrence_start = tz.localize(occurrence.replace(tzinfo=None))
+        occurrences.append((occurrence_start, tz.normalize(occurrence_start + duration)))
+        if len(occurrences) >= max_occurrences:
+            break
+    return occurrences
+
+
+def occurrence_conflicts(occurrences: list, busy_by_email: dict) -> list:
+    """Returns the occurrences that clash with someone's busy time, with the attendees who are busy."""
+    conflicts = []
+    for start, end in occurrences:
+        busy_emails = [email for email, merged in busy_by_email.items() if overlaps(merged, start, end)]
+        if busy_emails:
+            conflicts.append({"start": start.isoformat(), "end": end.isoformat(), "conflicts": busy_emails})
+    return conflicts
+
+
+def best_weekly_slot(rule: str, occurrences: list, busy_by_email: dict, tz,
+                     day_start_hour: int = 9, day_end_hour: int = 17, granularity_minutes: int = 15,
+                     not_before: datetime = None) -> dict:
+    """
+    Finds the single weekday and time of day that keeps the series consistent and clashes with the fewest occurrences.
+    Weekday moves are only considered for weekly rules that meet on at most one day per week, and only forward,
+    within the week after the requested start. A suggested series never starts before the requested start or
+    not_before, so it has no occurrences in the past. Ties are broken by staying closest to the requested day and time.
+    """
+    if not occurrences:
+        return None
+
+    all_busy = merge_intervals([interval for merged in busy_by_email.values() for interval in merged])
+    parts = rule_parts(rule)
+    first_start, first_end = occurrences[0]
+    duration = first_end - first_start
+    original_minutes = first_start.hour * 60 + first_start.minute
+    not_before = max(not_before, first_start) if not_before else first_start
+
+    day_offsets = [0]
+    if parts.get('FREQ') == 'WEEKLY' and len(parts.get('BYDAY', '').split(',')) <= 1:
+        # Earlier weekdays roll over to the following week rather than moving the series back in time
+        day_offsets = [(weekday - first_start.weekday()) % 7 for weekday in range(5)]
+
+    best = None
+    for day_offset in day_offsets:
+        minutes = day_start_hour * 60
+        while minutes * 60 + duration.total_seconds() <= day_end_hour * 3600:
+            slot_time = time(hour=minutes // 60, minute=minutes % 60)
+            minutes += granularity_minutes
+            if tz.localize(datetime.combine(first_start.date() + timedelta(days=day_offset), slot_time)) < not_before:
+                continue
+            conflicting = 0
+            for start, _ in occurrences:
+                candidate_start = tz.localize(datetime.combine(start.date() + timedelta(days=day_offset), slot_time))
+                if overlaps(all_busy, candidate_start, candidate_start + duration):
+                    conflicting += 1
+            rank = (conflicting, day_offset, abs(slot_time.hour * 60 + slot_time.minute - original_minutes))
+            if best is None or rank < best[0]:
+                best = (rank, day_offset, slot_time)
+
+    if best is None:
+        return None
+
+    (conflicting, _, _), day_offset, slot_time = best
+    suggested_start = tz.localize(datetime.combine(first_start.date() + timedelta(days=day_offset), slot_time))
+    if day_offset and 'BYDAY' in parts:
+        parts['BYDAY'] = WEEKDAY_CODES[suggested_start.weekday()]
+    return {
+        "start": suggested_start.isoformat(),
+        "end": (suggested_start + duration).isoformat(),
+        "recurrence": [format_rule(parts)],
+        "conflicting_occurrences": conflicting,
+        "total_occurrences": len(occurrences)
+    }
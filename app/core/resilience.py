@@ -0,0 +1,184 @@
+# app/core/resilience.py
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from app.core.deadline import DeadlineExceeded, current_deadline
+from app.core.tracing import add_event
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# Rate limiting means the call was refused before anything happened, so it is safe to retry even for writes
+REFUSED_STATUSES = {429}
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+def error_status(error: Exception) -> int:
+    """HTTP status of a googleapiclient or google.api_core error, if it has one."""
+    if isinstance(error, HttpError):
+        return error.resp.status
+    code = getattr(error, 'code', None)
+    return code if isinstance(code, int) else None
+
+
+def is_transient(error: Exception) -> bool:
+    """True for failures of the dependency itself (overload, outages, timeouts) rather than of the request."""
+    if isinstance(error, (TimeoutError, ConnectionError, httplib2.HttpLib2Error)):
+        return True
+    return error_status(error) in RETRYABLE_STATUSES
+
+
+def retry_after_seconds(error: Exception) -> float:
+    """Delay asked for by a Retry-After header or a gRPC RetryInfo detail, if any."""
+    headers = None
+    if isinstance(error, HttpError):
+        headers = error.resp
+    elif getattr(error, 'response', None) is not None:
+        headers = getattr(error.response, 'headers', None)
+    value = (headers.get('retry-after') or headers.get('Retry-After')) if headers else None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    for detail in getattr(error, 'details', None) or []:
+        retry_delay = getattr(detail, 'retry_delay', None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    return None
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_seconds: float = 30.0):
+        """
+        Stops calls to a dependency after failure_threshold consecutive failures. After reset_timeout_seconds,
+        or longer if the dependency asked for it with Retry-After, one probe call is let through; its outcome
+        closes the breaker or opens it again.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+        self._stats = {"successes": 0, "failures": 0, "rejected": 0, "times_opened": 0}
+        self._last_error = None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == "open" and time.monotonic() >= self._open_until:
+                self._state = "half_open"
+            if self._state == "closed":
+                return True
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self._stats["rejected"] += 1
+            return False
+
+    def release(self):
+        """Ends a call whose outcome says nothing about the dependency, e.g. one cut short by the request deadline."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._state = "closed"
+
+    def record_failure(self, error: Exception, retry_after: float = None):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._consecutive_failures += 1
+            self._last_error = str(error)
+            self._probe_in_flight = False
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._stats["times_opened"] += 1
+                self._state = "open"
+                self._open_until = time.monotonic() + max(self.reset_timeout_seconds, retry_after or 0.0)
+
+    def state(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["name"] = self.name
+            snapshot["state"] = self._state
+            snapshot["consecutive_failures"] = self._consecutive_failures
+            snapshot["open_for_seconds"] = round(max(0.0, self._open_until - time.monotonic()), 3) if self._state == "open" else 0.0
+            snapshot["last_error"] = self._last_error
+        return snapshot
+
+
+class ResilientCaller:
+    def __init__(self, name: str, max_attempts: int = 3, base_delay_seconds: float = 0.5, max_delay_seconds: float = 8.0,
+                 failure_threshold: int = 5, reset_timeout_seconds: float = 30.0):
+        """
+        Runs calls to one dependency behind a circuit breaker, retrying transient failures with jittered
+        exponential backoff. A Retry-After from the dependency replaces the backoff, and a wait longer than
+        max_delay_seconds or than what is left of the request deadline ends the retries instead.
+        """
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout_seconds)
+        self._lock = threading.Lock()
+        self.retries = 0
+
+    def call(self, fn, *args, idempotent: bool = True, **kwargs):
+        """
+        Calls fn, raising CircuitOpen straight away while the breaker is open.
+        Calls that are not idempotent are only retried when the dependency refused them outright.
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                add_event("circuit_open", dependency=self.name)
+                raise CircuitOpen(f"{self.name} is unavailable; failing fast while its circuit breaker is open.")
+            try:
+                result = fn(*args, **kwargs)
+            except DeadlineExceeded:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_transient(e):
+                    # The dependency answered; the request itself was at fault
+                    self.breaker.record_success()
+                    raise
+                retry_after = retry_after_seconds(e)
+                self.breaker.record_failure(e, retry_after)
+
+                attempt += 1
+                if attempt >= self.max_attempts or not (idempotent or error_status(e) in REFUSED_STATUSES):
+                    raise
+                delay = retry_after if retry_after is not None else random.uniform(0, min(self.max_delay_seconds, self.base_delay_seconds * 2 ** (attempt - 1)))
+                deadline = current_deadline()
+                if delay > self.max_delay_seconds or (deadline is not None and delay >= deadline.remaining()):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                add_event("retry", dependency=self.name, attempt=attempt, delay_seconds=round(delay, 3), error=str(e)[:200])
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        snapshot = self.breaker.state()
+        snapshot["retries"] = self.retries
+        return snapshot
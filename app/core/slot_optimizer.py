@@ -0,0 +1,83 @@
+# app/core/slot_optimizer.py
+import heapq
+from datetime import datetime, timedelta
+
+from app.core.availability import overlaps
+
+REQUIRED_WEIGHT = 100.0
+OPTIONAL_WEIGHT = 10.0
+# Score lost per hour between a slot and the preferred start, near that start. The loss levels off
+# below MAX_PROXIMITY_PENALTY, under one optional attendee, so however far out a slot is, attendance
+# decides the ranking and distance only orders slots with equal attendance.
+PROXIMITY_WEIGHT_PER_HOUR = 0.1
+MAX_PROXIMITY_PENALTY = OPTIONAL_WEIGHT / 2
+
+
+def proximity_penalty(start: datetime, preferred_start: datetime) -> float:
+    """Grows with the distance from the preferred start, about linearly at first, and never reaches MAX_PROXIMITY_PENALTY."""
+    hours = abs((start - preferred_start).total_seconds()) / 3600
+    return MAX_PROXIMITY_PENALTY * hours / (hours + MAX_PROXIMITY_PENALTY / PROXIMITY_WEIGHT_PER_HOUR)
+
+
+def candidate_starts(windows: list, duration: timedelta, granularity: timedelta, busy_by_email: dict) -> set:
+    """
+    Returns every grid-aligned start that fits inside a window, plus the moments someone's busy period ends,
+    so slots right after a meeting are not lost to the grid.
+    """
+    starts = set()
+    busy_ends = [busy_end for merged in busy_by_email.values() for _, busy_end in merged]
+    for window_start, window_end in windows:
+        current = window_start
+        while current + duration <= window_end:
+            starts.add(current)
+            current += granularity
+        for busy_end in busy_ends:
+            if window_start <= busy_end and busy_end + duration <= window_end:
+                starts.add(busy_end)
+    return starts
+
+
+def best_slots(windows: list, duration: timedelta, busy_by_email: dict, required_emails: list, optional_emails: list = None,
+               preferred_start: datetime = None, granularity: timedelta = timedelta(minutes=15), top_k: int = 5) -> list:
+    """
+    Scores every candidate slot by how many required and optional attendees are free and how close it is
+    to the preferred start, and returns the top_k slots, best first. A top_k of None ranks every candidate.
+
+    Candidates are visited in order of distance from the preferred start, so the best score any remaining
+    slot could reach only decreases. The scan stops as soon as that bound cannot beat the current top_k.
+    """
+    optional_emails = optional_emails or []
+    starts = candidate_starts(windows, duration, granularity, busy_by_email)
+    if not starts:
+        return []
+    top_k = top_k or len(starts)
+    preferred_start = preferred_start or min(starts)
+
+    full_attendance = REQUIRED_WEIGHT * len(required_emails) + OPTIONAL_WEIGHT * len(optional_emails)
+    ordered = sorted(starts, key=lambda start: (abs((start - preferred_start).total_seconds()), start))
+
+    # Min-heap of the best slots so far; the worst one (lowest score, then latest start) sits on top.
+    heap = []
+    for start in ordered:
+        penalty = proximity_penalty(start, preferred_start)
+        if len(heap) >= top_k and heap[0][0] >= full_attendance - penalty:
+            break
+
+        end = start + duration
+        required_conflicts = [email for email in required_emails if overlaps(busy_by_email.get(email, []), start, end)]
+        optional_conflicts = [email for email in optional_emails if overlaps(busy_by_email.get(email, []), start, end)]
+        score = full_attendance - REQUIRED_WEIGHT * len(required_conflicts) - OPTIONAL_WEIGHT * len(optional_conflicts) - penalty
+
+        entry = (score, -start.timestamp(), start, required_conflicts, optional_conflicts)
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+    return [{
+        "start": start,
+        "end": start + duration,
+        "score": round(score, 2),
+        "required_conflicts": required_conflicts,
+        "optional_conflicts": optional_conflicts
+    } for score, _, start, required_conflicts, optional_conflicts in sorted(heap, key=lambda entry: (-entry[0], entry[2]))]
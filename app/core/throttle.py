@@ -0,0 +1,132 @@
+# app/core/throttle.py
+import copy
+import threading
+import time
+
+from app.core.capture import record_shared_calls, shared_calls
+from app.core.deadline import DeadlineExceeded, current_deadline
+from app.core.metrics import cache_lookup
+from app.core.tracing import span
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        """
+        Client-side rate limiter for one API. Tokens refill at rate_per_second up to burst, and each
+        request takes one token per call it makes, waiting for the bucket to refill when it is empty.
+        """
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("Rate must be positive and burst at least 1.")
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._stats = {"acquired": 0, "waited": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def acquire(self, tokens: int = 1):
+        """
+        Takes tokens, blocking until they are available. Requests larger than the burst wait for a full bucket.
+        Raises DeadlineExceeded instead of waiting past the active request deadline.
+        """
+        tokens = min(tokens, self.burst)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_second)
+            self._updated = now
+            # Reserve the tokens now, going into debt if needed, so waiters are served in arrival order
+            wait = max(0.0, (tokens - self._tokens) / self.rate_per_second)
+            deadline = current_deadline()
+            if wait and deadline is not None and wait >= deadline.remaining():
+                deadline.cut("google_api", "Rate limit wait would outlast the time budget.")
+                raise DeadlineExceeded("Request deadline exceeded while waiting for the rate limiter.")
+            self._tokens -= tokens
+            self._stats["acquired"] += tokens
+            if wait:
+                self._stats["waited"] += 1
+                self._stats["total_wait_seconds"] += wait
+                self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], wait)
+        if wait:
+            with span("rate_limit.wait", tokens=tokens, wait_seconds=round(wait, 4)):
+                time.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["rate_per_second"] = self.rate_per_second
+        snapshot["burst"] = self.burst
+        return snapshot
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.calls = []
+
+    def failed(self) -> bool:
+        # Raised errors, and the {'error': ...} results the Google clients return instead of raising
+        return self.error is not None or (isinstance(self.result, dict) and bool(self.result.get('error')))
+
+
+class SingleFlight:
+    def __init__(self, name: str = 'single_flight'):
+        """
+        Coalesces identical concurrent calls: while one is in flight, callers with the same key wait for its result.
+        Only successful results are shared. A failure may be the leader's own, such as its shorter deadline running
+        out or a transient error, so each waiting caller then makes the call itself, under its own deadline.
+        Coalesced calls count as cache hits under `name` in the metrics.
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.retried = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        cache_lookup(self.name, not leader)
+
+        if leader:
+            try:
+                with shared_calls() as calls:
+                    flight.result = fn()
+                flight.calls = calls
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        deadline = current_deadline()
+        with span("coalesced.wait", cache=self.name):
+            done = flight.done.wait(deadline.remaining() if deadline is not None else None)
+        if not done:
+            deadline.cut("google_api", "Timed out waiting on an identical call already in flight.")
+            raise DeadlineExceeded("Request deadline exceeded while waiting on a coalesced call.")
+        if flight.failed():
+            with self._lock:
+                self.retried += 1
+            return fn()
+        # Captured as this caller's own calls too, so replays of coalesced traffic are complete
+        record_shared_calls(flight.calls)
+        # Each caller gets its own copy, so one caller changing the result cannot affect another
+        return copy.deepcopy(flight.result)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "retried_after_failure": self.retried,
+                    "in_flight": len(self._flights)}
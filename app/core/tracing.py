@@ -0,0 +1,250 @@
+# app/core/tracing.py
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_current_request_id = contextvars.ContextVar('current_request_id', default=None)
+
+# Request ids taken from clients are echoed into headers and file names, so only simple ones are accepted
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._-]{1,128}$')
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$')
+
+# OTLP span kinds
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def new_request_id(incoming: str = None) -> str:
+    """The client's X-Request-ID if it is a plain token, otherwise a new random id."""
+    if incoming and REQUEST_ID_PATTERN.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> str:
+    return _current_request_id.get()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [{"key": name, "value": _otlp_value(value)} for name, value in attributes.items() if value is not None]
+
+
+class _Trace:
+    def __init__(self, tracer: 'Tracer', trace_id: str, request_id: str):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, trace: _Trace, name: str, parent_id: str = None, kind: str = "internal", attributes: dict = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.error = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, name: str, value):
+        self.attributes[name] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append((time.time_ns(), name, attributes))
+
+    def record_error(self, error: Exception):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        with self.trace.lock:
+            self.trace.spans.append(self)
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS.get(self.kind, 1),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [{"timeUnixNano": str(at), "name": name, "attributes": _otlp_attributes(attributes)}
+                       for at, name, attributes in self.events],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class FileSpanExporter:
+    def __init__(self, path: str):
+        """Appends each batch of traces to a file as one line of OTLP/JSON, as an OpenTelemetry collector's file exporter does."""
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, payload: dict):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(payload) + "\n")
+
+
+class OTLPHttpExporter:
+    def __init__(self, endpoint: str, timeout_seconds: float = 5.0):
+        """Sends traces as OTLP/JSON to a collector's HTTP receiver, e.g. http://127.0.0.1:4318."""
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.timeout_seconds = timeout_seconds
+
+    def export(self, payload: dict):
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'), method='POST',
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout_seconds) as response:
+            response.read()
+
+
+class Tracer:
+    def __init__(self, exporter=None, sample_rate: float = 1.0, service_name: str = 'meeting-assistant',
+                 max_queued_traces: int = 1000, max_batch_traces: int = 50):
+        """
+        Records a tree of spans for each sampled request and hands finished traces to the exporter on a
+        background thread, so a slow file or collector never delays a response. Without an exporter, or for
+        requests that are not sampled, only the request id is kept and spans cost nothing.
+        Traces that arrive while max_queued_traces are already waiting are dropped and counted.
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.max_batch_traces = max_batch_traces
+        self._queue = queue.Queue(maxsize=max_queued_traces)
+        self._lock = threading.Lock()
+        self._stats = {"traces": 0, "spans": 0, "dropped": 0, "export_errors": 0}
+        self._thread = None
+        if exporter is not None:
+            self._thread = threading.Thread(target=self._run, name='trace-export', daemon=True)
+            self._thread.start()
+
+    @contextmanager
+    def trace(self, name: str, request_id: str = None, traceparent: str = None, kind: str = "server", **attributes):
+        """
+        Makes request_id the current request id and, if the request is sampled, opens its root span.
+        A W3C traceparent header continues the caller's trace instead of starting a new one.
+        Yields the root span, or None when nothing is recorded.
+        """
+        request_id = request_id or new_request_id()
+        request_token = _current_request_id.set(request_id)
+        try:
+            if self.exporter is None or random.random() >= self.sample_rate:
+                yield None
+                return
+
+            match = TRACEPARENT_PATTERN.match(traceparent or '')
+            trace_id, parent_id = (match.group(1), match.group(2)) if match else (uuid.uuid4().hex, None)
+            root = Span(_Trace(self, trace_id, request_id), name, parent_id, kind, {"request.id": request_id, **attributes})
+            span_token = _current_span.set(root)
+            try:
+                yield root
+            except BaseException as e:
+                root.record_error(e)
+                raise
+            finally:
+                _current_span.reset(span_token)
+                root.end()
+                self._finish(root.trace)
+        finally:
+            _current_request_id.reset(request_token)
+
+    def _finish(self, trace: _Trace):
+        with trace.lock:
+            spans = list(trace.spans)
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return
+        with self._lock:
+            self._stats["traces"] += 1
+            self._stats["spans"] += len(spans)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch_traces:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            payload = {"resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{"scope": {"name": "app.core.tracing"},
+                                "spans": [span.to_otlp() for spans in batch for span in spans]}]
+            }]}
+            try:
+                self.exporter.export(payload)
+            except Exception as e:
+                with self._lock:
+                    self._stats["export_errors"] += 1
+                logger.warning("Trace export failed: %s", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot["queued"] = self._queue.qsize()
+        snapshot["sample_rate"] = self.sample_rate
+        return snapshot
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attributes):
+    """
+    Opens a child of the current span for the duration of the block and yields it.
+    Outside a sampled request it yields None and records nothing.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.end()
+
+
+def add_event(name: str, **attributes):
+    """Adds an event, e.g. a retry or a cache hit, to the current span if there is one."""
+    current = _current_span.get()
+    if current is not None:
+        current.add_event(name, **attributes)
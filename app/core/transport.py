@@ -0,0 +1,128 @@
+# app/core/transport.py
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import httplib2
+import google_auth_httplib2
+
+from app.core.deadline import DeadlineExceeded, call_timeout, current_deadline
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+class HttpPool:
+    def __init__(self, size: int = 10, timeout: float = None, wait_timeout: float = 30.0, authorize=None):
+        """
+        Checkout-based pool of httplib2 connections shared by all Google API clients.
+        httplib2.Http is not thread-safe, so each call borrows a connection for its duration.
+        Idle connections are reused most-recent-first to keep their keep-alive sockets warm.
+        A checkout waits for a free connection at most wait_timeout seconds, or what is left of the request deadline.
+        authorize, if given, wraps the credentials of each call; the CredentialManager uses it to take over token refreshes.
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.size = size
+        self.timeout = timeout
+        self.wait_timeout = wait_timeout
+        self.authorize = authorize
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "waited_checkouts": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "exhausted": 0,
+        }
+
+    def _acquire(self) -> httplib2.Http:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return httplib2.Http(timeout=self.timeout)
+
+        deadline = current_deadline()
+        wait = self.wait_timeout
+        if deadline is not None:
+            wait = min(wait, max(0.0, deadline.remaining()))
+        try:
+            return self._idle.get(timeout=wait)
+        except queue.Empty:
+            with self._lock:
+                self._stats["exhausted"] += 1
+            if deadline is not None and deadline.expired():
+                deadline.cut("google_api", "Timed out waiting for a free connection in the pool.")
+                raise DeadlineExceeded("Request deadline exceeded while waiting for a pooled connection.")
+            raise PoolExhausted(f"No pooled connection became free within {wait:.1f}s; all {self.size} are in use.")
+
+    @contextmanager
+    def checkout(self):
+        """
+        Borrows a connection from the pool, blocking while all of them are in use.
+        Raises DeadlineExceeded or PoolExhausted if none becomes free in time.
+        """
+        started = time.monotonic()
+        http = self._acquire()
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["total_wait_seconds"] += waited
+            self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], waited)
+            if waited > 0.001:
+                self._stats["waited_checkouts"] += 1
+
+        try:
+            yield http
+        finally:
+            self._idle.put(http)
+
+    def execute(self, request, credentials):
+        """
+        Executes a googleapiclient request on a pooled connection authorized with the given credentials.
+        The socket timeout is shortened to what is left of the request deadline, if one is active.
+        """
+        timeout = call_timeout(self.timeout, stage="google_api")
+        if self.authorize is not None:
+            credentials = self.authorize(credentials)
+        with self.checkout() as http:
+            self._set_timeout(http, timeout)
+            try:
+                return request.execute(http=google_auth_httplib2.AuthorizedHttp(credentials, http=http))
+            except Exception:
+                deadline = current_deadline()
+                if deadline is not None and deadline.expired():
+                    deadline.cut("google_api", "A Google API call timed out at the request deadline.")
+                    raise DeadlineExceeded("Request deadline exceeded.")
+                raise
+            finally:
+                self._set_timeout(http, self.timeout)
+
+    @staticmethod
+    def _set_timeout(http: httplib2.Http, timeout: float):
+        # httplib2 only applies its timeout to new connections, so kept-alive sockets are updated as well
+        http.timeout = timeout
+        for connection in list(http.connections.values()):
+            connection.timeout = timeout
+            if getattr(connection, 'sock', None) is not None:
+                connection.sock.settimeout(timeout)
+
+    def stats(self) -> dict:
+        """Returns a snapshot of pool usage and checkout wait times."""
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["size"] = self.size
+            snapshot["created"] = self._created
+        snapshot["idle"] = self._idle.qsize()
+        snapshot["avg_wait_seconds"] = snapshot["total_wait_seconds"] / snapshot["checkouts"] if snapshot["checkouts"] else 0.0
+        return snapshot
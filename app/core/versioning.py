@@ -0,0 +1,103 @@
+# app/core/versioning.py
+import threading
+import time
+import uuid
+from collections import deque
+
+from app.core.metrics import cache_lookup
+
+
+class ChangeLog:
+    def __init__(self, max_changes: int = 1000):
+        """
+        Version counter for a collection, with a bounded log of which keys changed in each version.
+        Cursors carry a per-process epoch, so a cursor or ETag issued before a restart never matches.
+        """
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.max_changes = max_changes
+        self._changes = deque()
+        # Highest version with entries dropped from the log; cursors before it can no longer get a delta
+        self._truncated_version = 0
+        self._lock = threading.Lock()
+
+    def record(self, changed: list = (), removed: list = ()) -> int:
+        """Bumps the version once for a set of changed and removed keys."""
+        with self._lock:
+            if not changed and not removed:
+                return self.version
+            self.version += 1
+            for key in changed:
+                self._changes.append((self.version, key, False))
+            for key in removed:
+                self._changes.append((self.version, key, True))
+            while len(self._changes) > self.max_changes:
+                self._truncated_version = self._changes.popleft()[0]
+            return self.version
+
+    def cursor(self) -> str:
+        return f"{self.epoch}.{self.version}"
+
+    def since(self, cursor: str) -> tuple:
+        """
+        Returns (changed_keys, removed_keys) since a cursor, or None when the cursor is from another epoch
+        or older than the log, in which case the caller sends the full collection.
+        """
+        try:
+            epoch, version = cursor.split('.')
+            version = int(version)
+        except (AttributeError, ValueError):
+            return None
+        with self._lock:
+            if epoch != self.epoch or version > self.version or version < self._truncated_version:
+                return None
+            changed, removed = set(), set()
+            for change_version, key, is_removal in self._changes:
+                if change_version <= version:
+                    continue
+                if is_removal:
+                    changed.discard(key)
+                    removed.add(key)
+                else:
+                    removed.discard(key)
+                    changed.add(key)
+            return changed, removed
+
+
+class VersionedSnapshot:
+    def __init__(self, fetch, ttl_seconds: float = 60, max_changes: int = 1000, name: str = 'snapshot'):
+        """
+        Keeps the last fetched list of items (dicts with an 'id') and versions it with a ChangeLog.
+        The list is fetched again once it is older than ttl_seconds or has been invalidated, and the version
+        only moves when the new list differs, so unchanged data keeps its ETag. Reads served without a fetch
+        count as cache hits under `name` in the metrics.
+        """
+        self.name = name
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.changes = ChangeLog(max_changes)
+        self._items = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = None
+
+    def current(self) -> tuple:
+        """
+        Returns (items by id, cursor), refreshing the items first if needed. The dict must not be modified.
+        Fetch errors propagate and leave the previous items in place.
+        """
+        with self._lock:
+            if self._fetched_at is not None and time.monotonic() - self._fetched_at < self.ttl_seconds:
+                cache_lookup(self.name, True)
+                return self._items, self.changes.cursor()
+            cache_lookup(self.name, False)
+            items = {item['id']: item for item in self.fetch()}
+            changed = [item_id for item_id, item in items.items() if self._items.get(item_id) != item]
+            removed = [item_id for item_id in self._items if item_id not in items]
+            self.changes.record(changed, removed)
+            self._items = items
+            self._fetched_at = time.monotonic()
+            return items, self.changes.cursor()
@@ -0,0 +1,193 @@
+# app/core/warmup.py
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from app.core.calendar_api import FREEBUSY_MAX_CALENDARS
+
+logger = logging.getLogger(__name__)
+
+
+class ContactFrequency:
+    def __init__(self, path: str = None, max_contacts: int = 10000, save_interval_seconds: float = 60):
+        """
+        Counts how often each contact is resolved as a participant, so warm-up knows who the user meets most.
+        With a path, the counts are loaded from it and written back at most every save_interval_seconds and
+        at exit, so they outlive restarts. Only the max_contacts most frequent contacts are kept.
+        """
+        self.path = path
+        self.max_contacts = max_contacts
+        self.save_interval_seconds = save_interval_seconds
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        if path:
+            self._load()
+            atexit.register(self.save)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self._counts.update({email: int(count) for email, count in json.load(f).items()})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("Could not load contact frequencies from %s: %s", self.path, e)
+
+    def record(self, emails: list):
+        if not emails:
+            return
+        with self._lock:
+            self._counts.update(email.lower() for email in emails)
+            if len(self._counts) > self.max_contacts:
+                self._counts = Counter(dict(self._counts.most_common(self.max_contacts)))
+            due = self.path and time.monotonic() - self._saved_at >= self.save_interval_seconds
+            if due:
+                self._saved_at = time.monotonic()
+        if due:
+            self.save()
+
+    def top(self, limit: int) -> list:
+        """The emails of the limit most frequently resolved contacts, most frequent first."""
+        with self._lock:
+            return [email for email, _ in self._counts.most_common(limit)]
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            counts = dict(self._counts)
+        # Written to a temporary file first, so a crash or a second process never leaves a torn file behind
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'w') as f:
+                json.dump(counts, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning("Could not save contact frequencies to %s: %s", self.path, e)
+
+
+class CacheWarmer:
+    def __init__(self, agent, fetch_events=None, days: int = 7, top_contacts: int = 20, concurrency: int = 4,
+                 timeout_seconds: float = 60):
+        """
+        Fills the caches the first requests would otherwise fill: the directory indexes, the upcoming events
+        (through fetch_events), and the busy data of the user and of the top_contacts most frequently resolved
+        contacts for the next `days` days, which also opens the Google connections and refreshes the tokens.
+        Runs on a background thread with at most `concurrency` tasks at once. Warm-up counts as finished when
+        every task has ended, failed or not, or after timeout_seconds, whichever comes first.
+        """
+        self.agent = agent
+        self.fetch_events = fetch_events
+        self.days = days
+        self.top_contacts = top_contacts
+        self.concurrency = concurrency
+        self.timeout_seconds = timeout_seconds
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._state = "pending"
+        self._tasks = {}
+        self._started_at = None
+        self._finished_at = None
+        self._fork_hook_registered = False
+
+    def start(self):
+        """Starts warming up in the background. A process forked afterwards warms its own caches again."""
+        if not self._fork_hook_registered and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_after_fork)
+            self._fork_hook_registered = True
+        with self._lock:
+            self._done.clear()
+            self._state = "running"
+            self._tasks = {}
+            self._started_at = time.monotonic()
+            self._finished_at = None
+        threading.Thread(target=self._run, name='cache-warmup', daemon=True).start()
+
+    def _restart_after_fork(self):
+        # Only the forking thread survives a fork, so a warm-up that was running there is lost with its thread
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.start()
+
+    def _work(self) -> list:
+        """(name, callable) for each warm-up task."""
+        work = [("directory_indexes", self.agent.directory_api.contact_indexes)]
+        if self.fetch_events is not None:
+            work.append(("upcoming_events", self.fetch_events))
+
+        now = datetime.now(self.agent.pune_timezone)
+        time_max = now + timedelta(days=self.days)
+        user_email = self.agent.user_email.lower()
+        work.append(("own_busy", lambda: self._fetch_busy([user_email], now, time_max)))
+
+        contacts = [email for email in self.agent.contact_frequency.top(self.top_contacts) if email != user_email]
+        for offset in range(0, len(contacts), FREEBUSY_MAX_CALENDARS):
+            group = contacts[offset:offset + FREEBUSY_MAX_CALENDARS]
+            work.append((f"contacts_busy_{offset // FREEBUSY_MAX_CALENDARS}", lambda group=group: self._fetch_busy(group, now, time_max)))
+        return work
+
+    def _fetch_busy(self, emails: list, time_min: datetime, time_max: datetime):
+        calendars = self.agent.calendar_api.get_free_busy_sharded(emails, time_min, time_max)
+        if calendars.get('error'):
+            raise RuntimeError(calendars['error'])
+
+    def _run_task(self, name: str, fn):
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.warning("Cache warm-up task %s failed: %s", name, e)
+            result = {"status": "failed", "error": str(e)}
+        else:
+            result = {"status": "done"}
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        with self._lock:
+            self._tasks[name] = result
+
+    def _run(self):
+        try:
+            work = self._work()
+        except Exception as e:
+            logger.exception("Cache warm-up could not start: %s", e)
+            work = []
+        with self._lock:
+            self._tasks = {name: {"status": "pending"} for name, _ in work}
+        logger.info("Warming caches: %s", ", ".join(name for name, _ in work))
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='cache-warmup')
+        futures = [executor.submit(self._run_task, name, fn) for name, fn in work]
+        _, not_done = wait(futures, timeout=self.timeout_seconds)
+        # Tasks still running carry on, but no longer hold back readiness
+        executor.shutdown(wait=False)
+
+        with self._lock:
+            self._state = "timed_out" if not_done else "done"
+            self._finished_at = time.monotonic()
+            failed = sum(1 for task in self._tasks.values() if task["status"] == "failed")
+            seconds = self._finished_at - self._started_at
+        self._done.set()
+        logger.info("Cache warm-up %s in %.2fs: %d tasks, %d failed, %d unfinished.",
+                    self._state, seconds, len(work), failed, len(not_done))
+
+    def ready(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until warm-up has finished or timeout passes. Returns whether it finished."""
+        return self._done.wait(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            end = self._finished_at if self._finished_at is not None else time.monotonic()
+            return {
+                "state": self._state,
+                "seconds": round(end - self._started_at, 3) if self._started_at is not None else None,
+                "tasks": {name: dict(task) for name, task in self._tasks.items()}
+            }
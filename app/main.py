@@ -1,19 +1,48 @@
 import os
 import json
+import logging
 import ssl
+import threading
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_file
+import time
+from contextlib import ExitStack
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from app.core.log import Payload, configure_logging, dropped_records
+
+# Records are formatted and written on a background thread; LOG_FORMAT is 'text' or 'json'
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", 2000))
+# Share of request and response bodies logged at DEBUG that are kept
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 1.0))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, max_message_chars=LOG_MAX_MESSAGE_CHARS,
+                  payload_sample_rate=LOG_PAYLOAD_SAMPLE_RATE, queue_size=LOG_QUEUE_SIZE)
+logger = logging.getLogger(__name__)
+
 if os.getenv('DISABLE_SSL_VERIFICATION', 'False').lower() == 'true':
     ssl._create_default_https_context = ssl._create_unverified_context
-    print("SSL verification disabled.")
+    logger.warning("SSL verification disabled.")
 
 from app.core.agent import MeetingAgent
 from app.core.directory_api import GoogleDirectoryAPI # Import the updated Directory API
+from app.core.credentials import CredentialManager
+from app.core.deadline import Deadline
+from app.core.jobs import JobQueue, JobQueueFull
+from app.core.versioning import VersionedSnapshot
+from app.core.change_feed import ChangeFeed, CalendarSync, LocalEventSource
+from app.core.metrics import REGISTRY, HTTP_REQUESTS, HTTP_DURATION, HTTP_IN_FLIGHT, cache_lookup
+from app.core.tracing import Tracer, FileSpanExporter, OTLPHttpExporter, new_request_id
+from app.core.profiling import RequestProfiler
+from app.core.capture import TrafficRecorder
+from app.core.warmup import CacheWarmer, ContactFrequency
+from app.core.intent_classifier import IntentClassifier, IntentModel, default_model
+from app.core.idempotency import IdempotencyCache, IdempotencyKeyReused, IdempotencyKeyInProgress, request_fingerprint
 
 app = Flask(__name__, static_folder='.', static_url_path='')
 CORS(app)
@@ -24,12 +53,114 @@ GMAIL_TOKEN_PATH = os.getenv("GMAIL_TOKEN_PATH")
 CALENDAR_TOKEN_PATH = os.getenv("CALENDAR_TOKEN_PATH", "token_personal_calendar.json")
 USER_EMAIL = os.getenv("YOUR_COLLEGE_EMAIL_ID_FOR_TESTING")
 MEETING_TIMEZONE = os.getenv("MEETING_TIMEZONE", 'Asia/Kolkata')
+TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TOKEN_REFRESH_MARGIN_SECONDS", 300))
+TOKEN_REFRESH_INTERVAL_SECONDS = int(os.getenv("TOKEN_REFRESH_INTERVAL_SECONDS", 60))
+GOOGLE_HTTP_POOL_SIZE = int(os.getenv("GOOGLE_HTTP_POOL_SIZE", 10))
+# Longest a call waits for a free pooled connection when no request deadline is shorter
+GOOGLE_HTTP_POOL_WAIT_SECONDS = float(os.getenv("GOOGLE_HTTP_POOL_WAIT_SECONDS", 30))
+SLOT_GRANULARITY_MINUTES = int(os.getenv("SLOT_GRANULARITY_MINUTES", 15))
+WORKING_HOURS_START = int(os.getenv("WORKING_HOURS_START", 9))
+WORKING_HOURS_END = int(os.getenv("WORKING_HOURS_END", 17))
+MAX_SEARCH_HORIZON_DAYS = int(os.getenv("MAX_SEARCH_HORIZON_DAYS", 14))
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", 100))
+BATCH_PARSE_CONCURRENCY = int(os.getenv("BATCH_PARSE_CONCURRENCY", 4))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", 8))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 20))
+GOOGLE_HTTP_TIMEOUT_SECONDS = float(os.getenv("GOOGLE_HTTP_TIMEOUT_SECONDS", 30))
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", 30))
+CALENDAR_RATE_LIMIT_PER_SECOND = float(os.getenv("CALENDAR_RATE_LIMIT_PER_SECOND", 10))
+CALENDAR_RATE_LIMIT_BURST = int(os.getenv("CALENDAR_RATE_LIMIT_BURST", 20))
+GMAIL_RATE_LIMIT_PER_SECOND = float(os.getenv("GMAIL_RATE_LIMIT_PER_SECOND", 5))
+GMAIL_RATE_LIMIT_BURST = int(os.getenv("GMAIL_RATE_LIMIT_BURST", 10))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 1000))
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", 1000))
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", 500))
+UPCOMING_EVENTS_TTL_SECONDS = int(os.getenv("UPCOMING_EVENTS_TTL_SECONDS", 60))
+CHANGE_FEED_BACKLOG = int(os.getenv("CHANGE_FEED_BACKLOG", 1000))
+CHANGE_FEED_WAIT_SECONDS = float(os.getenv("CHANGE_FEED_WAIT_SECONDS", 25))
+CALENDAR_SYNC_INTERVAL_SECONDS = int(os.getenv("CALENDAR_SYNC_INTERVAL_SECONDS", 30))
+# 'google' syncs the real calendar, our own writes included; 'local' uses an in-memory stand-in plus our own writes;
+# 'off' only reports this server's own writes
+CALENDAR_SYNC_SOURCE = os.getenv("CALENDAR_SYNC_SOURCE", "google").lower()
+# 'file' appends traces to TRACE_FILE_PATH, 'otlp' sends them to a collector at TRACE_OTLP_ENDPOINT, 'off' keeps only request ids
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "off").lower()
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", 1.0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+# Requests slower than this keep a stack-sample profile; 0 turns it off
+PROFILE_SLOW_SECONDS = float(os.getenv("PROFILE_SLOW_SECONDS", 0))
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", 0.01))
+# JSON Lines file that /process_query and /meetings traffic is captured to, for benchmarks/replay.py; unset turns it off
+CAPTURE_PATH = os.getenv("CAPTURE_PATH")
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", 1.0))
+# Warms the directory indexes, upcoming events and busy data of frequent contacts at startup; /readyz waits for it
+CACHE_WARMUP = os.getenv("CACHE_WARMUP", "False").lower() == "true"
+WARMUP_DAYS = int(os.getenv("WARMUP_DAYS", 7))
+WARMUP_TOP_CONTACTS = int(os.getenv("WARMUP_TOP_CONTACTS", 20))
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 4))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 60))
+# Where the per-contact resolution counts warm-up ranks contacts by are kept across restarts
+CONTACT_FREQUENCY_PATH = os.getenv("CONTACT_FREQUENCY_PATH", "contact_frequency.json")
+# Answers plainly non-meeting queries locally instead of calling Gemini; without INTENT_MODEL_PATH the built-in model is used
+INTENT_CLASSIFIER = os.getenv("INTENT_CLASSIFIER", "False").lower() == "true"
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH")
+# Unset uses the threshold stored with the model, picked from its held-out recall on meeting requests
+INTENT_SKIP_THRESHOLD = os.getenv("INTENT_SKIP_THRESHOLD")
+INTENT_AUDIT_RATE = float(os.getenv("INTENT_AUDIT_RATE", 0.05))
+
+# Meeting actions that honor the Idempotency-Key header
+IDEMPOTENT_ACTIONS = {'schedule', 'update', 'cancel'}
+idempotency_cache = IdempotencyCache(max_entries=IDEMPOTENCY_CACHE_SIZE, ttl_seconds=IDEMPOTENCY_TTL_SECONDS)
+# Makes checking a key against the other path and claiming it one step, for direct requests and queued jobs alike
+idempotency_key_lock = threading.Lock()
+
+if TRACE_EXPORTER == 'file':
+    trace_exporter = FileSpanExporter(TRACE_FILE_PATH)
+elif TRACE_EXPORTER == 'otlp':
+    trace_exporter = OTLPHttpExporter(TRACE_OTLP_ENDPOINT)
+else:
+    trace_exporter = None
+tracer = Tracer(trace_exporter, sample_rate=TRACE_SAMPLE_RATE)
+request_profiler = RequestProfiler(PROFILE_DIR, sample_rate=PROFILE_SAMPLE_RATE, slow_seconds=PROFILE_SLOW_SECONDS,
+                                   interval_seconds=PROFILE_INTERVAL_SECONDS)
+traffic_recorder = TrafficRecorder(CAPTURE_PATH, sample_rate=CAPTURE_SAMPLE_RATE) if CAPTURE_PATH else None
+# Routes whose traffic is captured
+CAPTURED_ROUTES = {'/process_query', '/meetings'}
+
+intent_classifier = None
+if INTENT_CLASSIFIER:
+    try:
+        intent_model = IntentModel.load(INTENT_MODEL_PATH) if INTENT_MODEL_PATH else default_model()
+        intent_classifier = IntentClassifier(intent_model, audit_rate=INTENT_AUDIT_RATE,
+                                             skip_threshold=float(INTENT_SKIP_THRESHOLD) if INTENT_SKIP_THRESHOLD else None)
+        logger.info("Intent classifier loaded with %d features and skip threshold %.4f.",
+                    len(intent_model.weights), intent_classifier.skip_threshold)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("Could not load the intent model from %s; every query goes to Gemini: %s", INTENT_MODEL_PATH, e)
 
 try:
     # --- CHANGE START ---
     # First, initialize the GoogleDirectoryAPI instance
     directory_api = GoogleDirectoryAPI()
 
+    # One credential manager keeps the Calendar and Gmail tokens fresh and owns their shared connection pool
+    credential_manager = CredentialManager(
+        refresh_margin_seconds=TOKEN_REFRESH_MARGIN_SECONDS,
+        check_interval_seconds=TOKEN_REFRESH_INTERVAL_SECONDS,
+        pool_size=GOOGLE_HTTP_POOL_SIZE,
+        http_timeout_seconds=GOOGLE_HTTP_TIMEOUT_SECONDS,
+        pool_wait_seconds=GOOGLE_HTTP_POOL_WAIT_SECONDS,
+        rate_limits={
+            'calendar': (CALENDAR_RATE_LIMIT_PER_SECOND, CALENDAR_RATE_LIMIT_BURST),
+            'gmail': (GMAIL_RATE_LIMIT_PER_SECOND, GMAIL_RATE_LIMIT_BURST)
+        }
+    )
+
     # Then, initialize the MeetingAgent and pass the directory_api instance to it
     meeting_agent = MeetingAgent(
         api_key=GEMINI_API_KEY,
@@ -38,17 +169,182 @@ try:
         calendar_token_path=CALENDAR_TOKEN_PATH,
         user_email=USER_EMAIL,
         timezone=MEETING_TIMEZONE,
-        directory_api=directory_api # Pass the initialized object
+        directory_api=directory_api, # Pass the initialized object
+        credential_manager=credential_manager,
+        slot_granularity_minutes=SLOT_GRANULARITY_MINUTES,
+        working_hours=(WORKING_HOURS_START, WORKING_HOURS_END),
+        max_search_horizon_days=MAX_SEARCH_HORIZON_DAYS,
+        llm_timeout_seconds=GEMINI_TIMEOUT_SECONDS,
+        contact_frequency=ContactFrequency(CONTACT_FREQUENCY_PATH),
+        intent_classifier=intent_classifier
     )
-    print("MeetingAgent and DirectoryAPI initialized successfully.")
+    credential_manager.start()
+    logger.info("MeetingAgent and DirectoryAPI initialized successfully.")
 except Exception as e:
-    print(f"Failed to initialize MeetingAgent: {e}")
+    logger.error("Failed to initialize MeetingAgent: %s", e)
     meeting_agent = None
 
+def run_job(action: str, payload: dict) -> tuple:
+    """Runs a queued meeting write on a job worker thread."""
+    with app.app_context(), tracer.trace(f"job {action}", kind="internal", **{"job.action": action}):
+        response = app.make_response(run_meeting_action(payload))
+        return response.get_json(), response.status_code
+
+job_queue = None
+
+def metrics_endpoint() -> str:
+    """Route rule of the current request, so metric labels stay bounded whatever the URL."""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+@app.before_request
+def start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_endpoint = metrics_endpoint()
+    HTTP_IN_FLIGHT.inc(endpoint=g.metrics_endpoint)
+
+    # The request id, trace and profile stay open until teardown, so they cover streamed responses to the end
+    g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+    g.request_scope = ExitStack()
+    g.trace_root = g.request_scope.enter_context(tracer.trace(
+        f"{request.method} {g.metrics_endpoint}", request_id=g.request_id, traceparent=request.headers.get('traceparent'),
+        **{"http.method": request.method, "http.route": g.metrics_endpoint}))
+    g.request_scope.enter_context(request_profiler.profile(g.request_id))
+    if traffic_recorder is not None and g.metrics_endpoint in CAPTURED_ROUTES:
+        g.capture = g.request_scope.enter_context(traffic_recorder.capture(
+            g.request_id, request.method, request.path, request.headers, request.get_json(silent=True)))
+
+@app.after_request
+def finish_response(response):
+    # Streamed responses are timed to their first byte
+    if 'metrics_started' in g:
+        HTTP_DURATION.observe(time.perf_counter() - g.metrics_started, endpoint=g.metrics_endpoint, method=request.method)
+        HTTP_REQUESTS.inc(endpoint=g.metrics_endpoint, method=request.method, status=response.status_code)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    if g.get('trace_root') is not None:
+        g.trace_root.set_attribute("http.status_code", response.status_code)
+    if g.get('capture') is not None:
+        g.capture["status_code"] = response.status_code
+        g.capture["response_status"] = (response.get_json(silent=True) or {}).get("status")
+    return response
+
+@app.teardown_request
+def finish_request(error=None):
+    if 'metrics_endpoint' in g:
+        HTTP_IN_FLIGHT.dec(endpoint=g.metrics_endpoint)
+    if 'request_scope' in g:
+        g.request_scope.__exit__(type(error) if error else None, error, error.__traceback__ if error else None)
+
+def collect_component_metrics() -> list:
+    """Figures the clients, pool, queues and caches already keep, read at scrape time."""
+    families = []
+    if meeting_agent:
+        health = meeting_agent.dependency_health()
+        breaker_states = {"closed": 0, "half_open": 1, "open": 2}
+        families.append(('meeting_circuit_breaker_state', 'gauge', "Circuit breaker per dependency: 0 closed, 1 half open, 2 open.",
+                         [({"dependency": name}, breaker_states.get(stats["state"], 2)) for name, stats in health.items()]))
+        families.append(('meeting_outbound_retries_total', 'counter', "Retried calls per dependency.",
+                         [({"dependency": name}, stats["retries"]) for name, stats in health.items()]))
+        families.append(('meeting_circuit_breaker_rejected_total', 'counter', "Calls refused by an open circuit breaker.",
+                         [({"dependency": name}, stats["rejected"]) for name, stats in health.items()]))
+        limiters = {name: stats["rate_limiter"] for name, stats in health.items() if "rate_limiter" in stats}
+        families.append(('meeting_rate_limiter_waits_total', 'counter', "Calls that waited for the client-side rate limiter.",
+                         [({"dependency": name}, stats["waited"]) for name, stats in limiters.items()]))
+        families.append(('meeting_rate_limiter_wait_seconds_total', 'counter', "Time spent waiting for the client-side rate limiter.",
+                         [({"dependency": name}, stats["total_wait_seconds"]) for name, stats in limiters.items()]))
+
+        pool = meeting_agent.credential_manager.http_pool.stats()
+        families.append(('meeting_http_pool_connections', 'gauge', "Google API connections in the pool, by state.",
+                         [({"state": "created"}, pool["created"]), ({"state": "idle"}, pool["idle"]), ({"state": "max"}, pool["size"])]))
+        families.append(('meeting_http_pool_checkouts_total', 'counter', "Connection checkouts, and those that had to wait.",
+                         [({"waited": "false"}, pool["checkouts"] - pool["waited_checkouts"]), ({"waited": "true"}, pool["waited_checkouts"])]))
+        families.append(('meeting_http_pool_wait_seconds_total', 'counter', "Time spent waiting for a pooled connection.",
+                         [({}, pool["total_wait_seconds"])]))
+        families.append(('meeting_http_pool_exhausted_total', 'counter', "Checkouts that gave up waiting for a free connection.",
+                         [({}, pool["exhausted"])]))
+    if job_queue:
+        jobs = job_queue.stats()
+        families.append(('meeting_jobs_pending', 'gauge', "Queued and running meeting jobs.", [({}, jobs["pending"])]))
+        families.append(('meeting_jobs', 'gauge', "Stored meeting jobs, by status.",
+                         [({"status": status}, count) for status, count in jobs["jobs_by_status"].items()]))
+    idempotency = idempotency_cache.stats()
+    families.append(('meeting_idempotency_entries', 'gauge', "Stored idempotent results and requests still running.",
+                     [({"state": "cached"}, idempotency["cached"]), ({"state": "in_flight"}, idempotency["in_flight"])]))
+    feed = change_feed.stats()
+    families.append(('meeting_change_feed_published_total', 'counter', "Calendar changes published to clients.", [({}, feed["published"])]))
+    families.append(('meeting_change_feed_waiting_clients', 'gauge', "Clients waiting on the change feed.", [({}, feed["waiting_clients"])]))
+    if calendar_sync is not None:
+        syncs = calendar_sync.stats()
+        families.append(('meeting_calendar_syncs_total', 'counter', "Calendar syncs, by kind.",
+                         [({"kind": "full"}, syncs["full_syncs"]), ({"kind": "incremental"}, syncs["incremental_syncs"])]))
+        families.append(('meeting_calendar_full_sync_events', 'gauge', "Events read by the last full calendar sync.",
+                         [({}, syncs["last_full_sync_events"])]))
+        families.append(('meeting_calendar_full_sync_seconds', 'gauge', "Duration of the last full calendar sync.",
+                         [({}, syncs["last_full_sync_seconds"])]))
+    traces = tracer.stats()
+    families.append(('meeting_traces_total', 'counter', "Sampled request traces, by what became of them.",
+                     [({"result": "queued"}, traces["traces"]), ({"result": "dropped"}, traces["dropped"])]))
+    families.append(('meeting_trace_export_errors_total', 'counter', "Trace batches the exporter failed to send.", [({}, traces["export_errors"])]))
+    families.append(('meeting_log_records_dropped_total', 'counter', "Log records dropped because the logging queue was full.", [({}, dropped_records())]))
+    if traffic_recorder is not None:
+        captured = traffic_recorder.stats()
+        families.append(('meeting_captured_requests_total', 'counter', "Requests captured for replay, and those dropped.",
+                         [({"result": "captured"}, captured["captured"]), ({"result": "dropped"}, captured["dropped"])]))
+    if meeting_agent and meeting_agent.intent_classifier is not None:
+        intents = meeting_agent.intent_classifier.stats()
+        families.append(('meeting_intent_classifier_decisions_total', 'counter',
+                         "Queries the local classifier sent to Gemini, sent because of a meeting word, time, date or contact "
+                         "name, answered locally, or sent anyway to check a skip.",
+                         [({"decision": "llm"}, intents["predictions"] - intents["guarded"] - intents["skipped"] - intents["audited"]),
+                          ({"decision": "guarded"}, intents["guarded"]),
+                          ({"decision": "skipped"}, intents["skipped"]), ({"decision": "audited"}, intents["audited"])]))
+        families.append(('meeting_intent_classifier_outcomes_total', 'counter',
+                         "Local decisions against Gemini's intent, as classifier/gemini.",
+                         [({"outcome": outcome}, count) for outcome, count in intents["agreement"].items()]))
+        families.append(('meeting_intent_classifier_seconds_total', 'counter', "Time spent classifying queries locally.",
+                         [({}, intents["predict_seconds"])]))
+    if cache_warmer is not None:
+        warmup = cache_warmer.stats()
+        families.append(('meeting_warmup_ready', 'gauge', "1 once cache warm-up has finished.", [({}, int(cache_warmer.ready()))]))
+        families.append(('meeting_warmup_task_seconds', 'gauge', "Time each cache warm-up task took, by outcome.",
+                         [({"task": name, "status": task["status"]}, task.get("seconds", 0)) for name, task in warmup["tasks"].items()]))
+    families.append(('meeting_profiles_total', 'counter', "Request profiles written, or skipped while another cProfile ran.",
+                     [({"kind": kind}, count) for kind, count in request_profiler.stats().items()]))
+    return families
+
+REGISTRY.register_collector(collect_component_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: request, stage and outbound call latencies, errors, cache hits and component state."""
+    return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """Ready once the agent is up and, with CACHE_WARMUP on, its caches are warm; 503 until then."""
+    if not meeting_agent:
+        return jsonify({"status": "error", "message": "MeetingAgent is not initialized."}), 503
+    if cache_warmer is None:
+        return jsonify({"status": "ready", "warmup": {"state": "off"}})
+    warmup = cache_warmer.stats()
+    if not cache_warmer.ready():
+        return jsonify({"status": "warming", "warmup": warmup}), 503
+    return jsonify({"status": "ready", "warmup": warmup})
+
 @app.route('/')
 def serve_frontend():
     return send_file('book-meeting-frontend.html')
 
+def request_deadline(requested_seconds) -> Deadline:
+    """Time budget for a query: REQUEST_DEADLINE_SECONDS, or a shorter 'deadline_seconds' sent by the client."""
+    seconds = REQUEST_DEADLINE_SECONDS
+    try:
+        if requested_seconds is not None and float(requested_seconds) > 0:
+            seconds = min(seconds, float(requested_seconds))
+    except (TypeError, ValueError):
+        pass
+    return Deadline(seconds)
+
 @app.route('/process_query', methods=['POST'])
 def process_query():
     if not meeting_agent:
@@ -58,19 +354,125 @@ def process_query():
     if not user_query:
         return jsonify({"status": "error", "message": "No query provided."}), 400
 
-    print(f"Received query: {user_query}")
-    response_data = meeting_agent.process_meeting_request(user_query)
-    print(f"Sending response: {response_data}")
+    logger.info("Received query: %s", user_query)
+    response_data = meeting_agent.process_meeting_request(user_query, deadline=request_deadline(request.json.get('deadline_seconds')))
+    logger.debug("Sending response: %s", Payload(response_data))
     return jsonify(response_data)
 
+@app.route('/process_query/batch', methods=['POST'])
+def process_query_batch():
+    if not meeting_agent:
+        return jsonify({"status": "error", "message": "Backend not initialized. Check server logs for errors."}), 500
+
+    queries = request.json.get('queries')
+    if not queries or not isinstance(queries, list) or not all(isinstance(query, str) and query for query in queries):
+        return jsonify({"status": "error", "message": "A non-empty list of queries is required."}), 400
+    if len(queries) > BATCH_MAX_QUERIES:
+        return jsonify({"status": "error", "message": f"At most {BATCH_MAX_QUERIES} queries can be sent in one batch."}), 400
+
+    logger.info("Received batch of %d queries", len(queries))
+    response_data = meeting_agent.process_meeting_requests(queries, parse_concurrency=BATCH_PARSE_CONCURRENCY, max_workers=BATCH_MAX_WORKERS,
+                                                           deadline=request_deadline(request.json.get('deadline_seconds')))
+    logger.info("Batch finished: %s", response_data['message'])
+    return jsonify(response_data)
+
+@app.route('/process_query/stream', methods=['GET', 'POST'])
+def process_query_stream():
+    """Streams each pipeline stage as a Server-Sent Event, ending with a 'result' event holding the full response."""
+    if not meeting_agent:
+        return jsonify({"status": "error", "message": "Backend not initialized. Check server logs for errors."}), 500
+
+    params = request.json if request.method == 'POST' else request.args
+    user_query = params.get('query')
+    if not user_query:
+        return jsonify({"status": "error", "message": "No query provided."}), 400
+    deadline = request_deadline(params.get('deadline_seconds'))
+
+    def sse(event: str, data) -> str:
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    def generate():
+        logger.info("Received streaming query: %s", user_query)
+        stages = meeting_agent.iter_meeting_request(user_query, deadline=deadline)
+        while True:
+            try:
+                stage, data = next(stages)
+            except StopIteration as finished:
+                yield sse("result", finished.value)
+                return
+            except Exception as e:
+                logger.exception("Error while streaming query: %s", e)
+                yield sse("error", {"status": "error", "message": f"An unexpected error occurred: {e}"})
+                return
+            yield sse(stage, data)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/meetings', methods=['POST'])
 def handle_meetings():
+    """
+    Runs a meeting action. Schedule, update and cancel requests sent with an Idempotency-Key header run at most
+    once per key: a repeat gets the stored result of the first successful request, without calling Google again.
+    With "async": true they are queued instead, and the response is 202 with a job to poll at /jobs/<id>.
+    Both paths share one key space: a key already used on one of them is rejected on the other.
+    """
     if not meeting_agent:
         return jsonify({"status": "error", "message": "Backend not initialized. Check server logs for errors."}), 500
 
+    data = request.json
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if data.get('async') and data.get('action') in IDEMPOTENT_ACTIONS:
+        with idempotency_key_lock:
+            if idempotency_key and idempotency_cache.contains(idempotency_key):
+                return jsonify({"status": "error", "message": "This Idempotency-Key was already used for a request that was not queued."}), 422
+            return submit_meeting_job(data, idempotency_key)
+    if not idempotency_key or data.get('action') not in IDEMPOTENT_ACTIONS or data.get('dry_run'):
+        return run_meeting_action(data)
+
+    def execute():
+        # The key is already reserved in the cache here, so no job can claim it after this check
+        with idempotency_key_lock:
+            if job_queue and job_queue.find(idempotency_key):
+                return {"status": "error", "message": "This Idempotency-Key was already used for a queued job."}, 422
+        response = app.make_response(run_meeting_action(data))
+        return response.get_json(), response.status_code
+
     try:
-        data = request.json
-        print(f"handle_meetings endpoint received raw JSON data: {data}")
+        body, status_code, replayed = idempotency_cache.run(idempotency_key, request_fingerprint(data), execute)
+    except IdempotencyKeyReused as e:
+        return jsonify({"status": "error", "message": str(e)}), 422
+    except IdempotencyKeyInProgress as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+
+    response = jsonify(body)
+    response.status_code = status_code
+    if replayed:
+        logger.info("handle_meetings: replayed stored result for Idempotency-Key '%s'", idempotency_key)
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def submit_meeting_job(data: dict, idempotency_key: str = None):
+    payload = {name: value for name, value in data.items() if name != 'async'}
+    if payload['action'] in ('update', 'cancel') and not payload.get('eventId'):
+        return jsonify({"status": "error", "message": f"Event ID is required for {'updating' if payload['action'] == 'update' else 'canceling'}."}), 400
+
+    try:
+        job = job_queue.submit(payload['action'], payload, event_key=payload.get('eventId'), idempotency_key=idempotency_key)
+    except IdempotencyKeyReused as e:
+        return jsonify({"status": "error", "message": str(e)}), 422
+    except JobQueueFull as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+
+    logger.info("handle_meetings: queued job %s for action=%s", job['id'], payload['action'])
+    response = jsonify({"status": "accepted", "message": "Request queued.", "job": job})
+    response.status_code = 202
+    response.headers['Location'] = f"/jobs/{job['id']}"
+    return response
+
+def run_meeting_action(data: dict):
+    try:
+        logger.debug("handle_meetings endpoint received raw JSON data: %s", Payload(data))
         action = data.get('action')
         
         if action == 'schedule':
@@ -87,9 +489,20 @@ def handle_meetings():
             if not attendees_emails:
                 return jsonify({"status": "error", "message": "No valid attendees emails provided."}), 400
             
-            print(f"handle_meetings: action=schedule, summary='{summary}', attendees='{attendees_emails}', start='{start_time_iso}', end='{end_time_iso}'")
+            recurrence = data.get('recurrence')
+            if recurrence:
+                if isinstance(recurrence, list):
+                    recurrence = recurrence[0]
+                logger.info("handle_meetings: action=schedule, recurrence='%s', summary='%s', attendees='%s', start='%s', end='%s'",
+                            recurrence, summary, attendees_emails, start_time_iso, end_time_iso)
+                result = meeting_agent.schedule_recurring_meeting(summary, attendees_emails, start_time_iso, end_time_iso, recurrence, description, dry_run=data.get('dry_run', False))
+                logger.debug("Recurring scheduling result: %s", Payload(result))
+                return jsonify(result)
+
+            logger.info("handle_meetings: action=schedule, summary='%s', attendees='%s', start='%s', end='%s'",
+                        summary, attendees_emails, start_time_iso, end_time_iso)
             result = meeting_agent.schedule_meeting(summary, attendees_emails, start_time_iso, end_time_iso, description)
-            print(f"Scheduling result: {result}")
+            logger.debug("Scheduling result: %s", Payload(result))
             return jsonify(result)
         
         elif action == 'update':
@@ -106,9 +519,10 @@ def handle_meetings():
 
             attendees_emails = [email.strip() for email in attendees_raw.split(',') if email.strip()] if attendees_raw else None
 
-            print(f"handle_meetings: action=update, dry_run={dry_run}, event_id='{event_id}', summary='{summary}', attendees='{attendees_emails}', start='{start_time_iso}', end='{end_time_iso}'")
+            logger.info("handle_meetings: action=update, dry_run=%s, event_id='%s', summary='%s', attendees='%s', start='%s', end='%s'",
+                        dry_run, event_id, summary, attendees_emails, start_time_iso, end_time_iso)
             result = meeting_agent.update_meeting(event_id, summary, attendees_emails, start_time_iso, end_time_iso, description, dry_run=dry_run)
-            print(f"Update result: {result}")
+            logger.debug("Update result: %s", Payload(result))
             return jsonify(result)
 
         elif action == 'cancel':
@@ -117,55 +531,245 @@ def handle_meetings():
             if not event_id:
                 return jsonify({"status": "error", "message": "Event ID is required for canceling."}), 400
             
-            print(f"handle_meetings: action=cancel, event_id='{event_id}'")
+            logger.info("handle_meetings: action=cancel, event_id='%s'", event_id)
             result = meeting_agent.cancel_meeting(event_id)
-            print(f"Cancellation result: {result}")
+            logger.debug("Cancellation result: %s", Payload(result))
+            return jsonify(result)
+
+        elif action == 'bulk_schedule':
+            meetings = data.get('meetings')
+            if not meetings or not isinstance(meetings, list):
+                return jsonify({"status": "error", "message": "A list of meetings is required for bulk scheduling."}), 400
+
+            for meeting in meetings:
+                attendees_raw = meeting.get('attendees', '')
+                if isinstance(attendees_raw, str):
+                    meeting['attendees'] = [email.strip() for email in attendees_raw.split(',') if email.strip()]
+
+            logger.info("handle_meetings: action=bulk_schedule, meetings=%d", len(meetings))
+            result = meeting_agent.bulk_schedule_meetings(meetings)
+            logger.debug("Bulk scheduling result: %s", Payload(result))
+            return jsonify(result)
+
+        elif action == 'bulk_cancel':
+            event_ids = data.get('eventIds')
+            if not event_ids or not isinstance(event_ids, list):
+                return jsonify({"status": "error", "message": "A list of event IDs is required for bulk canceling."}), 400
+
+            logger.info("handle_meetings: action=bulk_cancel, event_ids=%s", event_ids)
+            result = meeting_agent.bulk_cancel_meetings(event_ids)
+            logger.debug("Bulk cancellation result: %s", Payload(result))
+            return jsonify(result)
+
+        elif action == 'bulk_reschedule':
+            from_date = data.get('fromDate')
+            to_date = data.get('toDate')
+            event_ids = data.get('eventIds')
+            if not from_date or not to_date:
+                return jsonify({"status": "error", "message": "fromDate and toDate are required for bulk rescheduling."}), 400
+            if event_ids is not None and not isinstance(event_ids, list):
+                return jsonify({"status": "error", "message": "eventIds must be a list of event IDs."}), 400
+
+            logger.info("handle_meetings: action=bulk_reschedule, from=%s, to=%s, event_ids=%s", from_date, to_date, event_ids)
+            result = meeting_agent.bulk_reschedule_meetings(from_date, to_date, event_ids=event_ids, query=data.get('query'),
+                                                            search_days=data.get('searchDays', 1), dry_run=data.get('dry_run', False))
+            logger.debug("Bulk reschedule result: %s", Payload(result))
             return jsonify(result)
 
         else:
-            print(f"handle_meetings: Invalid action '{action}' specified.")
+            logger.warning("handle_meetings: Invalid action '%s' specified.", action)
             return jsonify({"status": "error", "message": f"Invalid action specified: {action}"}), 400
 
     except Exception as e:
-        print(f"handle_meetings: An unexpected error occurred: {e}")
+        logger.exception("handle_meetings: An unexpected error occurred: %s", e)
         return jsonify({"status": "error", "message": f"An unexpected error occurred: {e}"}), 500
 
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a queued meeting write: queued, running, succeeded or failed, with its result once finished."""
+    if not job_queue:
+        return jsonify({"status": "error", "message": "Backend not initialized. Check server logs for errors."}), 500
+
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"status": "error", "message": f"Job not found: {job_id}"}), 404
+    return jsonify({"status": "success", "job": job})
+
+def clean_event(event: dict) -> dict:
+    return {
+        "id": event['id'],
+        "summary": event.get('summary', 'No Title'),
+        "start": event['start'].get('dateTime', event['start'].get('date')),
+        "end": event['end'].get('dateTime', event['end'].get('date')),
+        "htmlLink": event['htmlLink'],
+        "attendees": [a.get('email', '') for a in event.get('attendees', []) if 'email' in a],
+        "description": event.get('description', '')
+    }
+
+def fetch_upcoming_events() -> list:
+    now = datetime.now(meeting_agent.pune_timezone)
+    events = meeting_agent.calendar_api.get_events(time_min=now, time_max=now + timedelta(days=30), raise_on_error=True)
+    return [clean_event(event) for event in events]
+
+upcoming_events = None
+
+# Pushes calendar changes to clients: our own writes straight away, changes made elsewhere after the next sync
+change_feed = ChangeFeed(backlog_size=CHANGE_FEED_BACKLOG)
+calendar_sync = None
+cache_warmer = None
+
+def start_services(agent: MeetingAgent):
+    """
+    Serves requests with an agent and starts what depends on it: the job queue, the upcoming events snapshot,
+    the change feed sources and the cache warm-up. Runs at startup with the configured agent; the benchmarks
+    pass one built on local stand-ins instead.
+    """
+    global meeting_agent, directory_api, job_queue, upcoming_events, calendar_sync, cache_warmer
+    meeting_agent = agent
+    directory_api = agent.directory_api
+
+    job_queue = JobQueue(run_job, db_path=JOB_DB_PATH, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING)
+    job_queue.start()
+
+    # The 30-day list is fetched again after UPCOMING_EVENTS_TTL_SECONDS, or straight away after one of our own writes
+    upcoming_events = VersionedSnapshot(fetch_upcoming_events, ttl_seconds=UPCOMING_EVENTS_TTL_SECONDS, name='upcoming_events')
+    agent.change_listeners.append(lambda change, event_id: upcoming_events.invalidate())
+
+    # Syncing with Google already reports our own writes, so publishing them here as well would send each one twice
+    if CALENDAR_SYNC_SOURCE != 'google':
+        agent.change_listeners.append(
+            lambda change, event_id: change_feed.publish({"type": change, "eventId": event_id, "source": "agent"}))
+    if CALENDAR_SYNC_SOURCE in ('google', 'local'):
+        sync_source = agent.calendar_api if CALENDAR_SYNC_SOURCE == 'google' else LocalEventSource()
+        calendar_sync = CalendarSync(sync_source, change_feed, interval_seconds=CALENDAR_SYNC_INTERVAL_SECONDS)
+        calendar_sync.start()
+
+    if CACHE_WARMUP:
+        cache_warmer = CacheWarmer(agent, fetch_events=upcoming_events.current, days=WARMUP_DAYS,
+                                   top_contacts=WARMUP_TOP_CONTACTS, concurrency=WARMUP_CONCURRENCY,
+                                   timeout_seconds=WARMUP_TIMEOUT_SECONDS)
+        cache_warmer.start()
+
+if meeting_agent:
+    start_services(meeting_agent)
+
+def versioned_list(name: str, changes, cursor: str, items: dict, list_field: str):
+    """
+    Answers a GET for a versioned collection. The ETag is built from the version cursor, so an unchanged list
+    gets a 304 without being serialized. With ?since=<version> only items changed since then are sent, plus the
+    keys of removed ones; an unknown or expired cursor gets the full list instead. Full lists are paginated with
+    ?limit= (at most LIST_PAGE_SIZE) and the next_page_token of the previous page.
+    """
+    etag = f'W/"{name}-{cursor}"'
+    if_none_match = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+    not_modified = etag in if_none_match or '*' in if_none_match
+    if request.headers.get('If-None-Match'):
+        cache_lookup(f'{name}_etag', not_modified)
+    if not_modified:
+        response = Response(status=304)
+        response.headers['ETag'] = etag
+        return response
+
+    since = request.args.get('since')
+    delta = changes.since(since) if since else None
+    if delta is not None:
+        changed, removed = delta
+        body = {"status": "success", list_field: [items[key] for key in changed if key in items],
+                "removed": sorted(removed), "version": cursor, "delta": True}
+    else:
+        try:
+            limit = min(max(int(request.args.get('limit', LIST_PAGE_SIZE)), 1), LIST_PAGE_SIZE)
+            page_token = request.args.get('page_token')
+            offset = 0
+            if page_token:
+                token_cursor, offset = page_token.rsplit(':', 1)
+                offset = int(offset)
+                if token_cursor != cursor:
+                    return jsonify({"status": "error", "message": "The list changed since the first page was fetched. Start again without page_token."}), 409
+        except ValueError:
+            return jsonify({"status": "error", "message": "Invalid limit or page_token."}), 400
+        values = list(items.values())
+        body = {"status": "success", list_field: values[offset:offset + limit], "version": cursor, "delta": False,
+                "next_page_token": f"{cursor}:{offset + limit}" if offset + limit < len(values) else None}
+
+    response = jsonify(body)
+    response.headers['ETag'] = etag
+    # Let browsers keep the list but revalidate it with If-None-Match on every use
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/changes', methods=['GET'])
+def long_poll_changes():
+    """
+    Long-poll for calendar changes after ?cursor=. Waits up to ?timeout= seconds (at most CHANGE_FEED_WAIT_SECONDS)
+    and returns the changes and the cursor to send next. resync=true means changes were missed and the client
+    should refetch /list_upcoming_events. Without a cursor, only changes from now on are returned.
+    """
+    try:
+        timeout = min(max(float(request.args.get('timeout', CHANGE_FEED_WAIT_SECONDS)), 0), CHANGE_FEED_WAIT_SECONDS)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid timeout."}), 400
+    changes, cursor, resync = change_feed.wait(request.args.get('cursor'), timeout=timeout)
+    return jsonify({"status": "success", "changes": changes, "cursor": cursor, "resync": resync})
+
+@app.route('/changes/stream', methods=['GET'])
+def stream_changes():
+    """
+    Streams calendar changes as Server-Sent Events ('change', or 'resync' when changes were missed). Each event id
+    is a cursor, so a reconnecting EventSource resumes from its Last-Event-ID. Idle connections get a comment
+    every CHANGE_FEED_WAIT_SECONDS to keep proxies from closing them.
+    """
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('cursor')
+
+    def generate():
+        nonlocal cursor
+        if cursor is None:
+            cursor = change_feed.cursor()
+        yield "retry: 3000\n\n"
+        while True:
+            changes, cursor, resync = change_feed.wait(cursor, timeout=CHANGE_FEED_WAIT_SECONDS)
+            if resync:
+                yield f"id: {cursor}\nevent: resync\ndata: {{}}\n\n"
+            elif not changes:
+                yield ": keep-alive\n\n"
+            for change in changes:
+                event = "resync" if change["type"] == "resync" else "change"
+                yield f"id: {change_feed.cursor(change['seq'])}\nevent: {event}\ndata: {json.dumps(change, default=str)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/list_upcoming_events', methods=['GET'])
 def list_upcoming_events():
     if not meeting_agent:
         return jsonify({"status": "error", "message": "Backend not initialized. Check server logs for errors."}), 500
 
     try:
-        now = datetime.now(meeting_agent.pune_timezone)
-        thirty_days_later = now + timedelta(days=30)
-        events = meeting_agent.calendar_api.get_events(time_min=now, time_max=thirty_days_later)
-
-        cleaned_events = []
-        for event in events:
-            attendees = [a.get('email', '') for a in event.get('attendees', []) if 'email' in a]
-            
-            cleaned_events.append({
-                "id": event['id'],
-                "summary": event.get('summary', 'No Title'),
-                "start": event['start'].get('dateTime', event['start'].get('date')),
-                "end": event['end'].get('dateTime', event['end'].get('date')),
-                "htmlLink": event['htmlLink'],
-                "attendees": attendees,
-                "description": event.get('description', '')
-            })
-        return jsonify({"status": "success", "events": cleaned_events})
+        events, cursor = upcoming_events.current()
+        return versioned_list("events", upcoming_events.changes, cursor, events, "events")
 
     except Exception as e:
-        print(f"Error listing upcoming events: {e}")
+        logger.exception("Error listing upcoming events: %s", e)
         return jsonify({"status": "error", "message": f"Failed to retrieve events: {e}"}), 500
 
 
-@app.route('/contacts', methods=['GET', 'POST', 'DELETE'])
+@app.route('/health/dependencies', methods=['GET'])
+def dependency_health():
+    """Circuit breaker state of each outbound dependency; 'degraded' while any breaker is not closed."""
+    if not meeting_agent:
+        return jsonify({"status": "error", "message": "Backend not initialized. Check server logs for errors."}), 500
+
+    dependencies = meeting_agent.dependency_health()
+    degraded = any(dependency["state"] != "closed" for dependency in dependencies.values())
+    return jsonify({"status": "degraded" if degraded else "success", "dependencies": dependencies})
+
+
+@app.route('/contacts', methods=['GET', 'POST', 'PUT', 'DELETE'])
 def manage_contacts():
-    global directory_api
     if request.method == 'GET':
-        contacts = directory_api.list_contacts()
-        return jsonify({"status": "success", "contacts": contacts})
+        # Read the cursor first, so a concurrent change is sent again rather than missed
+        cursor = directory_api.changes.cursor()
+        return versioned_list("contacts", directory_api.changes, cursor, dict(directory_api.contacts), "contacts")
     
     elif request.method == 'POST':
         data = request.json
@@ -173,7 +777,15 @@ def manage_contacts():
         display_name = data.get('displayName')
         if not email or not display_name:
             return jsonify({"status": "error", "message": "Email and display name are required."}), 400
-        result = directory_api.add_contact(email, display_name)
+        result = directory_api.add_contact(email, display_name, data.get('timeZone'), data.get('workingHours'))
+        return jsonify(result)
+
+    elif request.method == 'PUT':
+        data = request.json
+        email = data.get('email')
+        if not email:
+            return jsonify({"status": "error", "message": "Email is required for updating."}), 400
+        result = directory_api.update_contact(email, data.get('timeZone'), data.get('workingHours'))
         return jsonify(result)
     
     elif request.method == 'DELETE':
@@ -0,0 +1,341 @@
+# benchmarks/e2e.py
+"""
+End-to-end benchmark of the Flask app against the local stand-ins in benchmarks/fakes.py.
+
+    python -m benchmarks.e2e --requests 500 --concurrency 16 --output run.json
+    python -m benchmarks.e2e --google-error-rate 0.05 --baseline run.json
+
+Runs a mix of /process_query, /meetings and /list_upcoming_events requests from concurrent clients and reports,
+as JSON, the p50/p95/p99 latency, throughput and outbound Calendar, Gmail and Gemini calls of each endpoint.
+With --baseline, the report also holds the change of each figure against an earlier report.
+The app's own settings (rate limits, deadlines, pool sizes...) come from the environment as usual.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+DEFAULT_MIX = "process_query=5,meetings_schedule=1,meetings_update=1,list_upcoming_events=3"
+USER_EMAIL = "benchmark.user@example.com"
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(','):
+        name, weight = part.split('=')
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - set(Workload.ENDPOINTS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def parse_range(text: str) -> tuple:
+    low, _, high = text.partition(',')
+    return float(low), float(high or low)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def build_app(args, workdir: str):
+    """
+    Imports the Flask app with no live credentials and starts it on an agent built on the stand-ins.
+    Contacts, the job database and any other files the app writes go to workdir.
+    Returns (main module, backend, call counter).
+    """
+    os.environ['JOB_DB_PATH'] = os.path.join(workdir, 'jobs.db')
+    os.environ['CALENDAR_SYNC_SOURCE'] = 'off'
+    # Token paths that do not exist, so the app's own start-up never reaches Google
+    os.environ['CALENDAR_TOKEN_PATH'] = os.path.join(workdir, 'no_calendar_token.json')
+    os.environ['GMAIL_TOKEN_PATH'] = os.path.join(workdir, 'no_gmail_token.json')
+    os.environ['YOUR_COLLEGE_EMAIL_ID_FOR_TESTING'] = USER_EMAIL
+    os.chdir(workdir)
+
+    rng = random.Random(args.seed)
+    contacts = {}
+    for i in range(args.contacts):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{i}"
+        email = f"{name.lower().replace(' ', '.')}@example.com"
+        contacts[email] = {"primaryEmail": email, "displayName": name, "firstName": name.split(' ')[0], "lastName": name.split(' ')[1]}
+    with open('contacts.json', 'w') as f:
+        json.dump(contacts, f)
+
+    import app.main as main
+    from app.core.agent import MeetingAgent
+    from app.core.credentials import CredentialManager
+    from app.core.directory_api import GoogleDirectoryAPI
+    from benchmarks.fakes import (CallCounter, LatencyModel, FakeGoogleBackend, FakeTransport, FakeCalendarAPI,
+                                  FakeGmailAPI, FakeGeminiModel, FakeNLPParser)
+
+    counter = CallCounter()
+    backend = FakeGoogleBackend(USER_EMAIL, timezone=main.MEETING_TIMEZONE, owner_events=args.events, days=args.days,
+                                meetings_per_day=args.meetings_per_day,
+                                working_hours=(main.WORKING_HOURS_START, main.WORKING_HOURS_END), seed=args.seed)
+    credential_manager = CredentialManager(rate_limits={
+        'calendar': (main.CALENDAR_RATE_LIMIT_PER_SECOND, main.CALENDAR_RATE_LIMIT_BURST),
+        'gmail': (main.GMAIL_RATE_LIMIT_PER_SECOND, main.GMAIL_RATE_LIMIT_BURST)
+    })
+    transport = FakeTransport(LatencyModel(*args.google_latency_ms, error_rate=args.google_error_rate, seed=args.seed),
+                              counter, timeout=main.GOOGLE_HTTP_TIMEOUT_SECONDS)
+    model = FakeGeminiModel(LatencyModel(*args.gemini_latency_ms, error_rate=args.gemini_error_rate, seed=args.seed + 1), counter)
+
+    agent = MeetingAgent(
+        api_key=None,
+        oauth_client_secrets_path=None,
+        gmail_token_path=None,
+        user_email=USER_EMAIL,
+        timezone=main.MEETING_TIMEZONE,
+        directory_api=GoogleDirectoryAPI(),
+        credential_manager=credential_manager,
+        slot_granularity_minutes=main.SLOT_GRANULARITY_MINUTES,
+        working_hours=(main.WORKING_HOURS_START, main.WORKING_HOURS_END),
+        max_search_horizon_days=main.MAX_SEARCH_HORIZON_DAYS,
+        nlp_parser=FakeNLPParser(model, timeout_seconds=main.GEMINI_TIMEOUT_SECONDS),
+        calendar_api=FakeCalendarAPI(backend, transport, credential_manager, timezone=main.MEETING_TIMEZONE),
+        gmail_api=FakeGmailAPI(backend, transport, credential_manager),
+        intent_classifier=main.intent_classifier
+    )
+    main.start_services(agent)
+    return main, backend, counter
+
+
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Meera", "Arjun", "Kavya", "Rohan", "Isha",
+               "John", "Maria", "Wei", "Fatima", "Lucas", "Sofia", "Kenji", "Amara", "Noah", "Elena"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Khan", "Smith", "Garcia", "Chen", "Okafor", "Rossi"]
+# Queries that are not meeting requests, sent as process_query_other
+OTHER_QUERIES = ["hello", "thanks!", "what's the weather tomorrow", "tell me a joke", "who are you", "help",
+                 "asdf", "what can you do", "good morning", "how do I change my password", "ok", "never mind"]
+
+
+class Workload:
+    ENDPOINTS = ("process_query", "process_query_other", "meetings_schedule", "meetings_update", "list_upcoming_events")
+
+    def __init__(self, main, backend, mix: dict, seed: int):
+        """Generates requests in the given mix, for contacts and events that exist in the synthetic data."""
+        self.timezone = main.meeting_agent.pune_timezone
+        self.working_hours = (main.WORKING_HOURS_START, main.WORKING_HOURS_END)
+        self.contacts = main.meeting_agent.directory_api.list_contacts()
+        self.events = backend.list_events()
+        self.names, weights = zip(*mix.items())
+        self.weights = weights
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _slot(self) -> datetime:
+        day = datetime.now(self.timezone).date() + timedelta(days=self.rng.randint(1, 10))
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        first, last = self.working_hours
+        return self.timezone.localize(datetime(day.year, day.month, day.day, first) + timedelta(minutes=30 * self.rng.randrange((last - first) * 2 - 1)))
+
+    def next(self) -> tuple:
+        """Returns (endpoint, method, path, json body)."""
+        with self._lock:
+            endpoint = self.rng.choices(self.names, self.weights)[0]
+            if endpoint == "list_upcoming_events":
+                return endpoint, "GET", "/list_upcoming_events", None
+            if endpoint == "process_query_other":
+                return endpoint, "POST", "/process_query", {"query": self.rng.choice(OTHER_QUERIES)}
+
+            attendees = self.rng.sample(self.contacts, self.rng.randint(1, 3))
+            start = self._slot()
+            end = start + timedelta(minutes=self.rng.choice((30, 60)))
+            if endpoint == "process_query":
+                kind = self.rng.random()
+                if kind < 0.7 or not self.events:
+                    query = (f"schedule {int((end - start).total_seconds() // 60)} min 'Benchmark sync' with "
+                             f"{', '.join(contact['displayName'] for contact in attendees)} on {start:%Y-%m-%d} at {start:%H:%M}")
+                else:
+                    event = self.rng.choice(self.events)
+                    original = datetime.fromisoformat(event['start']['dateTime']).astimezone(self.timezone)
+                    if kind < 0.85:
+                        query = f"reschedule '{event['summary']}' on {original:%Y-%m-%d} at {original:%H:%M} to {start:%Y-%m-%d} at {start:%H:%M}"
+                    else:
+                        query = f"cancel '{event['summary']}' on {original:%Y-%m-%d} at {original:%H:%M}"
+                return endpoint, "POST", "/process_query", {"query": query}
+
+            body = {"summary": "Benchmark sync", "attendees": ", ".join(contact['primaryEmail'] for contact in attendees),
+                    "startTime": start.isoformat(), "endTime": end.isoformat(), "description": "Benchmark request."}
+            if endpoint == "meetings_update" and self.events:
+                return endpoint, "POST", "/meetings", {"action": "update", "eventId": self.rng.choice(self.events)['id'], **body}
+            return endpoint, "POST", "/meetings", {"action": "schedule", **body}
+
+
+def run_requests(main, workload: Workload, count: int, concurrency: int) -> tuple:
+    """Sends count requests from concurrency clients. Returns (records, wall_seconds)."""
+    from benchmarks.fakes import current_endpoint
+
+    local = threading.local()
+
+    def send(_):
+        if not hasattr(local, 'client'):
+            local.client = main.app.test_client()
+            local.etag = None
+        endpoint, method, path, body = workload.next()
+        headers = {}
+        if endpoint == "list_upcoming_events" and local.etag:
+            # Clients revalidate the list they already hold
+            headers['If-None-Match'] = local.etag
+        token = current_endpoint.set(endpoint)
+        started = time.perf_counter()
+        try:
+            response = local.client.open(path, method=method, json=body, headers=headers)
+            latency = time.perf_counter() - started
+        finally:
+            current_endpoint.reset(token)
+        payload = response.get_json(silent=True) or {}
+        if endpoint == "list_upcoming_events" and response.headers.get('ETag'):
+            local.etag = response.headers['ETag']
+        failed = response.status_code >= 400 or payload.get("status") == "error"
+        return endpoint, latency, response.status_code, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        records = list(executor.map(send, range(count)))
+    return records, time.perf_counter() - started
+
+
+def summarize(records: list, wall_seconds: float, calls: dict) -> dict:
+    endpoints = {}
+    for endpoint in sorted({record[0] for record in records}):
+        latencies = sorted(record[1] for record in records if record[0] == endpoint)
+        statuses = {}
+        for record in records:
+            if record[0] == endpoint:
+                statuses[str(record[2])] = statuses.get(str(record[2]), 0) + 1
+        endpoint_calls = calls.get(endpoint, {})
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": sum(1 for record in records if record[0] == endpoint and record[3]),
+            "status_codes": statuses,
+            "throughput_rps": round(len(latencies) / wall_seconds, 3),
+            "latency_ms": {
+                **{name: round(percentile(latencies, fraction) * 1000, 3) for name, fraction in PERCENTILES},
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3)
+            },
+            "outbound_calls": endpoint_calls,
+            "outbound_calls_per_request": round(sum(count for name, count in endpoint_calls.items() if not name.endswith('.items')) / len(latencies), 3)
+        }
+    latencies = sorted(record[1] for record in records)
+    return {
+        "requests": len(records),
+        "errors": sum(1 for record in records if record[3]),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_rps": round(len(records) / wall_seconds, 3),
+        "latency_ms": {name: round(percentile(latencies, fraction) * 1000, 3) for name, fraction in PERCENTILES},
+        "endpoints": endpoints,
+        # Calls made off the request threads, e.g. by queued jobs or batch worker threads
+        "background_outbound_calls": calls.get("background", {})
+    }
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change of each endpoint's latency percentiles and throughput against a baseline report."""
+    def change(new, old):
+        return round((new - old) / old, 4) if new is not None and old else None
+
+    comparison = {}
+    for endpoint, stats in report["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(endpoint)
+        if not old:
+            continue
+        comparison[endpoint] = {name: change(stats["latency_ms"][name], old["latency_ms"].get(name)) for name, _ in PERCENTILES}
+        comparison[endpoint]["throughput_rps"] = change(stats["throughput_rps"], old.get("throughput_rps"))
+        comparison[endpoint]["outbound_calls_per_request"] = change(stats["outbound_calls_per_request"], old.get("outbound_calls_per_request"))
+    return comparison
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the Flask app against local Google and Gemini stand-ins.")
+    parser.add_argument('--requests', type=int, default=200, help="Measured requests.")
+    parser.add_argument('--warmup', type=int, default=20, help="Requests sent before measuring.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients.")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Endpoint weights (default {DEFAULT_MIX}).")
+    parser.add_argument('--google-latency-ms', type=parse_range, default=(20.0, 80.0), help="MIN,MAX delay of each Calendar and Gmail call.")
+    parser.add_argument('--gemini-latency-ms', type=parse_range, default=(150.0, 400.0), help="MIN,MAX delay of each Gemini call.")
+    parser.add_argument('--google-error-rate', type=float, default=0.0, help="Share of Calendar and Gmail calls that fail with a 503.")
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0, help="Share of Gemini calls that fail with a 503.")
+    parser.add_argument('--events', type=int, default=2000, help="Events on the user's own calendar.")
+    parser.add_argument('--days', type=int, default=60, help="Days of synthetic calendar data.")
+    parser.add_argument('--meetings-per-day', type=int, default=4, help="Average busy half-hours per weekday on other calendars.")
+    parser.add_argument('--contacts', type=int, default=200, help="Contacts in the directory.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the report here instead of to stdout.")
+    parser.add_argument('--baseline', help="Earlier report to compare against.")
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's own logging.")
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix='meeting-bench-') as workdir:
+        quiet = open(os.devnull, 'w')
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(quiet))
+                stack.enter_context(contextlib.redirect_stderr(quiet))
+            app_main, backend, counter = build_app(args, workdir)
+            workload = Workload(app_main, backend, args.mix, args.seed)
+            if args.warmup:
+                run_requests(app_main, workload, args.warmup, args.concurrency)
+            counter.reset()
+            records, wall_seconds = run_requests(app_main, workload, args.requests, args.concurrency)
+            calls = counter.snapshot()
+            dependency_health = app_main.meeting_agent.dependency_health()
+            classifier = app_main.meeting_agent.intent_classifier
+            intent_classifier = classifier.stats() if classifier is not None else None
+        quiet.close()
+        os.chdir(repo_root)
+
+    report = {
+        "benchmark": "e2e",
+        "started_at": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": git_commit(),
+        "config": {name: value for name, value in vars(args).items() if name not in ('output', 'baseline', 'verbose')},
+        **summarize(records, wall_seconds, calls),
+        "dependency_health": dependency_health,
+        "intent_classifier": intent_classifier
+    }
+    if baseline is not None:
+        report["comparison"] = compare(report, baseline)
+
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
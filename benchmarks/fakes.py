@@ -0,0 +1,452 @@
+# benchmarks/fakes.py
+"""
+In-process stand-ins for Google Calendar, Gmail and Gemini, for benchmarking without live accounts.
+
+The stand-ins replace only what leaves the process. GoogleCalendarAPI, GmailAPI and NLPParser subclasses keep
+all of their own logic (coalescing, caches, batching, retries, circuit breakers, rate limiting); their
+googleapiclient service objects and HTTP pool are swapped for fakes that answer from synthetic calendars
+after a simulated network delay, and fail at a configurable rate.
+"""
+import bisect
+import contextvars
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+import httplib2
+import pytz
+from googleapiclient.errors import HttpError
+
+from app.core.calendar_api import GoogleCalendarAPI
+from app.core.gmail_api import GmailAPI
+from app.core.nlp_parser import NLPParser
+from app.core.credentials import CredentialManager
+from app.core.resilience import ResilientCaller
+from app.core.throttle import SingleFlight
+from app.core.deadline import DeadlineExceeded, call_timeout, current_deadline
+
+# Label outbound calls are counted under; the benchmark driver sets it to the endpoint it is calling
+current_endpoint = contextvars.ContextVar('current_endpoint', default='background')
+
+# Page size of events.list when the caller does not set maxResults, as in the real API
+DEFAULT_PAGE_SIZE = 250
+
+
+class FakeServiceUnavailable(Exception):
+    """Stand-in for a google.api_core 503, which the resilience layer reads through its 'code'."""
+    code = 503
+
+
+class LatencyModel:
+    def __init__(self, min_ms: float, max_ms: float, error_rate: float = 0.0, seed: int = None):
+        """Uniform delay between min_ms and max_ms per call, and the share of calls that fail."""
+        self.min_seconds = min_ms / 1000.0
+        self.max_seconds = max_ms / 1000.0
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> tuple:
+        """Returns (delay_seconds, fails)."""
+        with self._lock:
+            return self._random.uniform(self.min_seconds, self.max_seconds), self._random.random() < self.error_rate
+
+    def wait(self, timeout: float, stage: str):
+        """
+        Sleeps for a sampled delay, or until timeout if that comes first, like a socket read would.
+        Returns whether the call should fail.
+        """
+        delay, fails = self.sample()
+        simulate_delay(delay, timeout, stage)
+        return fails
+
+
+def simulate_delay(delay: float, timeout: float, stage: str):
+    """Sleeps for delay seconds, or raises like a socket read would once timeout passes first."""
+    if timeout is not None and delay > timeout:
+        time.sleep(timeout)
+        deadline = current_deadline()
+        if deadline is not None and deadline.expired():
+            deadline.cut(stage, "A simulated call timed out at the request deadline.")
+            raise DeadlineExceeded("Request deadline exceeded.")
+        raise TimeoutError("timed out")
+    time.sleep(delay)
+
+
+class CallCounter:
+    def __init__(self):
+        """Counts outbound calls per endpoint label and call name."""
+        self._lock = threading.Lock()
+        self._counts = defaultdict(Counter)
+
+    def add(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counts[current_endpoint.get()][name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {endpoint: dict(counts) for endpoint, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+
+class FakeGoogleBackend:
+    def __init__(self, user_email: str, timezone: str = 'Asia/Kolkata', owner_events: int = 2000, days: int = 60,
+                 meetings_per_day: int = 4, working_hours: tuple = (9, 17), seed: int = 1):
+        """
+        Synthetic Google data. The user's own calendar gets owner_events events spread over the working hours
+        of the next `days` days (and the week before), and is read and written through events.* calls.
+        Every other calendar gets about meetings_per_day busy half-hours per weekday, generated on first use
+        from a seed derived from the address, so free/busy answers are stable within a run.
+        """
+        self.user_email = user_email
+        self.timezone = pytz.timezone(timezone)
+        self.days = days
+        self.meetings_per_day = meetings_per_day
+        self.working_hours = working_hours
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._events = OrderedDict()
+        # (start, end) in UTC per event id, so range filters do not parse timestamps on every call
+        self._spans = {}
+        self._changes = []
+        self._busy = {}
+        self.handlers = {
+            'calendar.freebusy.query': self._freebusy_query,
+            'calendar.events.list': self._events_list,
+            'calendar.events.get': self._events_get,
+            'calendar.events.insert': self._events_insert,
+            'calendar.events.update': self._events_update,
+            'calendar.events.patch': self._events_patch,
+            'calendar.events.delete': self._events_delete,
+            'gmail.users.messages.send': self._messages_send,
+        }
+        self._generate_owner_events(owner_events)
+
+    def service(self, api: str):
+        return FakeResource(self, api)
+
+    # --- Synthetic data ---
+
+    def _working_starts(self, rng: random.Random, day: datetime, count: int) -> list:
+        first, last = self.working_hours
+        half_hours = (last - first) * 2
+        day_start = self.timezone.localize(datetime(day.year, day.month, day.day, first))
+        return [self.timezone.normalize(day_start + timedelta(minutes=30 * slot)) for slot in rng.sample(range(half_hours), min(count, half_hours))]
+
+    def _days(self):
+        today = self.timezone.localize(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None))
+        for offset in range(-7, self.days):
+            day = self.timezone.normalize(today + timedelta(days=offset))
+            if day.weekday() < 5:
+                yield day
+
+    def _generate_owner_events(self, count: int):
+        rng = random.Random(self.seed)
+        days = list(self._days())
+        if not days or count <= 0:
+            return
+        attendee_pool = [f"colleague{i}@example.com" for i in range(50)]
+        for i in range(count):
+            start = self._working_starts(rng, days[i % len(days)], 1)[0]
+            end = start + timedelta(minutes=rng.choice((30, 30, 60)))
+            self._store_event({
+                'summary': f"Synthetic meeting {i}",
+                'description': 'Generated for benchmarking.',
+                'start': {'dateTime': start.isoformat(), 'timeZone': str(self.timezone)},
+                'end': {'dateTime': end.isoformat(), 'timeZone': str(self.timezone)},
+                'attendees': [{'email': email} for email in rng.sample(attendee_pool, 3)],
+            })
+
+    def _calendar_busy(self, email: str) -> tuple:
+        # Callers hold self._lock. Returns (starts, periods) sorted by start, in UTC.
+        busy = self._busy.get(email)
+        if busy is None:
+            rng = random.Random(f"{self.seed}:{email}")
+            periods = []
+            for day in self._days():
+                for start in self._working_starts(rng, day, rng.randint(0, 2 * self.meetings_per_day)):
+                    periods.append((start.astimezone(pytz.utc), (start + timedelta(minutes=30)).astimezone(pytz.utc)))
+            periods.sort()
+            busy = self._busy[email] = ([start for start, _ in periods], periods)
+        return busy
+
+    def _owner_busy(self, time_min: datetime, time_max: datetime) -> list:
+        return sorted((start, end) for start, end in self._spans.values() if start < time_max and end > time_min)
+
+    # --- API handlers ---
+
+    @staticmethod
+    def _http_error(status: int, message: str, uri: str = 'https://www.googleapis.com/fake') -> HttpError:
+        return HttpError(httplib2.Response({'status': status}), json.dumps({'error': {'code': status, 'message': message}}).encode(), uri=uri)
+
+    def _freebusy_query(self, body: dict) -> dict:
+        time_min = datetime.fromisoformat(body['timeMin'].replace('Z', '+00:00'))
+        time_max = datetime.fromisoformat(body['timeMax'].replace('Z', '+00:00'))
+        calendars = {}
+        with self._lock:
+            for item in body.get('items', []):
+                email = item['id']
+                if email == self.user_email:
+                    periods = self._owner_busy(time_min, time_max)
+                else:
+                    starts, all_periods = self._calendar_busy(email)
+                    # Busy half-hours start at most 30 minutes before the range to overlap it
+                    first = bisect.bisect_left(starts, time_min - timedelta(minutes=30))
+                    last = bisect.bisect_left(starts, time_max)
+                    periods = [period for period in all_periods[first:last] if period[1] > time_min]
+                calendars[email] = {'busy': [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in periods]}
+        return {'kind': 'calendar#freeBusy', 'timeMin': body['timeMin'], 'timeMax': body['timeMax'], 'calendars': calendars}
+
+    def _events_list(self, calendarId: str = 'primary', timeMin: str = None, timeMax: str = None, q: str = None,
+                     syncToken: str = None, pageToken: str = None, maxResults: int = None, **kwargs) -> dict:
+        page_size = maxResults or DEFAULT_PAGE_SIZE
+        offset = int(pageToken) if pageToken else 0
+        with self._lock:
+            if syncToken is not None:
+                items = self._changes[int(syncToken):]
+                next_sync_token = str(len(self._changes))
+            else:
+                time_min = datetime.fromisoformat(timeMin.replace('Z', '+00:00')) if timeMin else None
+                time_max = datetime.fromisoformat(timeMax.replace('Z', '+00:00')) if timeMax else None
+                words = q.lower().split() if q else []
+                items = []
+                for event_id, event in self._events.items():
+                    start, end = self._spans[event_id]
+                    if (time_min and end <= time_min) or (time_max and start >= time_max):
+                        continue
+                    text = f"{event.get('summary', '')} {event.get('description', '')} {' '.join(a['email'] for a in event.get('attendees', []))}".lower()
+                    if all(word in text for word in words):
+                        items.append(event)
+                items.sort(key=lambda event: self._spans[event['id']][0])
+                next_sync_token = str(len(self._changes))
+            page = [json.loads(json.dumps(event)) for event in items[offset:offset + page_size]]
+        response = {'kind': 'calendar#events', 'items': page}
+        if offset + page_size < len(items):
+            response['nextPageToken'] = str(offset + page_size)
+        else:
+            response['nextSyncToken'] = next_sync_token
+        return response
+
+    def _events_get(self, calendarId: str = 'primary', eventId: str = None, **kwargs) -> dict:
+        with self._lock:
+            event = self._events.get(eventId)
+            if event is None:
+                raise self._http_error(404, 'Not Found')
+            return json.loads(json.dumps(event))
+
+    def _store_event(self, body: dict, event_id: str = None) -> dict:
+        # Callers hold self._lock, except during construction
+        now = datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+        previous = self._events.get(event_id) if event_id else None
+        event_id = event_id or uuid.uuid4().hex
+        event = dict(body, id=event_id, status='confirmed', updated=now,
+                     created=previous['created'] if previous else now,
+                     htmlLink=f"https://calendar.google.com/calendar/event?eid={event_id}")
+        if 'conferenceData' in body or (previous and 'conferenceData' in previous):
+            event['conferenceData'] = {'entryPoints': [{'entryPointType': 'video', 'uri': f"https://meet.google.com/{event_id[:10]}"}]}
+        self._events[event_id] = event
+        self._spans[event_id] = (datetime.fromisoformat(event['start']['dateTime']).astimezone(pytz.utc),
+                                 datetime.fromisoformat(event['end']['dateTime']).astimezone(pytz.utc))
+        self._changes.append(event)
+        return json.loads(json.dumps(event))
+
+    def _events_insert(self, calendarId: str = 'primary', body: dict = None, **kwargs) -> dict:
+        with self._lock:
+            return self._store_event(body)
+
+    def _events_update(self, calendarId: str = 'primary', eventId: str = None, body: dict = None, **kwargs) -> dict:
+        with self._lock:
+            if eventId not in self._events:
+                raise self._http_error(404, 'Not Found')
+            return self._store_event(body, eventId)
+
+    def _events_patch(self, calendarId: str = 'primary', eventId: str = None, body: dict = None, **kwargs) -> dict:
+        with self._lock:
+            event = self._events.get(eventId)
+            if event is None:
+                raise self._http_error(404, 'Not Found')
+            return self._store_event({**event, **body}, eventId)
+
+    def _events_delete(self, calendarId: str = 'primary', eventId: str = None, **kwargs) -> str:
+        with self._lock:
+            if self._events.pop(eventId, None) is None:
+                raise self._http_error(410, 'Resource has been deleted')
+            del self._spans[eventId]
+            self._changes.append({'id': eventId, 'status': 'cancelled'})
+            return ''
+
+    def _messages_send(self, userId: str = 'me', body: dict = None, **kwargs) -> dict:
+        return {'id': uuid.uuid4().hex, 'labelIds': ['SENT']}
+
+    def list_events(self) -> list:
+        """Copies of the events on the user's own calendar."""
+        with self._lock:
+            return json.loads(json.dumps(list(self._events.values())))
+
+
+class FakeResource:
+    def __init__(self, backend: FakeGoogleBackend, path: str):
+        """A googleapiclient resource: service.events().list(...) builds a FakeRequest for 'calendar.events.list'."""
+        self._backend = backend
+        self._path = path
+
+    def __getattr__(self, name: str):
+        path = f"{self._path}.{name}"
+
+        def method(**kwargs):
+            if path in self._backend.handlers:
+                return FakeRequest(self._backend, path, kwargs)
+            return FakeResource(self._backend, path)
+        return method
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatchRequest(callback)
+
+
+class FakeRequest:
+    def __init__(self, backend: FakeGoogleBackend, name: str, kwargs: dict):
+        self.backend = backend
+        self.name = name
+        # Read by the clients' metrics, as on googleapiclient requests
+        self.methodId = name
+        self.kwargs = kwargs
+
+    def execute(self, http=None, num_retries: int = 0):
+        return self.backend.handlers[self.name](**self.kwargs)
+
+
+class FakeBatchRequest:
+    def __init__(self, callback=None):
+        """Runs its requests one after another on execute, reporting each to the callback like a batch response."""
+        self.callback = callback
+        self.name = 'calendar.batch'
+        self.requests = []
+
+    def add(self, request: FakeRequest, callback=None, request_id: str = None):
+        self.requests.append((request_id or str(len(self.requests)), request, callback or self.callback))
+
+    def execute(self, http=None):
+        for request_id, request, callback in self.requests:
+            try:
+                response, exception = request.execute(), None
+            except HttpError as error:
+                response, exception = None, error
+            if callback is not None:
+                callback(request_id, response, exception)
+
+
+class FakeTransport:
+    def __init__(self, latency: LatencyModel, counter: CallCounter, timeout: float = 30.0, error_status: int = 503):
+        """
+        Takes the place of HttpPool: each execute is one simulated HTTP round trip, with the delay and failure
+        rate of the latency model. Failures are HttpErrors with error_status. A batch counts as one call.
+        """
+        self.latency = latency
+        self.counter = counter
+        self.timeout = timeout
+        self.error_status = error_status
+
+    def execute(self, request, credentials=None):
+        self.counter.add(request.name)
+        if isinstance(request, FakeBatchRequest):
+            self.counter.add(f"{request.name}.items", len(request.requests))
+        if self.latency.wait(call_timeout(self.timeout, stage="google_api"), "google_api"):
+            raise FakeGoogleBackend._http_error(self.error_status, 'Simulated failure')
+        return request.execute()
+
+    def stats(self) -> dict:
+        return {"calls": sum(sum(counts.values()) for counts in self.counter.snapshot().values())}
+
+
+class FakeCalendarAPI(GoogleCalendarAPI):
+    def __init__(self, backend: FakeGoogleBackend, transport: FakeTransport, credential_manager: CredentialManager, timezone: str = 'Asia/Kolkata'):
+        """GoogleCalendarAPI with its service and HTTP pool replaced; everything else is the real client."""
+        self.user_email = backend.user_email
+        self.creds = None
+        self.oauth_client_secrets_path = None
+        self.token_path = None
+        self.credential_manager = credential_manager
+        self.service = backend.service('calendar')
+        self.http_pool = transport
+        self.pune_timezone = pytz.timezone(timezone)
+        self.resilience = ResilientCaller('calendar')
+        self.rate_limiter = credential_manager.rate_limiters['calendar']
+        self.single_flight = SingleFlight('calendar_coalescing')
+        self._busy_cache = OrderedDict()
+        self._busy_cache_lock = threading.Lock()
+
+
+class FakeGmailAPI(GmailAPI):
+    def __init__(self, backend: FakeGoogleBackend, transport: FakeTransport, credential_manager: CredentialManager):
+        """GmailAPI with its service and HTTP pool replaced; everything else is the real client."""
+        self.user_email = 'me'
+        self.creds = None
+        self.oauth_client_secrets_path = None
+        self.token_path = None
+        self.credential_manager = credential_manager
+        self.service = backend.service('gmail')
+        self.http_pool = transport
+        self.resilience = ResilientCaller('gmail')
+        self.rate_limiter = credential_manager.rate_limiters['gmail']
+
+
+# Grammar of the queries the benchmark sends, standing in for what Gemini understands
+SCHEDULE_QUERY = re.compile(r"^schedule (\d+) min '([^']*)' with (.+) on (\d{4}-\d{2}-\d{2}) at (\d{2}:\d{2})$")
+MOVE_QUERY = re.compile(r"^(reschedule|cancel) '([^']*)' on (\d{4}-\d{2}-\d{2}) at (\d{2}:\d{2})(?: to (\d{4}-\d{2}-\d{2}) at (\d{2}:\d{2}))?$")
+PROMPT_INPUT = re.compile(r'Input: "(.*)"')
+
+
+class FakeGeminiModel:
+    def __init__(self, latency: LatencyModel, counter: CallCounter):
+        """Answers NLPParser prompts for the benchmark's query grammar, after a simulated model delay."""
+        self.latency = latency
+        self.counter = counter
+
+    def generate_content(self, prompt: str, request_options: dict = None):
+        self.counter.add('gemini.generate_content')
+        if self.latency.wait((request_options or {}).get('timeout'), "parse"):
+            raise FakeServiceUnavailable("Simulated Gemini overload")
+        match = PROMPT_INPUT.search(prompt)
+        return FakeGeminiResponse(json.dumps(self.parse(match.group(1) if match else "")))
+
+    @staticmethod
+    def parse(text: str) -> dict:
+        parsed = {"intent": "unknown", "participants": [], "duration_minutes": 30, "time_preferences_raw": None,
+                  "start_date_hint": None, "start_time_hint": None, "meeting_title": None, "original_meeting_keywords": None,
+                  "original_meeting_date_hint": None, "original_meeting_time_hint": None, "recurrence": None,
+                  "optional_participants": []}
+        match = SCHEDULE_QUERY.match(text)
+        if match:
+            parsed.update(intent="schedule", duration_minutes=int(match.group(1)), meeting_title=match.group(2),
+                          participants=[name.strip() for name in match.group(3).split(',')],
+                          start_date_hint=match.group(4), start_time_hint=match.group(5))
+            return parsed
+        match = MOVE_QUERY.match(text)
+        if match:
+            parsed.update(intent=match.group(1), meeting_title=match.group(2), original_meeting_keywords=[match.group(2)],
+                          original_meeting_date_hint=match.group(3), original_meeting_time_hint=match.group(4),
+                          start_date_hint=match.group(5), start_time_hint=match.group(6))
+        return parsed
+
+
+class FakeGeminiResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeNLPParser(NLPParser):
+    def __init__(self, model: FakeGeminiModel, timeout_seconds: float = 30.0):
+        """NLPParser with the Gemini model replaced; prompts, caching and resilience are the real ones."""
+        self.model = model
+        self.timeout_seconds = timeout_seconds
+        self.resilience = ResilientCaller('gemini')
+        self._parse_cache = OrderedDict()
+        self._parse_cache_lock = threading.Lock()
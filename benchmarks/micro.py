@@ -0,0 +1,255 @@
+# benchmarks/micro.py
+"""
+Micro-benchmarks of the CPU-bound parts of MeetingAgent, on generated data and without any network calls.
+
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --directory-sizes 1000,10000,100000,1000000 --baseline micro.json
+
+slot_search cases time _find_suggested_slots (busy merging and the slot scan) for a grid of attendee counts,
+busy densities and search horizons; free/busy answers come from memory, already in the API's response format.
+directory cases time loading the contact list and _resolve_participants for names that hit by display name,
+by email, only by partial match, or not at all, for each directory size.
+Each case reports its median, min and mean time per call and its peak traced memory, as JSON.
+"""
+import argparse
+import bisect
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytz
+
+from benchmarks.e2e import FIRST_NAMES, LAST_NAMES, git_commit
+
+TIMEZONE = 'Asia/Kolkata'
+USER_EMAIL = "benchmark.user@example.com"
+
+
+def parse_ints(text: str) -> list:
+    return [int(value) for value in text.split(',')]
+
+
+def parse_floats(text: str) -> list:
+    return [float(value) for value in text.split(',')]
+
+
+class StaticCalendar:
+    def __init__(self, emails: list, density: float, days: int, seed: int = 1):
+        """
+        Free/busy for the given calendars, answered from memory. Each half-hour of the next `days` days is busy
+        with probability `density`; adjacent busy half-hours are merged, as Google returns them.
+        """
+        timezone = pytz.timezone(TIMEZONE)
+        today = timezone.localize(datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
+        self._busy = {}
+        for email in emails:
+            rng = random.Random(f"{seed}:{email}")
+            periods = []
+            for half_hour in range(-48, (days + 2) * 48):
+                if rng.random() >= density:
+                    continue
+                start = (today + timedelta(minutes=30 * half_hour)).astimezone(pytz.utc)
+                if periods and periods[-1][1] == start:
+                    periods[-1] = (periods[-1][0], start + timedelta(minutes=30))
+                else:
+                    periods.append((start, start + timedelta(minutes=30)))
+            self._busy[email] = ([start for start, _ in periods], [end for _, end in periods],
+                                 [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in periods])
+
+    def get_free_busy_sharded(self, emails: list, time_min: datetime, time_max: datetime) -> dict:
+        calendars = {}
+        for email in emails:
+            starts, ends, periods = self._busy.get(email, ([], [], []))
+            calendars[email] = {'busy': periods[bisect.bisect_right(ends, time_min):bisect.bisect_left(starts, time_max)]}
+        return calendars
+
+    get_free_busy = get_free_busy_sharded
+
+
+class Unused:
+    """Stands in for the clients a case never calls."""
+
+
+def build_agent(directory_api, calendar_api, horizon_days: int):
+    from app.core.agent import MeetingAgent
+    from app.core.credentials import CredentialManager
+
+    return MeetingAgent(api_key=None, oauth_client_secrets_path=None, gmail_token_path=None, user_email=USER_EMAIL,
+                        timezone=TIMEZONE, directory_api=directory_api, credential_manager=CredentialManager(),
+                        max_search_horizon_days=horizon_days, nlp_parser=Unused(), calendar_api=calendar_api, gmail_api=Unused())
+
+
+def write_contacts(count: int, seed: int) -> list:
+    """Writes contacts.json in the current directory and returns the contacts."""
+    rng = random.Random(seed)
+    contacts = {}
+    for i in range(count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}{i}"
+        email = f"{name.lower().replace(' ', '.')}@example.com"
+        contacts[email] = {"primaryEmail": email, "displayName": name, "firstName": name.split(' ')[0], "lastName": name.split(' ')[1]}
+    with open('contacts.json', 'w') as f:
+        json.dump(contacts, f)
+    return list(contacts.values())
+
+
+def measure(fn, repeat: int) -> dict:
+    """Times fn over `repeat` calls, then runs it once more under tracemalloc for its peak allocation."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "time_ms": {
+            "median": round(statistics.median(timings) * 1000, 4),
+            "min": round(min(timings) * 1000, 4),
+            "mean": round(statistics.fmean(timings) * 1000, 4)
+        },
+        "peak_memory_kib": round(peak / 1024, 1),
+        "result": result
+    }
+
+
+def slot_search_cases(args) -> list:
+    from app.core.directory_api import GoogleDirectoryAPI
+
+    cases = []
+    write_contacts(0, args.seed)
+    directory_api = GoogleDirectoryAPI()
+    for attendees in args.attendees:
+        emails = [f"attendee{i}@example.com" for i in range(attendees)]
+        for density in args.densities:
+            for horizon_days in args.horizons:
+                calendar = StaticCalendar(emails + [USER_EMAIL], density, horizon_days, args.seed)
+                agent = build_agent(directory_api, calendar, horizon_days)
+                preferred_start = datetime.now(agent.pune_timezone) + timedelta(days=1)
+
+                def run():
+                    return {"slots": len(agent._find_suggested_slots(emails, 30, preferred_start))}
+
+                params = {"attendees": attendees, "density": density, "horizon_days": horizon_days}
+                cases.append({"case": "slot_search", "params": params, **measure(run, args.repeat)})
+    return cases
+
+
+def directory_cases(args) -> list:
+    from app.core.directory_api import GoogleDirectoryAPI
+
+    cases = []
+    for size in args.directory_sizes:
+        contacts = write_contacts(size, args.seed)
+        rng = random.Random(args.seed)
+        sample = rng.sample(contacts, min(3, len(contacts)))
+
+        load = measure(GoogleDirectoryAPI, 1)
+        load["result"] = {"contacts": size}
+        cases.append({"case": "directory_load", "params": {"contacts": size}, **load})
+
+        agent = build_agent(GoogleDirectoryAPI(), Unused(), 14)
+        lookups = {
+            "display_name": [contact['displayName'] for contact in sample],
+            "email": [contact['primaryEmail'] for contact in sample],
+            # A first name alone is not a display name, so it resolves through the partial search
+            "partial": [sample[0]['firstName']],
+            "miss": ["Nobody Atall"]
+        }
+        for lookup, names in lookups.items():
+            def run():
+                return {"resolved": len(agent._resolve_participants(names))}
+
+            cases.append({"case": "resolve_participants", "params": {"contacts": size, "lookup": lookup, "names": len(names)},
+                          **measure(run, args.repeat)})
+    return cases
+
+
+def case_key(case: dict) -> str:
+    return case["case"] + "[" + ",".join(f"{name}={value}" for name, value in case["params"].items()) + "]"
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Relative change of each case's median time and peak memory against a baseline report."""
+    old_cases = {case_key(case): case for case in baseline.get("cases", [])}
+    comparison = {}
+    for case in report["cases"]:
+        old = old_cases.get(case_key(case))
+        if not old:
+            continue
+        comparison[case_key(case)] = {
+            "median_time": round((case["time_ms"]["median"] - old["time_ms"]["median"]) / old["time_ms"]["median"], 4) if old["time_ms"]["median"] else None,
+            "peak_memory": round((case["peak_memory_kib"] - old["peak_memory_kib"]) / old["peak_memory_kib"], 4) if old["peak_memory_kib"] else None
+        }
+    return comparison
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of slot search and participant resolution.")
+    parser.add_argument('--suites', default="slot_search,directory", help="Comma-separated suites to run.")
+    parser.add_argument('--attendees', type=parse_ints, default=[2, 10, 50], help="Attendee counts for slot_search.")
+    parser.add_argument('--densities', type=parse_floats, default=[0.2, 0.5, 0.8], help="Busy share of each half-hour.")
+    parser.add_argument('--horizons', type=parse_ints, default=[7, 14, 30], help="Search horizons in days.")
+    parser.add_argument('--directory-sizes', type=parse_ints, default=[1000, 10000, 100000],
+                        help="Contact counts for the directory suite; add 1000000 for the largest case.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed calls per case.")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Write the report here instead of to stdout.")
+    parser.add_argument('--baseline', help="Earlier report to compare against.")
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    suites = {"slot_search": slot_search_cases, "directory": directory_cases}
+    cases = []
+    with tempfile.TemporaryDirectory(prefix='meeting-micro-') as workdir:
+        os.chdir(workdir)
+        try:
+            # The agent logs every lookup miss; keep the report readable
+            with open(os.devnull, 'w') as quiet, contextlib.redirect_stdout(quiet), contextlib.redirect_stderr(quiet):
+                for suite in args.suites.split(','):
+                    cases.extend(suites[suite.strip()](args))
+        finally:
+            os.chdir(repo_root)
+
+    report = {
+        "benchmark": "micro",
+        "started_at": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "config": {name: value for name, value in vars(args).items() if name not in ('output', 'baseline')},
+        "cases": cases
+    }
+    if baseline is not None:
+        report["comparison"] = compare(report, baseline)
+
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
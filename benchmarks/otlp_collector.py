@@ -0,0 +1,99 @@
+# benchmarks/otlp_collector.py
+"""
+Stand-in for an OpenTelemetry collector's OTLP/HTTP receiver, for looking at the app's traces without running one.
+
+    python -m benchmarks.otlp_collector --port 4318 --output traces.jsonl
+    TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://127.0.0.1:4318 python -m app.main
+
+Each batch of spans posted to /v1/traces as OTLP/JSON is appended to the output file as one line, the same
+format TRACE_EXPORTER=file writes, and each trace gets a one-line summary on stdout: its root span, duration,
+span count and the slowest child spans.
+"""
+import argparse
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def span_attribute(span: dict, name: str):
+    for attribute in span.get("attributes", []):
+        if attribute["key"] == name:
+            return next(iter(attribute["value"].values()))
+    return None
+
+
+def summarize(spans: list) -> list:
+    """One line per trace in the batch."""
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span["traceId"]].append(span)
+
+    lines = []
+    for trace_spans in traces.values():
+        span_ids = {span["spanId"] for span in trace_spans}
+        roots = [span for span in trace_spans if span.get("parentSpanId") not in span_ids]
+        root = min(roots, key=lambda span: int(span["startTimeUnixNano"]))
+        duration_ms = (int(root["endTimeUnixNano"]) - int(root["startTimeUnixNano"])) / 1e6
+        children = sorted((span for span in trace_spans if span is not root),
+                          key=lambda span: int(span["startTimeUnixNano"]) - int(span["endTimeUnixNano"]))
+        slowest = ", ".join(f"{span['name']} {(int(span['endTimeUnixNano']) - int(span['startTimeUnixNano'])) / 1e6:.1f}ms"
+                            for span in children[:3])
+        lines.append(f"{span_attribute(root, 'request.id') or root['traceId']} {root['name']} {duration_ms:.1f}ms "
+                     f"{len(trace_spans)} spans; slowest: {slowest or 'none'}")
+    return lines
+
+
+def make_handler(output: str, lock: threading.Lock):
+    class CollectorHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != '/v1/traces':
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                self.send_error(400, "Only OTLP/JSON is supported.")
+                return
+
+            spans = [span for resource in payload.get("resourceSpans", [])
+                     for scope in resource.get("scopeSpans", []) for span in scope.get("spans", [])]
+            with lock:
+                with open(output, 'a') as f:
+                    f.write(json.dumps(payload) + "\n")
+                for line in summarize(spans):
+                    print(line)
+
+            response = b'{"partialSuccess": {}}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format, *args):
+            pass
+
+    return CollectorHandler
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Local stand-in for an OTLP/HTTP trace collector.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--output', default='traces.jsonl', help="File the received traces are appended to.")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.output, threading.Lock()))
+    print(f"Collecting traces on http://{args.host}:{args.port}/v1/traces into {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+# benchmarks/replay.py
+"""
+Replays traffic captured with CAPTURE_PATH against the app, offline, for load testing with real request shapes.
+
+    CAPTURE_PATH=traffic.jsonl python -m app.main
+    python -m benchmarks.replay traffic.jsonl --speed 10 --concurrency 16 --output replay.json
+
+Each captured /process_query and /meetings request is sent again with its original request id, at its
+original pace (--speed 1), faster (--speed 10) or as fast as the clients go (--speed max). Gemini, Calendar
+and Gmail are not called: every outbound call is answered with the response or error captured for the same
+request and operation, in the order they came, after the captured delay (--latency recorded) or none.
+Calls the capture has no answer for, e.g. those of jobs queued by the request, take the next captured
+answer to that operation from any request, and fail with a 503 when there is none.
+
+The report has the same figures as benchmarks/e2e.py, so --baseline compares the two, plus how faithful the
+replay was: calls answered from their own request, from another one or not at all, and responses whose
+status differs from the captured one.
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.e2e import USER_EMAIL, git_commit, summarize, compare
+
+# Recorded error types replayed as a socket timeout
+TIMEOUT_ERRORS = {'TimeoutError', 'timeout', 'socket.timeout', 'DeadlineExceeded'}
+
+
+def parse_speed(text: str) -> float:
+    """A pace multiplier, or 'max' (returned as 0) for no pacing."""
+    if text == 'max':
+        return 0.0
+    speed = float(text)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("Speed must be positive, or 'max'.")
+    return speed
+
+
+def load_capture(path: str) -> list:
+    """The captured requests, oldest first."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    records.sort(key=lambda record: record["started_at"])
+    return records
+
+
+def endpoint_label(record: dict) -> str:
+    """The e2e benchmark's name for the endpoint a captured request went to."""
+    if record["path"] == '/meetings':
+        return f"meetings_{(record.get('body') or {}).get('action', 'schedule')}"
+    return record["path"].strip('/')
+
+
+class RecordedResponses:
+    def __init__(self, records: list):
+        """
+        The captured answers to outbound calls, queued per request id and (dependency, operation) in the order
+        they were made, plus every answer per operation for calls that cannot be matched to their request.
+        """
+        self._by_request = defaultdict(lambda: defaultdict(deque))
+        self._by_operation = defaultdict(list)
+        self._next_fallback = Counter()
+        self._lock = threading.Lock()
+        self.stats = Counter()
+        for record in records:
+            for call in sorted(record.get("calls", []), key=lambda call: call["started_ms"]):
+                key = (call["dependency"], call["operation"])
+                self._by_request[record["request_id"]][key].append(call)
+                self._by_operation[key].append(call)
+
+    def next(self, request_id: str, dependency: str, operation: str) -> dict:
+        """The answer to serve for the next call, or None when nothing was captured for the operation."""
+        key = (dependency, operation)
+        with self._lock:
+            calls = self._by_request.get(request_id, {}).get(key)
+            if calls:
+                self.stats["matched"] += 1
+                return calls.popleft()
+            pool = self._by_operation.get(key)
+            if not pool:
+                self.stats["unmatched"] += 1
+                return None
+            self.stats["fallback"] += 1
+            call = pool[self._next_fallback[key] % len(pool)]
+            self._next_fallback[key] += 1
+            return call
+
+
+class ReplayedError(Exception):
+    """A captured failure with no HttpError or timeout equivalent. Carries the captured status as 'code', like google.api_core errors."""
+
+    def __init__(self, message: str, code: int = None):
+        super().__init__(message)
+        self.code = code
+
+
+def replayed_error(error: dict, dependency: str) -> Exception:
+    from benchmarks.fakes import FakeGoogleBackend
+
+    if error.get("type") in TIMEOUT_ERRORS:
+        return TimeoutError(error.get("message") or "timed out")
+    if error.get("status") and dependency != 'gemini':
+        return FakeGoogleBackend._http_error(error["status"], error.get("message", ""))
+    return ReplayedError(error.get("message", ""), error.get("status"))
+
+
+class ReplayTransport:
+    def __init__(self, responses: RecordedResponses, counter, latency: str = 'recorded', timeout: float = 30.0):
+        """
+        Takes the place of HttpPool and the Gemini model, answering each call from the capture instead of
+        a backend. With latency 'recorded' each call takes as long as it did when captured.
+        """
+        self.responses = responses
+        self.counter = counter
+        self.latency = latency
+        self.timeout = timeout
+
+    def _answer(self, dependency: str, operation: str, stage: str, timeout: float) -> dict:
+        from app.core.tracing import current_request_id
+        from benchmarks.fakes import simulate_delay
+
+        call = self.responses.next(current_request_id(), dependency, operation)
+        if call is None:
+            call = {"error": {"type": "ReplayedError", "status": 503, "message": f"Nothing captured for {dependency} {operation}"},
+                    "duration_ms": 0}
+        if self.latency == 'recorded':
+            simulate_delay(call.get("duration_ms", 0) / 1000.0, timeout, stage)
+        return call
+
+    def execute(self, request, credentials=None):
+        from app.core.deadline import call_timeout
+        from benchmarks.fakes import FakeBatchRequest
+
+        self.counter.add(request.name)
+        timeout = call_timeout(self.timeout, stage="google_api")
+        if isinstance(request, FakeBatchRequest):
+            self.counter.add(f"{request.name}.items", len(request.requests))
+            call = self._answer('calendar', 'batch', "google_api", timeout)
+            if call.get("error"):
+                raise replayed_error(call["error"], 'calendar')
+            items = call.get("items", [])
+            for index, (request_id, _, callback) in enumerate(request.requests):
+                item = items[index] if index < len(items) else {"error": {"status": 503, "message": "Nothing captured for this batch item"}}
+                error = replayed_error(item["error"], 'calendar') if item.get("error") else None
+                if callback is not None:
+                    callback(request_id, item.get("response"), error)
+            return None
+
+        dependency = request.name.split('.')[0]
+        call = self._answer(dependency, request.name, "google_api", timeout)
+        if call.get("error"):
+            raise replayed_error(call["error"], dependency)
+        return call.get("response")
+
+    def generate_content(self, prompt: str, request_options: dict = None):
+        from benchmarks.fakes import FakeGeminiResponse
+
+        self.counter.add('gemini.generate_content')
+        call = self._answer('gemini', 'generate_content', "parse", (request_options or {}).get('timeout'))
+        if call.get("error"):
+            raise replayed_error(call["error"], 'gemini')
+        return FakeGeminiResponse((call.get("response") or {}).get("text", ""))
+
+    def stats(self) -> dict:
+        return {"calls": sum(sum(counts.values()) for counts in self.counter.snapshot().values())}
+
+
+def build_app(args, workdir: str, responses: RecordedResponses):
+    """
+    Imports the Flask app with no live credentials and starts it on an agent whose outbound calls are all
+    answered by a ReplayTransport. Returns (main module, call counter).
+    """
+    os.environ['JOB_DB_PATH'] = os.path.join(workdir, 'jobs.db')
+    os.environ['CALENDAR_SYNC_SOURCE'] = 'off'
+    os.environ['CALENDAR_TOKEN_PATH'] = os.path.join(workdir, 'no_calendar_token.json')
+    os.environ['GMAIL_TOKEN_PATH'] = os.path.join(workdir, 'no_gmail_token.json')
+    os.environ['YOUR_COLLEGE_EMAIL_ID_FOR_TESTING'] = args.user_email
+    # Replaying must not capture the replay
+    os.environ.pop('CAPTURE_PATH', None)
+    if args.contacts:
+        shutil.copy(args.contacts, os.path.join(workdir, 'contacts.json'))
+    os.chdir(workdir)
+
+    import app.main as main
+    from app.core.agent import MeetingAgent
+    from app.core.credentials import CredentialManager
+    from app.core.directory_api import GoogleDirectoryAPI
+    from benchmarks.fakes import CallCounter, FakeGoogleBackend, FakeCalendarAPI, FakeGmailAPI, FakeNLPParser
+
+    counter = CallCounter()
+    # Only builds requests; the transport answers them
+    backend = FakeGoogleBackend(args.user_email, timezone=main.MEETING_TIMEZONE, owner_events=0,
+                                working_hours=(main.WORKING_HOURS_START, main.WORKING_HOURS_END))
+    credential_manager = CredentialManager(rate_limits={
+        'calendar': (main.CALENDAR_RATE_LIMIT_PER_SECOND, main.CALENDAR_RATE_LIMIT_BURST),
+        'gmail': (main.GMAIL_RATE_LIMIT_PER_SECOND, main.GMAIL_RATE_LIMIT_BURST)
+    })
+    transport = ReplayTransport(responses, counter, latency=args.latency, timeout=main.GOOGLE_HTTP_TIMEOUT_SECONDS)
+
+    agent = MeetingAgent(
+        api_key=None,
+        oauth_client_secrets_path=None,
+        gmail_token_path=None,
+        user_email=args.user_email,
+        timezone=main.MEETING_TIMEZONE,
+        directory_api=GoogleDirectoryAPI(),
+        credential_manager=credential_manager,
+        slot_granularity_minutes=main.SLOT_GRANULARITY_MINUTES,
+        working_hours=(main.WORKING_HOURS_START, main.WORKING_HOURS_END),
+        max_search_horizon_days=main.MAX_SEARCH_HORIZON_DAYS,
+        nlp_parser=FakeNLPParser(transport, timeout_seconds=main.GEMINI_TIMEOUT_SECONDS),
+        calendar_api=FakeCalendarAPI(backend, transport, credential_manager, timezone=main.MEETING_TIMEZONE),
+        gmail_api=FakeGmailAPI(backend, transport, credential_manager),
+        intent_classifier=main.intent_classifier
+    )
+    main.start_services(agent)
+    return main, counter
+
+
+def replay_requests(main, records: list, speed: float, concurrency: int) -> tuple:
+    """
+    Sends the captured requests from concurrency clients, each no earlier than its captured offset divided by
+    speed (at once when speed is 0). Returns (records as benchmarks/e2e.py keeps them, status mismatches, wall_seconds).
+    """
+    from benchmarks.fakes import current_endpoint
+
+    local = threading.local()
+    first = records[0]["started_at"] if records else 0
+    mismatches = Counter()
+    mismatches_lock = threading.Lock()
+    started = time.perf_counter()
+
+    def send(record):
+        if not hasattr(local, 'client'):
+            local.client = main.app.test_client()
+        if speed:
+            delay = (record["started_at"] - first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        endpoint = endpoint_label(record)
+        headers = {'X-Request-ID': record["request_id"], **record.get("headers", {})}
+        token = current_endpoint.set(endpoint)
+        sent = time.perf_counter()
+        try:
+            response = local.client.open(record["path"], method=record["method"], json=record.get("body"), headers=headers)
+            latency = time.perf_counter() - sent
+        finally:
+            current_endpoint.reset(token)
+        payload = response.get_json(silent=True) or {}
+        if (response.status_code != record.get("status_code")
+                or payload.get("status") != record.get("response_status")):
+            with mismatches_lock:
+                mismatches[endpoint] += 1
+        failed = response.status_code >= 400 or payload.get("status") == "error"
+        return endpoint, latency, response.status_code, failed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send, records))
+    return results, dict(mismatches), time.perf_counter() - started
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description="Replays captured traffic against the app with recorded Google and Gemini responses.")
+    parser.add_argument('capture', help="JSON Lines file written by the app with CAPTURE_PATH set.")
+    parser.add_argument('--speed', type=parse_speed, default=1.0, help="Pace multiplier, e.g. 1 or 10, or 'max' for no pacing.")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent clients.")
+    parser.add_argument('--latency', choices=('recorded', 'none'), default='recorded', help="Delay of each answered call.")
+    parser.add_argument('--limit', type=int, help="Replay only the first LIMIT requests.")
+    parser.add_argument('--contacts', help="contacts.json of the captured app, so participants resolve as they did.")
+    parser.add_argument('--user-email', default=USER_EMAIL, help="Address the app ran as when the traffic was captured.")
+    parser.add_argument('--output', help="Write the report here instead of to stdout.")
+    parser.add_argument('--baseline', help="Earlier report, from this tool or benchmarks/e2e.py, to compare against.")
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's own logging.")
+    args = parser.parse_args(argv)
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+    records = load_capture(args.capture)[:args.limit]
+    if not records:
+        parser.error(f"No captured requests in {args.capture}")
+    if args.contacts:
+        args.contacts = os.path.abspath(args.contacts)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    responses = RecordedResponses(records)
+    with tempfile.TemporaryDirectory(prefix='meeting-replay-') as workdir:
+        quiet = open(os.devnull, 'w')
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(quiet))
+                stack.enter_context(contextlib.redirect_stderr(quiet))
+            app_main, counter = build_app(args, workdir, responses)
+            results, mismatches, wall_seconds = replay_requests(app_main, records, args.speed, args.concurrency)
+            calls = counter.snapshot()
+            dependency_health = app_main.meeting_agent.dependency_health()
+        quiet.close()
+        os.chdir(repo_root)
+
+    report = {
+        "benchmark": "replay",
+        "started_at": datetime.now().isoformat(timespec='seconds'),
+        "git_commit": git_commit(),
+        "config": {"capture": os.path.abspath(args.capture), "speed": args.speed or "max", "concurrency": args.concurrency,
+                   "latency": args.latency, "limit": args.limit},
+        **summarize(results, wall_seconds, calls),
+        "fidelity": {
+            "calls": {name: responses.stats.get(name, 0) for name in ("matched", "fallback", "unmatched")},
+            "status_mismatches": mismatches
+        },
+        "dependency_health": dependency_health
+    }
+    if baseline is not None:
+        report["comparison"] = compare(report, baseline)
+
+    text = json.dumps(report, indent=2, default=str)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == '__main__':
+    main()
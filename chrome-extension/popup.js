@@ -29,6 +29,21 @@ const elements = {
 let allUpcomingMeetings = [];
 let allContacts = [];
 
+// A write keeps its key until the server answers it, so double-clicks and retries after a network error are
+// deduplicated by the server, while a later write with the same content gets a new key and runs again
+const idempotencyKeys = new Map();
+
+function idempotencyKeyFor(payload) {
+    const body = JSON.stringify(payload);
+    if (!idempotencyKeys.has(body)) idempotencyKeys.set(body, crypto.randomUUID());
+    return idempotencyKeys.get(body);
+}
+
+function releaseIdempotencyKey(payload, response) {
+    // A 409 means the first request with this key is still running, so a retry must keep the key to join it
+    if (response.status !== 409) idempotencyKeys.delete(JSON.stringify(payload));
+}
+
 // Helper function to format date and time for display
 function formatDisplayDateTime(isoString) {
     if (!isoString) return 'N/A';
@@ -55,9 +70,10 @@ async function manageMeeting(payload, messageElement, onSuccess) {
     try {
         const response = await fetch(`${API_BASE_URL}/meetings`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKeyFor(payload) },
             body: JSON.stringify(payload)
         });
+        releaseIdempotencyKey(payload, response);
         const data = await response.json();
         if (data.status === 'success') {
             messageElement.textContent = `Success: ${data.message}`;
@@ -183,14 +199,32 @@ function handleProcessQueryResponse(data) {
     }
 }
 
+// Fetches every page of a paginated list. Unchanged pages are revalidated by the browser's cache through their ETag.
+async function fetchAllPages(path, listField) {
+    let response;
+    let data;
+    let items = [];
+    let pageToken = null;
+    do {
+        response = await fetch(`${API_BASE_URL}${path}${pageToken ? `?page_token=${encodeURIComponent(pageToken)}` : ''}`);
+        if (!(response.headers.get('content-type') || '').includes('application/json')) return { response, data: null };
+        data = await response.json();
+        if (!response.ok || data.status !== 'success') return { response, data };
+        items = items.concat(data[listField]);
+        pageToken = data.next_page_token;
+    } while (pageToken);
+    return { response, data: { ...data, [listField]: items } };
+}
+
 async function fetchUpcomingEvents() {
     elements.searchLoadingIndicator.classList.remove('hidden');
     elements.upcomingMeetingsList.innerHTML = '';
     try {
-        const response = await fetch(`${API_BASE_URL}/list_upcoming_events`);
-        const data = await response.json();
+        const { response, data } = await fetchAllPages('/list_upcoming_events', 'events');
         elements.searchLoadingIndicator.classList.add('hidden');
-        if (data.status === 'success') {
+        if (!data) {
+            elements.statusMessage.textContent = `Error fetching meetings: the server returned an invalid response (HTTP ${response.status}).`;
+        } else if (data.status === 'success') {
             allUpcomingMeetings = data.events;
             displayMeetings(allUpcomingMeetings);
         } else {
@@ -265,10 +299,11 @@ async function fetchContacts() {
     elements.contactsStatusMessage.textContent = '';
     elements.contactsList.innerHTML = '';
     try {
-        const response = await fetch(`${API_BASE_URL}/contacts`);
-        const data = await response.json();
+        const { response, data } = await fetchAllPages('/contacts', 'contacts');
         elements.contactsLoadingIndicator.classList.add('hidden');
-        if (data.status === 'success') {
+        if (!data) {
+            elements.contactsStatusMessage.textContent = `Error fetching contacts: the server returned an invalid response (HTTP ${response.status}).`;
+        } else if (data.status === 'success') {
             allContacts = data.contacts;
             displayContacts(allContacts);
         } else {